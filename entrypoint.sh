@@ -20,5 +20,11 @@ EOF
   fi
 fi
 
-python3 /app/scripts/api-server.py &
+# Production: gunicorn with preloaded app and several workers.
+# API_SERVER=flask runs the single-process Flask dev server instead.
+if [ "${API_SERVER:-gunicorn}" = "flask" ]; then
+  python3 /app/scripts/api-server.py &
+else
+  gunicorn --config /app/scripts/gunicorn.conf.py --chdir /app/scripts "api-server:app" &
+fi
 exec node /app/mcp-apps/dist/main.js
@@ -0,0 +1,42 @@
+import { describe, it, expect } from "vitest";
+import { decodeMsgpack } from "../msgpack.js";
+
+const bytes = (...values: number[]) => new Uint8Array(values);
+const ascii = (s: string) => Array.from(s, (c) => c.charCodeAt(0));
+
+describe("decodeMsgpack", () => {
+  it("decodes fix-size maps, arrays, strings and scalars", () => {
+    const data = bytes(
+      0x83,
+      0xa1, ...ascii("a"), 0x01,
+      0xa1, ...ascii("b"), 0x94, 0xc3, 0xc0, 0xff, 0xcb, 0x3f, 0xf8, 0, 0, 0, 0, 0, 0,
+      0xa4, ...ascii("name"), 0xa6, ...ascii("Ohtani"),
+    );
+    expect(decodeMsgpack(data)).toEqual({ a: 1, b: [true, null, -1, 1.5], name: "Ohtani" });
+  });
+
+  it("decodes sized integers, floats and strings", () => {
+    expect(decodeMsgpack(bytes(0xcd, 0x01, 0x00))).toBe(256);
+    expect(decodeMsgpack(bytes(0xd0, 0x80))).toBe(-128);
+    expect(decodeMsgpack(bytes(0xd2, 0xff, 0xff, 0xff, 0xfe))).toBe(-2);
+    expect(decodeMsgpack(bytes(0xcf, 0, 0, 0, 0x01, 0, 0, 0, 0))).toBe(4294967296);
+    expect(decodeMsgpack(bytes(0xca, 0x40, 0x20, 0, 0))).toBe(2.5);
+    expect(decodeMsgpack(bytes(0xd9, 0x03, ...ascii("abc")))).toBe("abc");
+  });
+
+  it("decodes 16-bit maps and stringifies non-string keys", () => {
+    expect(decodeMsgpack(bytes(0xde, 0x00, 0x01, 0xa1, ...ascii("k"), 0x05))).toEqual({ k: 5 });
+    expect(decodeMsgpack(bytes(0x81, 0x01, 0xa1, ...ascii("x")))).toEqual({ "1": "x" });
+  });
+
+  it("decodes UTF-8 strings", () => {
+    const encoded = Array.from(new TextEncoder().encode("Acuña"));
+    expect(decodeMsgpack(bytes(0xa0 | encoded.length, ...encoded))).toBe("Acuña");
+  });
+
+  it("rejects truncated, trailing and unsupported data", () => {
+    expect(() => decodeMsgpack(bytes(0x92, 0x01))).toThrow("unexpected end");
+    expect(() => decodeMsgpack(bytes(0x01, 0x02))).toThrow("trailing bytes");
+    expect(() => decodeMsgpack(bytes(0xc1))).toThrow("unsupported type");
+  });
+});
@@ -1,14 +1,18 @@
 import { describe, it, expect, vi, beforeEach, afterEach } from "vitest";
-import { toolError, apiGet, apiPost } from "../python-client.js";
+import {
+  toolError, apiGet, apiPost, apiBatch, apiStream, clearEtagCache, setResponseFormat,
+} from "../python-client.js";
 
 const originalFetch = globalThis.fetch;
 
 beforeEach(() => {
   globalThis.fetch = vi.fn();
+  clearEtagCache();
 });
 
 afterEach(() => {
   globalThis.fetch = originalFetch;
+  setResponseFormat("json");
 });
 
 describe("toolError", () => {
@@ -73,6 +77,59 @@ describe("apiGet", () => {
 
     await expect(apiGet("/api/missing")).rejects.toThrow("API error: 404 Not Found - Not found");
   });
+
+  it("revalidates with If-None-Match and reuses the cached body on 304", async () => {
+    const data = { standings: [{ rank: 1, name: "Team A" }] };
+    vi.mocked(globalThis.fetch)
+      .mockResolvedValueOnce(
+        new Response(JSON.stringify(data), { status: 200, headers: { ETag: '"abc123"' } })
+      )
+      .mockResolvedValueOnce(new Response(null, { status: 304 }));
+
+    const first = await apiGet("/api/standings");
+    const second = await apiGet("/api/standings");
+
+    expect(first).toEqual(data);
+    expect(second).toEqual(data);
+    const [, opts] = vi.mocked(globalThis.fetch).mock.calls[1];
+    expect(opts).toMatchObject({ headers: { "If-None-Match": '"abc123"' } });
+  });
+
+  it("does not send If-None-Match when no ETag was returned", async () => {
+    vi.mocked(globalThis.fetch).mockImplementation(
+      async () => new Response(JSON.stringify({}), { status: 200 })
+    );
+
+    await apiGet("/api/roster");
+    await apiGet("/api/roster");
+    expect(vi.mocked(globalThis.fetch).mock.calls[1][1]).toBeUndefined();
+  });
+});
+
+describe("MessagePack responses", () => {
+  it("asks for msgpack when enabled and decodes by Content-Type", async () => {
+    setResponseFormat("msgpack");
+    // {"ok": true}
+    const body = new Uint8Array([0x81, 0xa2, 0x6f, 0x6b, 0xc3]);
+    vi.mocked(globalThis.fetch).mockResolvedValue(
+      new Response(body, { status: 200, headers: { "Content-Type": "application/msgpack" } })
+    );
+
+    const result = await apiGet("/api/rankings");
+    expect(result).toEqual({ ok: true });
+    const [, opts] = vi.mocked(globalThis.fetch).mock.calls[0];
+    expect(opts).toMatchObject({ headers: { Accept: "application/msgpack, application/json;q=0.9" } });
+  });
+
+  it("still parses JSON when the server answers with JSON", async () => {
+    setResponseFormat("msgpack");
+    vi.mocked(globalThis.fetch).mockResolvedValue(
+      new Response(JSON.stringify({ ok: 1 }), { status: 200, headers: { "Content-Type": "application/json" } })
+    );
+
+    const result = await apiPost("/api/add", { player_id: "1" });
+    expect(result).toEqual({ ok: 1 });
+  });
 });
 
 describe("apiPost", () => {
@@ -105,3 +162,81 @@ describe("apiPost", () => {
     );
   });
 });
+
+describe("apiStream", () => {
+  it("requests NDJSON and assembles sections in arrival order", async () => {
+    const lines = [
+      JSON.stringify({ section: "injury", data: { injured_active: [] } }),
+      JSON.stringify({ section: "roster", data: { players: [] } }),
+      JSON.stringify({ section: "issues", data: [] }),
+      JSON.stringify({ done: true }),
+    ];
+    // Split mid-line to exercise buffering across chunks
+    const text = lines.join("\n") + "\n";
+    const encoder = new TextEncoder();
+    const body = new ReadableStream({
+      start(controller) {
+        controller.enqueue(encoder.encode(text.slice(0, 25)));
+        controller.enqueue(encoder.encode(text.slice(25)));
+        controller.close();
+      },
+    });
+    vi.mocked(globalThis.fetch).mockResolvedValueOnce(new Response(body, { status: 200 }));
+
+    const seen: string[] = [];
+    const result = await apiStream<Record<string, unknown>>(
+      "/api/workflow/roster-health", undefined, (name) => seen.push(name)
+    );
+
+    expect(seen).toEqual(["injury", "roster", "issues"]);
+    expect(result).toEqual({ injury: { injured_active: [] }, roster: { players: [] }, issues: [] });
+    const calledUrl = vi.mocked(globalThis.fetch).mock.calls[0][0] as string;
+    expect(calledUrl).toContain("stream=1");
+  });
+
+  it("copies partial and timed_out from the done line", async () => {
+    const text = [
+      JSON.stringify({ section: "roster", data: { players: [] } }),
+      JSON.stringify({ done: true, partial: true, timed_out: ["injury"] }),
+    ].join("\n");
+    vi.mocked(globalThis.fetch).mockResolvedValueOnce(new Response(text, { status: 200 }));
+
+    const result = await apiStream<Record<string, unknown>>("/api/workflow/roster-health");
+
+    expect(result).toEqual({ roster: { players: [] }, partial: true, timed_out: ["injury"] });
+  });
+
+  it("throws on non-OK response", async () => {
+    vi.mocked(globalThis.fetch).mockResolvedValueOnce(
+      new Response("boom", { status: 500, statusText: "Internal Server Error" })
+    );
+    await expect(apiStream("/api/workflow/league-landscape")).rejects.toThrow("API error: 500");
+  });
+});
+
+describe("apiBatch", () => {
+  it("posts keyed sub-requests and returns the results map", async () => {
+    const results = {
+      roster: { status: 200, data: { players: [] } },
+      standings: { status: 500, data: { error: "boom" } },
+    };
+    vi.mocked(globalThis.fetch).mockResolvedValueOnce(
+      new Response(JSON.stringify({ results }), { status: 200 })
+    );
+
+    const out = await apiBatch({
+      roster: { path: "/api/roster" },
+      standings: { path: "/api/standings", params: { week: "3" } },
+    });
+
+    expect(out).toEqual(results);
+    const [url, opts] = vi.mocked(globalThis.fetch).mock.calls[0];
+    expect(url).toContain("/api/batch");
+    expect(JSON.parse(opts?.body as string)).toEqual({
+      requests: {
+        roster: { path: "/api/roster" },
+        standings: { path: "/api/standings", params: { week: "3" } },
+      },
+    });
+  });
+});
@@ -0,0 +1,83 @@
+/**
+ * Minimal MessagePack decoder for api-server responses (Accept:
+ * application/msgpack, see scripts/serializer.py). Decodes to the same
+ * shapes JSON.parse would produce: maps become plain objects with string
+ * keys, bin becomes a Uint8Array, and 64-bit integers become numbers.
+ * Extension types are not used by the server and are rejected.
+ */
+
+const textDecoder = new TextDecoder();
+
+export function decodeMsgpack(bytes: Uint8Array): unknown {
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  let pos = 0;
+
+  const str = (length: number): string => {
+    const value = textDecoder.decode(bytes.subarray(pos, pos + length));
+    pos += length;
+    return value;
+  };
+
+  const bin = (length: number): Uint8Array => {
+    const value = bytes.slice(pos, pos + length);
+    pos += length;
+    return value;
+  };
+
+  const array = (length: number): unknown[] => {
+    const value = new Array(length);
+    for (let i = 0; i < length; i++) value[i] = read();
+    return value;
+  };
+
+  const map = (length: number): Record<string, unknown> => {
+    const value: Record<string, unknown> = {};
+    for (let i = 0; i < length; i++) {
+      const key = String(read());
+      value[key] = read();
+    }
+    return value;
+  };
+
+  const read = (): unknown => {
+    if (pos >= bytes.length) throw new Error("MessagePack: unexpected end of data");
+    const type = bytes[pos++];
+    if (type <= 0x7f) return type;
+    if (type <= 0x8f) return map(type & 0x0f);
+    if (type <= 0x9f) return array(type & 0x0f);
+    if (type <= 0xbf) return str(type & 0x1f);
+    if (type >= 0xe0) return type - 0x100;
+
+    switch (type) {
+      case 0xc0: return null;
+      case 0xc2: return false;
+      case 0xc3: return true;
+      case 0xc4: { const n = view.getUint8(pos); pos += 1; return bin(n); }
+      case 0xc5: { const n = view.getUint16(pos); pos += 2; return bin(n); }
+      case 0xc6: { const n = view.getUint32(pos); pos += 4; return bin(n); }
+      case 0xca: { const v = view.getFloat32(pos); pos += 4; return v; }
+      case 0xcb: { const v = view.getFloat64(pos); pos += 8; return v; }
+      case 0xcc: { const v = view.getUint8(pos); pos += 1; return v; }
+      case 0xcd: { const v = view.getUint16(pos); pos += 2; return v; }
+      case 0xce: { const v = view.getUint32(pos); pos += 4; return v; }
+      case 0xcf: { const v = Number(view.getBigUint64(pos)); pos += 8; return v; }
+      case 0xd0: { const v = view.getInt8(pos); pos += 1; return v; }
+      case 0xd1: { const v = view.getInt16(pos); pos += 2; return v; }
+      case 0xd2: { const v = view.getInt32(pos); pos += 4; return v; }
+      case 0xd3: { const v = Number(view.getBigInt64(pos)); pos += 8; return v; }
+      case 0xd9: { const n = view.getUint8(pos); pos += 1; return str(n); }
+      case 0xda: { const n = view.getUint16(pos); pos += 2; return str(n); }
+      case 0xdb: { const n = view.getUint32(pos); pos += 4; return str(n); }
+      case 0xdc: { const n = view.getUint16(pos); pos += 2; return array(n); }
+      case 0xdd: { const n = view.getUint32(pos); pos += 4; return array(n); }
+      case 0xde: { const n = view.getUint16(pos); pos += 2; return map(n); }
+      case 0xdf: { const n = view.getUint32(pos); pos += 4; return map(n); }
+      default:
+        throw new Error("MessagePack: unsupported type 0x" + type.toString(16));
+    }
+  };
+
+  const result = read();
+  if (pos !== bytes.length) throw new Error("MessagePack: trailing bytes after value");
+  return result;
+}
@@ -1,5 +1,25 @@
+import { decodeMsgpack } from "./msgpack.js";
+
 const API_BASE = process.env.PYTHON_API_URL || "http://localhost:8766";
 
+// PYTHON_API_FORMAT=msgpack asks the API for MessagePack bodies (smaller and
+// cheaper to encode for large responses); JSON stays the fallback either way
+const MSGPACK_ACCEPT = "application/msgpack, application/json;q=0.9";
+let preferMsgpack = process.env.PYTHON_API_FORMAT === "msgpack";
+
+export function setResponseFormat(format: "json" | "msgpack") {
+  preferMsgpack = format === "msgpack";
+}
+
+/** Parse a response body as MessagePack or JSON, by its Content-Type */
+export async function parseBody(response: Response): Promise<unknown> {
+  const type = response.headers.get("Content-Type") || "";
+  if (type.includes("application/msgpack")) {
+    return decodeMsgpack(new Uint8Array(await response.arrayBuffer()));
+  }
+  return response.json();
+}
+
 export function toolError(e: unknown) {
   const msg = e instanceof Error ? e.message : String(e);
   return {
@@ -9,6 +29,14 @@ export function toolError(e: unknown) {
   };
 }
 
+// Last ETag + parsed body per GET URL, so repeat calls can revalidate with a cheap 304
+const ETAG_CACHE_MAX = 200;
+const etagCache = new Map<string, { etag: string; data: unknown }>();
+
+export function clearEtagCache() {
+  etagCache.clear();
+}
+
 export async function apiGet<T>(path: string, params?: Record<string, string>): Promise<T> {
   const url = new URL(path, API_BASE);
   if (params) {
@@ -18,24 +46,134 @@ export async function apiGet<T>(path: string, params?: Record<string, string>):
       }
     }
   }
-  const response = await fetch(url.toString());
+  const key = url.toString();
+  const cached = etagCache.get(key);
+  const headers: Record<string, string> = {};
+  if (preferMsgpack) headers.Accept = MSGPACK_ACCEPT;
+  if (cached) headers["If-None-Match"] = cached.etag;
+  const response = Object.keys(headers).length
+    ? await fetch(key, { headers })
+    : await fetch(key);
+  if (response.status === 304 && cached) {
+    return cached.data as T;
+  }
   if (!response.ok) {
     const body = await response.text().catch(() => "");
     throw new Error("API error: " + response.status + " " + response.statusText + (body ? " - " + body : ""));
   }
-  return response.json() as Promise<T>;
+  const data = await parseBody(response);
+  const etag = response.headers.get("ETag");
+  if (etag) {
+    etagCache.delete(key);
+    etagCache.set(key, { etag, data });
+    if (etagCache.size > ETAG_CACHE_MAX) {
+      const oldest = etagCache.keys().next().value;
+      if (oldest !== undefined) etagCache.delete(oldest);
+    }
+  }
+  return data as T;
 }
 
 export async function apiPost<T>(path: string, body: Record<string, unknown>): Promise<T> {
   const url = new URL(path, API_BASE);
+  const headers: Record<string, string> = { "Content-Type": "application/json" };
+  if (preferMsgpack) headers.Accept = MSGPACK_ACCEPT;
   const response = await fetch(url.toString(), {
     method: "POST",
-    headers: { "Content-Type": "application/json" },
+    headers,
     body: JSON.stringify(body),
   });
   if (!response.ok) {
     const text = await response.text().catch(() => "");
     throw new Error("API error: " + response.status + " " + response.statusText + (text ? " - " + text : ""));
   }
-  return response.json() as Promise<T>;
+  return (await parseBody(response)) as T;
+}
+
+export interface BatchRequest {
+  path: string;
+  params?: Record<string, string>;
+}
+
+export interface BatchResult<T = unknown> {
+  status: number;
+  data: T;
+}
+
+/**
+ * Run several GET routes in one round trip via /api/batch. The server
+ * dispatches them concurrently and they share one Yahoo league context.
+ * Resolves with a result per key; each carries its own HTTP status.
+ */
+export async function apiBatch(
+  requests: Record<string, BatchRequest>,
+): Promise<Record<string, BatchResult>> {
+  const data = await apiPost<{ results: Record<string, BatchResult> }>("/api/batch", { requests });
+  return data.results || {};
+}
+
+/**
+ * Stream a workflow endpoint as NDJSON (?stream=1). onSection fires for each
+ * section as soon as the server finishes it; the synthesized summary
+ * (action_items / issues / pairs) arrives last. Resolves with every section
+ * assembled into the same document the non-streaming endpoint returns,
+ * including its partial / timed_out markers when the deadline cut it short.
+ */
+export async function apiStream<T>(
+  path: string,
+  params?: Record<string, string>,
+  onSection?: (name: string, data: unknown) => void,
+): Promise<T> {
+  const url = new URL(path, API_BASE);
+  if (params) {
+    for (const [key, value] of Object.entries(params)) {
+      if (value !== undefined && value !== "") {
+        url.searchParams.set(key, value);
+      }
+    }
+  }
+  url.searchParams.set("stream", "1");
+  const response = await fetch(url.toString(), { headers: { Accept: "application/x-ndjson" } });
+  if (!response.ok) {
+    const body = await response.text().catch(() => "");
+    throw new Error("API error: " + response.status + " " + response.statusText + (body ? " - " + body : ""));
+  }
+
+  const doc: Record<string, unknown> = {};
+  const handleLine = (line: string) => {
+    if (!line.trim()) return;
+    const msg = JSON.parse(line) as {
+      section?: string; data?: unknown; done?: boolean; partial?: boolean; timed_out?: string[];
+    };
+    if (msg.section !== undefined) {
+      doc[msg.section] = msg.data;
+      if (onSection) onSection(msg.section, msg.data);
+    } else if (msg.done) {
+      // Deadline-cut streams mark themselves like the non-streaming endpoint
+      if (msg.partial !== undefined) doc.partial = msg.partial;
+      if (msg.timed_out !== undefined) doc.timed_out = msg.timed_out;
+    }
+  };
+
+  if (!response.body) {
+    for (const line of (await response.text()).split("\n")) handleLine(line);
+    return doc as T;
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = "";
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffered += decoder.decode(value, { stream: true });
+    let newline = buffered.indexOf("\n");
+    while (newline !== -1) {
+      handleLine(buffered.slice(0, newline));
+      buffered = buffered.slice(newline + 1);
+      newline = buffered.indexOf("\n");
+    }
+  }
+  handleLine(buffered + decoder.decode());
+  return doc as T;
 }
@@ -1029,7 +1029,13 @@ export interface ActionItem {
   transaction_key?: string;
 }
 
-export interface MorningBriefingResponse {
+// Set on workflow responses when the request deadline cut sections off
+export interface PartialResult {
+  partial?: boolean;
+  timed_out?: string[];
+}
+
+export interface MorningBriefingResponse extends PartialResult {
   action_items: ActionItem[];
   injury: InjuryReportResponse;
   lineup: LineupOptimizeResponse;
@@ -1040,7 +1046,7 @@ export interface MorningBriefingResponse {
   waiver_pitchers: WaiverAnalyzeResponse;
 }
 
-export interface LeagueLandscapeResponse {
+export interface LeagueLandscapeResponse extends PartialResult {
   standings: StandingsResponse;
   pace: SeasonPaceResponse;
   power_rankings: PowerRankingsResponse;
@@ -1058,7 +1064,7 @@ export interface RosterIssue {
   player_id?: string;
 }
 
-export interface RosterHealthResponse {
+export interface RosterHealthResponse extends PartialResult {
   issues: RosterIssue[];
   injury: InjuryReportResponse;
   lineup: LineupOptimizeResponse;
@@ -1078,7 +1084,7 @@ export interface WaiverPair {
   weak_categories: string[];
 }
 
-export interface WaiverRecommendationsResponse {
+export interface WaiverRecommendationsResponse extends PartialResult {
   pairs: WaiverPair[];
   category_check: CategoryCheckResponse;
   waiver_batters: WaiverAnalyzeResponse;
@@ -1086,7 +1092,7 @@ export interface WaiverRecommendationsResponse {
   roster: RosterResponse;
 }
 
-export interface TradeAnalysisResponse {
+export interface TradeAnalysisResponse extends PartialResult {
   give_players: ValuePlayer[];
   get_players: ValuePlayer[];
   give_ids: string[];
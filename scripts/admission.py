@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""Admission Control - Concurrency limits per class of expensive API route
+
+Workflows, league-wide analyses and browser writes cost orders of magnitude
+more than a cached roster read; a burst of agent calls could otherwise start
+a dozen Chromium instances and pandas rebuilds at once. Each route class
+gets a concurrency limit and a bounded FIFO queue:
+
+  - below the limit a request runs immediately
+  - at the limit it waits in the queue (up to ADMISSION_MAX_WAIT seconds,
+    or the request's deadline)
+  - with the queue full, or after waiting too long, it gets a 429 with
+    Retry-After estimated from the class's recent service time
+
+Routes outside these classes (health, cached reads) are never queued.
+Cache hits and coalesced waiters don't take a slot either: api-server
+applies the limit inside the view, behind the response cache and
+single-flight. Limits are per worker process.
+
+ADMISSION_LIMITS overrides the defaults, e.g. "workflow=2/4,browser=1/2"
+(concurrent / queued). ADMISSION=0 turns it off.
+"""
+
+import os
+import math
+import time
+import threading
+from collections import deque
+
+import deadline
+
+ENABLED = os.environ.get("ADMISSION", "1") != "0"
+MAX_WAIT = float(os.environ.get("ADMISSION_MAX_WAIT", "30"))
+
+# class -> (concurrent requests, queued requests)
+DEFAULT_LIMITS = {
+    "workflow": (4, 8),
+    "analysis": (4, 16),
+    "browser": (2, 4),
+}
+
+ANALYSIS_ROUTES = (
+    "/api/trade-finder",
+    "/api/power-rankings",
+    "/api/trade-eval",
+    "/api/category-simulate",
+    "/api/scout-opponent",
+    "/api/matchup-strategy",
+    "/api/league-pulse",
+    "/api/waiver-analyze",
+    "/api/intel/batch",
+    "/api/rankings",
+    "/api/compare",
+    "/api/value",
+    "/api/projections-update",
+)
+
+BROWSER_ROUTES = (
+    "/api/add",
+    "/api/drop",
+    "/api/swap",
+    "/api/waiver-claim",
+    "/api/waiver-claim-swap",
+    "/api/set-lineup",
+    "/api/propose-trade",
+    "/api/accept-trade",
+    "/api/reject-trade",
+    "/api/change-team-name",
+    "/api/change-team-logo",
+)
+
+# Smoothing for the per-class service time used in Retry-After
+SERVICE_EWMA = 0.2
+
+
+class Rejected(Exception):
+    """The class's queue is full, or the wait ran out"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _parse_limits(value):
+    limits = dict(DEFAULT_LIMITS)
+    for item in (value or "").split(","):
+        item = item.strip()
+        if "=" not in item:
+            continue
+        name, spec = item.split("=", 1)
+        try:
+            concurrent, _, queued = spec.partition("/")
+            concurrent = int(concurrent)
+            queued = int(queued) if queued else concurrent * 2
+        except ValueError:
+            print("Warning: ignoring bad ADMISSION_LIMITS entry: " + item)
+            continue
+        limits[name.strip()] = (max(1, concurrent), max(0, queued))
+    return limits
+
+
+LIMITS = _parse_limits(os.environ.get("ADMISSION_LIMITS", ""))
+
+
+def classify(path, args=None):
+    """Route class for a request path, or None if it isn't limited"""
+    if path.startswith("/api/workflow/"):
+        return "workflow"
+    if path in ANALYSIS_ROUTES:
+        return "analysis"
+    if path in BROWSER_ROUTES:
+        return "browser"
+    # Only the applying variant drives the browser
+    if path == "/api/lineup-optimize" and args is not None and str(args.get("apply", "")).lower() == "true":
+        return "browser"
+    return None
+
+
+class RouteClass:
+    """Concurrency slots plus a FIFO queue for one class of routes"""
+
+    def __init__(self, name, limit, queue_limit):
+        self.name = name
+        self.limit = limit
+        self.queue_limit = queue_limit
+        self.cond = threading.Condition()
+        self.active = 0
+        self.waiters = deque()
+        self.service_seconds = None
+        self.stats = {
+            "admitted": 0,
+            "queued": 0,
+            "rejected_full": 0,
+            "rejected_timeout": 0,
+            "wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+        }
+
+    def retry_after(self):
+        """Seconds until a slot is likely free for a new arrival"""
+        service = self.service_seconds or 5.0
+        backlog = (len(self.waiters) + 1) / float(self.limit)
+        return max(1, int(math.ceil(service * backlog)))
+
+    def _admit(self, waited):
+        self.active += 1
+        self.stats["admitted"] += 1
+        self.stats["wait_seconds"] += waited
+        self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], waited)
+
+    def acquire(self, max_wait):
+        """Take a slot, queueing if needed. Returns seconds waited; raises Rejected."""
+        with self.cond:
+            if self.active < self.limit and not self.waiters:
+                self._admit(0.0)
+                return 0.0
+            if len(self.waiters) >= self.queue_limit:
+                self.stats["rejected_full"] += 1
+                raise Rejected(
+                    "Too many concurrent " + self.name + " requests (queue full)",
+                    self.retry_after(),
+                )
+            ticket = object()
+            self.waiters.append(ticket)
+            self.stats["queued"] += 1
+            started = time.time()
+            while True:
+                waited = time.time() - started
+                if self.waiters[0] is ticket and self.active < self.limit:
+                    self.waiters.popleft()
+                    self._admit(waited)
+                    self.cond.notify_all()
+                    return waited
+                remaining = max_wait - waited
+                if remaining <= 0:
+                    self.waiters.remove(ticket)
+                    self.stats["rejected_timeout"] += 1
+                    self.cond.notify_all()
+                    raise Rejected(
+                        "Timed out after " + str(round(waited, 1)) + "s waiting for a "
+                        + self.name + " slot",
+                        self.retry_after(),
+                    )
+                self.cond.wait(remaining)
+
+    def release(self, service_seconds):
+        with self.cond:
+            self.active -= 1
+            if self.service_seconds is None:
+                self.service_seconds = service_seconds
+            else:
+                self.service_seconds += SERVICE_EWMA * (service_seconds - self.service_seconds)
+            self.cond.notify_all()
+
+    def snapshot(self):
+        with self.cond:
+            result = dict(self.stats)
+            result.update({
+                "limit": self.limit,
+                "queue_limit": self.queue_limit,
+                "active": self.active,
+                "waiting": len(self.waiters),
+                "service_seconds": round(self.service_seconds, 3) if self.service_seconds is not None else None,
+            })
+        result["wait_seconds"] = round(result["wait_seconds"], 3)
+        result["max_wait_seconds"] = round(result["max_wait_seconds"], 3)
+        return result
+
+
+_classes = {name: RouteClass(name, limit, queued) for name, (limit, queued) in LIMITS.items()}
+
+
+class Slot:
+    """A held slot; release() exactly once (later calls are no-ops)"""
+
+    def __init__(self, route_class):
+        self.route_class = route_class
+        self.started = time.time()
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self.route_class.release(time.time() - self.started)
+
+
+def admit(path, args=None):
+    """Wait for a slot for this request. Returns a Slot, or None when the
+    route isn't limited. Raises Rejected when the client should back off.
+    """
+    if not ENABLED:
+        return None
+    route_class = _classes.get(classify(path, args))
+    if route_class is None:
+        return None
+    max_wait = MAX_WAIT
+    left = deadline.remaining()
+    if left is not None:
+        max_wait = max(0.0, min(max_wait, left))
+    route_class.acquire(max_wait)
+    return Slot(route_class)
+
+
+def get_stats():
+    """Per-class slots, queue depth, wait time and rejection counts"""
+    return {name: rc.snapshot() for name, rc in sorted(_classes.items())}
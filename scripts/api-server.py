@@ -6,23 +6,313 @@ Routes match the TypeScript MCP Apps server's python-client.ts expectations.
 
 import sys
 import os
-import importlib
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from flask import Flask, jsonify, request
+import gzip
+import time
+import functools
+
+from flask import Flask, Response, g, has_request_context, jsonify, request
+from flask.json.provider import DefaultJSONProvider
+
+# Command modules are imported on first use of a route that needs them, so
+# startup doesn't pay for pandas/numpy/yahoo_fantasy_api up front
+# (see lazy_modules.py; bench_imports.py measures per-module cost)
+import lazy_modules
+
+yahoo_fantasy = lazy_modules.lazy("yahoo-fantasy")
+draft_assistant = lazy_modules.lazy("draft-assistant")
+mlb_data = lazy_modules.lazy("mlb-data")
+season_manager = lazy_modules.lazy("season-manager")
+valuations = lazy_modules.lazy("valuations")
+history = lazy_modules.lazy("history")
+intel = lazy_modules.lazy("intel")
+player_resolver = lazy_modules.lazy("player_resolver")
+yahoo_browser = lazy_modules.lazy("yahoo_browser")
+
+import workflow
+import metrics
+import league_context
+import response_cache
+import singleflight
+import projection
+import upstream_budget
+import deadline
+import invalidation
+import change_feed
+import cli_daemon
+import worker_pools
+import serializer
+import admission
+import profiling
+import data_cache
+
+# Browser writes and valuation passes run in worker processes (worker_pools.py)
+worker_pools.enable()
+
+
+class _ProjectingJSONProvider(DefaultJSONProvider):
+    """jsonify() that applies the request's fields= / exclude= projection
+    and serializes with serializer.py (orjson / MessagePack when available)"""
+
+    def __init__(self, app):
+        super().__init__(app)
+        # Our own reference: Flask keeps its copy in a private attribute
+        self.flask_app = app
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return serializer.dumps(obj).decode("utf-8")
+
+    def response(self, *args, **kwargs):
+        # jsonify() semantics: keyword args, one object, or several as a list
+        if args and kwargs:
+            raise TypeError("jsonify() behavior undefined when passed both args and kwargs")
+        if not args:
+            obj = kwargs
+        elif len(args) == 1:
+            obj = args[0]
+        else:
+            obj = list(args)
+        fmt = "json"
+        if has_request_context():
+            response_cache.check_payload(obj)
+            spec = g.get("projection")
+            if spec:
+                obj = projection.apply(spec, obj)
+            fmt = serializer.negotiate(request.accept_mimetypes)
+        body, mimetype = serializer.render(obj, fmt)
+        response = self.flask_app.response_class(body, mimetype=mimetype)
+        if serializer.msgpack is not None:
+            response.vary.add("Accept")
+        return response
 
-# Import modules (some have hyphens, need importlib)
-yahoo_fantasy = importlib.import_module("yahoo-fantasy")
-draft_assistant = importlib.import_module("draft-assistant")
-mlb_data = importlib.import_module("mlb-data")
-season_manager = importlib.import_module("season-manager")
-import valuations
-import history
-import intel
-import yahoo_browser
 
 app = Flask(__name__)
+app.json = _ProjectingJSONProvider(app)
+
+
+# --- Metrics (route latency, cache hits, upstream calls per route) ---
+# Registered first so the before hook runs first and the after hook runs last
+# (after the response cache has set X-Cache).
+
+
+@app.before_request
+def _start_metrics():
+    g.metrics_started = time.time()
+    g.metrics_token = metrics.begin_request()
+
+
+@app.after_request
+def _record_metrics(response):
+    token = g.pop("metrics_token", None)
+    if token is None:
+        return response
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    usage = metrics.end_request(
+        token,
+        route,
+        response.status_code,
+        time.time() - g.metrics_started,
+        cache=response.headers.get("X-Cache"),
+    )
+    if usage:
+        response.headers["Server-Timing"] = ", ".join(
+            kind + ";dur=" + str(int(u["seconds"] * 1000)) + ';desc="' + str(u["calls"]) + ' calls"'
+            for kind, u in sorted(usage.items())
+        )
+    return response
+
+
+# --- Profiling (X-Profile: 1 or PROFILE_ROUTES) ---
+# Registered right after the metrics hooks so the profile covers the rest of
+# the request; artifacts land in DATA_DIR/profiles/ (see profiling.py).
+
+
+@app.before_request
+def _start_profile():
+    if profiling.requested(request.path, request.headers):
+        g.profile = profiling.start(request.path)
+
+
+@app.after_request
+def _stop_profile(response):
+    profile = g.pop("profile", None)
+    if profile is None:
+        return response
+    profile.detach()
+    response.headers["X-Profile"] = profile.name
+    # A streamed workflow does its work after this hook
+    if response.is_streamed:
+        response.call_on_close(profile.stop)
+    else:
+        profile.stop()
+    return response
+
+
+@app.teardown_request
+def _abandon_profile(exc=None):
+    profile = g.pop("profile", None)
+    if profile is not None:
+        profile.detach()
+        profile.stop()
+
+
+# --- Response compression ---
+# Registered after the metrics hooks and before the cache hooks, so it runs
+# after the response cache has stored/ETagged the uncompressed body.
+
+GZIP_MIN_BYTES = int(os.environ.get("API_GZIP_MIN_BYTES", "4096"))
+GZIP_LEVEL = 5
+
+
+@app.after_request
+def _gzip_response(response):
+    if GZIP_MIN_BYTES <= 0 or response.status_code != 200:
+        return response
+    if response.direct_passthrough or response.is_streamed:
+        return response
+    if "Content-Encoding" in response.headers:
+        return response
+    if "gzip" not in request.headers.get("Accept-Encoding", "").lower():
+        return response
+    body = response.get_data()
+    if len(body) < GZIP_MIN_BYTES:
+        return response
+    response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL))
+    response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    # Same entity, different encoding: weaken the ETag so If-None-Match
+    # still matches (weak comparison) but caches don't mix representations
+    etag, _ = response.get_etag()
+    if etag:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+# --- Field projection (fields= / exclude=) ---
+
+
+@app.before_request
+def _open_projection():
+    spec = projection.from_args(request.args)
+    g.projection = spec
+    if spec:
+        g.projection_token = projection.activate(spec)
+
+
+@app.teardown_request
+def _close_projection(exc=None):
+    token = g.pop("projection_token", None)
+    if token is not None:
+        projection.deactivate(token)
+
+
+# --- Upstream call priority ---
+# Scheduled jobs send X-Priority: background so their Yahoo/MLB/Savant calls
+# queue behind interactive tool calls when a rate budget runs low.
+
+
+@app.before_request
+def _open_upstream_priority():
+    priority = request.headers.get("X-Priority", "").strip().lower()
+    if priority:
+        g.upstream_priority_token = upstream_budget.set_priority(priority)
+
+
+@app.teardown_request
+def _close_upstream_priority(exc=None):
+    token = g.pop("upstream_priority_token", None)
+    if token is not None:
+        upstream_budget.reset_priority(token)
+
+
+# --- Request deadlines ---
+# X-Deadline-Ms says how long the client will wait; aggregated routes have a
+# default. Upstream fetchers size their timeouts from the time left (see
+# deadline.py) and workflow routes return whatever sections finished, with
+# "partial": true and the names of the sections that timed out.
+
+WORKFLOW_DEADLINE_MS = int(os.environ.get("WORKFLOW_DEADLINE_MS", "45000"))
+ROUTE_DEADLINES_MS = {
+    "/api/workflow/morning-briefing": WORKFLOW_DEADLINE_MS,
+    "/api/workflow/league-landscape": WORKFLOW_DEADLINE_MS,
+    "/api/workflow/roster-health": WORKFLOW_DEADLINE_MS,
+    "/api/workflow/waiver-recommendations": WORKFLOW_DEADLINE_MS,
+    "/api/workflow/trade-analysis": WORKFLOW_DEADLINE_MS,
+}
+
+
+@app.before_request
+def _open_deadline():
+    ms = 0
+    header = request.headers.get("X-Deadline-Ms", "").strip()
+    if header:
+        try:
+            ms = int(header)
+        except ValueError:
+            ms = 0
+    # A caller's deadline (its header, or a /api/batch parent's) can cut a
+    # section short without marking the response: response_cache won't store it
+    left = deadline.remaining()
+    if ms > 0 or left is not None:
+        g.caller_deadline = True
+    if ms <= 0 and request.url_rule is not None:
+        ms = ROUTE_DEADLINES_MS.get(request.url_rule.rule, 0)
+    if ms <= 0:
+        return
+    # A /api/batch sub-request never outlives its parent's deadline
+    if left is not None and left <= ms / 1000.0:
+        return
+    g.deadline_token = deadline.activate(ms / 1000.0)
+
+
+@app.teardown_request
+def _close_deadline(exc=None):
+    token = g.pop("deadline_token", None)
+    if token is not None:
+        deadline.deactivate(token)
+
+
+# --- Request-scoped league context ---
+# One memoized Yahoo connection/roster/scoreboard per request, shared by every
+# cmd_* the route calls (including workflow sections on worker threads).
+
+
+@app.before_request
+def _open_league_context():
+    # /api/batch sub-requests run inside the parent's context and reuse its LeagueContext
+    ctx = league_context.current() or league_context.LeagueContext()
+    g.league_ctx_token = league_context.activate(ctx)
+
+
+@app.teardown_request
+def _close_league_context(exc=None):
+    token = g.pop("league_ctx_token", None)
+    if token is not None:
+        league_context.deactivate(token)
+
+
+# --- Response cache (per-route TTLs, ETag / If-None-Match) ---
+# Writes below publish invalidation events; events published by other
+# workers are applied before the cache is consulted.
+
+
+@app.before_request
+def _apply_invalidations():
+    invalidation.poll()
+
+
+@app.before_request
+def _serve_cached_response():
+    return response_cache.serve(request)
+
+
+@app.after_request
+def _cache_response(response):
+    return response_cache.store(request, response)
 
 
 # --- Session heartbeat (keeps Yahoo cookies alive) ---
@@ -38,9 +328,10 @@ def _run_heartbeat():
     time.sleep(30)
     while True:
         try:
-            status = yahoo_browser.is_session_valid()
-            if status.get("valid"):
-                yahoo_browser.refresh_session()
+            with upstream_budget.background():
+                status = yahoo_browser.is_session_valid()
+                if status.get("valid"):
+                    yahoo_browser.refresh_session()
         except Exception as e:
             print("Heartbeat error: " + str(e))
         time.sleep(HEARTBEAT_INTERVAL)
@@ -48,9 +339,6 @@ def _run_heartbeat():
 
 import threading
 
-_heartbeat_thread = threading.Thread(target=_run_heartbeat, daemon=True)
-_heartbeat_thread.start()
-
 
 # --- Startup projection fetch ---
 
@@ -59,14 +347,140 @@ def _startup_projections():
     import time
     time.sleep(5)  # Let other startup tasks settle
     try:
-        valuations.ensure_projections()
+        with upstream_budget.background():
+            worker_pools.call("analytics", valuations.ensure_projections)
         print("Startup projections loaded successfully")
     except Exception as e:
         print("Startup projections failed: " + str(e))
 
 
-_proj_thread = threading.Thread(target=_startup_projections, daemon=True)
-_proj_thread.start()
+# --- Change feed snapshots (/api/changes) ---
+# Snapshot league state every CHANGES_SNAPSHOT_INTERVAL seconds, and a few
+# seconds after a write reports what it changed.
+
+# Which change-feed kinds each invalidation event makes worth re-reading
+CHANGE_EVENT_KINDS = {
+    "roster_changed": ("roster", "transactions", "injuries"),
+    "fa_pool_changed": ("transactions",),
+    "trades_changed": ("transactions",),
+}
+# Seconds to wait after a write before snapshotting (let Yahoo catch up)
+CHANGES_WRITE_DELAY = 5
+
+_changes_pending = set()
+_changes_lock = threading.Lock()
+_changes_wake = threading.Event()
+
+
+def _queue_change_snapshot(kinds):
+    with _changes_lock:
+        _changes_pending.update(kinds)
+    _changes_wake.set()
+
+
+for _event, _kinds in CHANGE_EVENT_KINDS.items():
+    invalidation.subscribe(_event, lambda _kinds=_kinds, **payload: _queue_change_snapshot(_kinds))
+
+
+def _run_change_snapshots():
+    """Background loop that records league-state diffs for /api/changes"""
+    time.sleep(20)  # Let startup settle
+    next_full = 0
+    while True:
+        # Writes handled by other workers reach this one through the log
+        invalidation.poll()
+        now = time.time()
+        with _changes_lock:
+            kinds = set(_changes_pending)
+            _changes_pending.clear()
+        if now >= next_full:
+            kinds = set(change_feed.KINDS)
+            next_full = now + change_feed.CHANGES_SNAPSHOT_INTERVAL
+        elif kinds:
+            time.sleep(CHANGES_WRITE_DELAY)
+        if kinds:
+            try:
+                with upstream_budget.background():
+                    change_feed.snapshot([k for k in change_feed.KINDS if k in kinds])
+            except Exception as e:
+                print("Change feed snapshot error: " + str(e))
+        _changes_wake.wait(30)
+        _changes_wake.clear()
+
+
+# --- Process lifecycle ---
+# Nothing starts threads at import: under gunicorn the app is preloaded in the
+# master and forked, and threads (plus any lock they hold) don't survive fork.
+# The dev server calls start_background_tasks() from __main__; gunicorn.conf.py
+# calls warm_state() in the master and claim_background_tasks() in each worker.
+
+WARM_SAVANT = os.environ.get("API_WARM_SAVANT", "1") == "1"
+BACKGROUND_LOCK_FILE = os.path.join(
+    os.environ.get("DATA_DIR", "/app/data"), ".api-background.lock"
+)
+
+_background_started = False
+_background_lock_file = None
+
+
+def start_background_tasks():
+    """Start the heartbeat, projection, change feed and CLI daemon threads (once per process)"""
+    global _background_started
+    if _background_started:
+        return
+    _background_started = True
+    threading.Thread(target=_run_heartbeat, daemon=True).start()
+    threading.Thread(target=_startup_projections, daemon=True).start()
+    threading.Thread(target=_run_change_snapshots, daemon=True).start()
+    cli_daemon.start()
+
+
+def claim_background_tasks():
+    """Run background tasks in exactly one worker process.
+
+    Each worker waits on an exclusive flock; the holder runs the tasks. The
+    lock is released when that worker exits, so a surviving or replacement
+    worker takes over.
+    """
+    import fcntl
+
+    def _wait_for_lock():
+        global _background_lock_file
+        try:
+            os.makedirs(os.path.dirname(BACKGROUND_LOCK_FILE), exist_ok=True)
+            lock_file = open(BACKGROUND_LOCK_FILE, "a")
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        except Exception as e:
+            print("Warning: background task lock failed, not starting tasks: " + str(e))
+            return
+        # Keep the file open for the life of the process to hold the lock
+        _background_lock_file = lock_file
+        print("Background tasks running in worker " + str(os.getpid()))
+        start_background_tasks()
+
+    threading.Thread(target=_wait_for_lock, daemon=True).start()
+
+
+def warm_state():
+    """Load read-mostly data before workers fork so they share it copy-on-write:
+    every command module, projection frames, the MLB ID map and (optionally)
+    the Savant leaderboards.
+    """
+    import mlb_id_cache
+    lazy_modules.preload()
+    try:
+        valuations.load_hitters_csv()
+        valuations.load_pitchers_csv()
+    except Exception as e:
+        print("Warning: could not preload projections: " + str(e))
+    # Stale leaderboards refresh inline: threads started here don't survive the fork
+    with upstream_budget.background(), data_cache.inline():
+        mlb_id_cache.warm()
+        if WARM_SAVANT:
+            for player_type in ("batter", "pitcher"):
+                intel._fetch_savant_expected(player_type)
+                intel._fetch_savant_statcast(player_type)
+                intel._fetch_savant_percentile_rankings(player_type)
 
 
 # --- Health check ---
@@ -74,7 +488,182 @@ _proj_thread.start()
 
 @app.route("/api/health")
 def health():
-    return jsonify({"status": "ok"})
+    return jsonify({"status": "ok", "modules": lazy_modules.get_stats()})
+
+
+@app.route("/api/metrics")
+def api_metrics():
+    cache_stats = response_cache.get_stats()
+    flight_stats = singleflight.get_stats()
+    budget_stats = upstream_budget.get_stats()
+    pool_stats = worker_pools.get_stats()["pools"]
+    admission_stats = admission.get_stats()
+    cache_data_stats = data_cache.get_stats()
+    wants_json = (
+        request.args.get("format") == "json"
+        or request.accept_mimetypes.best == "application/json"
+    )
+    if wants_json:
+        return jsonify(metrics.snapshot({
+            "response_cache": cache_stats,
+            "singleflight": flight_stats,
+            "upstream_budget": budget_stats,
+            "invalidation": invalidation.get_stats(),
+            "cli_daemon": cli_daemon.get_stats(),
+            "worker_pools": worker_pools.get_stats(),
+            "serializer": serializer.get_stats(),
+            "admission": admission_stats,
+            "data_cache": cache_data_stats,
+            "modules": lazy_modules.get_stats(),
+        }))
+    extra = {
+        "fbb_response_cache_entries": ("gauge", {(): cache_stats.get("entries", 0)}),
+        "fbb_response_cache_hits_total": ("counter", {(): cache_stats.get("hits", 0)}),
+        "fbb_response_cache_misses_total": ("counter", {(): cache_stats.get("misses", 0)}),
+        "fbb_singleflight_calls_total": ("counter", {
+            (("group", name),): st.get("calls", 0) for name, st in flight_stats.items()
+        }),
+        "fbb_singleflight_shared_total": ("counter", {
+            (("group", name),): st.get("shared", 0) for name, st in flight_stats.items()
+        }),
+        "fbb_upstream_budget_tokens": ("gauge", {
+            (("upstream", kind),): st["tokens"] for kind, st in budget_stats.items()
+        }),
+        "fbb_upstream_budget_utilization": ("gauge", {
+            (("upstream", kind),): st["utilization"] for kind, st in budget_stats.items()
+        }),
+        "fbb_upstream_budget_calls_last_minute": ("gauge", {
+            (("upstream", kind),): st["calls_last_minute"] for kind, st in budget_stats.items()
+        }),
+        "fbb_upstream_budget_waiting": ("gauge", {
+            (("upstream", kind), ("priority", priority)): n
+            for kind, st in budget_stats.items()
+            for priority, n in st["waiting"].items()
+        }),
+        "fbb_upstream_budget_wait_seconds_total": ("counter", {
+            (("upstream", kind),): st["wait_seconds"] for kind, st in budget_stats.items()
+        }),
+        "fbb_upstream_budget_rejected_total": ("counter", {
+            (("upstream", kind),): st["rejected"] for kind, st in budget_stats.items()
+        }),
+        "fbb_upstream_budget_throttled_total": ("counter", {
+            (("upstream", kind),): st["throttled"] for kind, st in budget_stats.items()
+        }),
+        "fbb_upstream_budget_cooldown_seconds": ("gauge", {
+            (("upstream", kind),): st["cooldown_seconds"] for kind, st in budget_stats.items()
+        }),
+        "fbb_admission_active": ("gauge", {
+            (("class", name),): st["active"] for name, st in admission_stats.items()
+        }),
+        "fbb_admission_queue_depth": ("gauge", {
+            (("class", name),): st["waiting"] for name, st in admission_stats.items()
+        }),
+        "fbb_admission_admitted_total": ("counter", {
+            (("class", name),): st["admitted"] for name, st in admission_stats.items()
+        }),
+        "fbb_admission_wait_seconds_total": ("counter", {
+            (("class", name),): st["wait_seconds"] for name, st in admission_stats.items()
+        }),
+        "fbb_admission_max_wait_seconds": ("gauge", {
+            (("class", name),): st["max_wait_seconds"] for name, st in admission_stats.items()
+        }),
+        "fbb_admission_rejected_total": ("counter", {
+            (("class", name), ("reason", reason)): st["rejected_" + reason]
+            for name, st in admission_stats.items()
+            for reason in ("full", "timeout")
+        }),
+        "fbb_data_cache_bytes": ("gauge", {
+            (("namespace", name),): st["bytes"] for name, st in cache_data_stats["namespaces"].items()
+        }),
+        "fbb_data_cache_entries": ("gauge", {
+            (("namespace", name),): st["entries"] for name, st in cache_data_stats["namespaces"].items()
+        }),
+        "fbb_data_cache_hits_total": ("counter", {
+            (("namespace", name), ("tier", tier)): st[counter]
+            for name, st in cache_data_stats["namespaces"].items()
+            for tier, counter in (("memory", "hits"), ("disk", "disk_hits"))
+        }),
+        "fbb_data_cache_misses_total": ("counter", {
+            (("namespace", name),): st["misses"] for name, st in cache_data_stats["namespaces"].items()
+        }),
+        "fbb_data_cache_evictions_total": ("counter", {
+            (("namespace", name),): st["evictions"] for name, st in cache_data_stats["namespaces"].items()
+        }),
+        "fbb_worker_pool_busy": ("gauge", {
+            (("pool", name),): st["busy"] for name, st in pool_stats.items()
+        }),
+        "fbb_worker_pool_waiting": ("gauge", {
+            (("pool", name),): st["waiting"] for name, st in pool_stats.items()
+        }),
+        "fbb_worker_pool_jobs_total": ("counter", {
+            (("pool", name),): st["jobs"] for name, st in pool_stats.items()
+        }),
+        "fbb_worker_pool_errors_total": ("counter", {
+            (("pool", name),): st["errors"] for name, st in pool_stats.items()
+        }),
+        "fbb_worker_pool_timeouts_total": ("counter", {
+            (("pool", name),): st["timeouts"] for name, st in pool_stats.items()
+        }),
+        "fbb_worker_pool_crashes_total": ("counter", {
+            (("pool", name),): st["crashes"] for name, st in pool_stats.items()
+        }),
+        "fbb_worker_pool_recycled_total": ("counter", {
+            (("pool", name),): st["recycled"] for name, st in pool_stats.items()
+        }),
+    }
+    return Response(
+        metrics.prometheus_text(extra),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@app.route("/api/cache")
+def api_cache():
+    result = data_cache.get_stats()
+    result["disk"] = data_cache.disk_usage()
+    return jsonify(result)
+
+
+@app.route("/api/cache/<namespace>")
+def api_cache_namespace(namespace):
+    try:
+        limit = int(request.args.get("limit", "100"))
+        stats = data_cache.get_stats()["namespaces"].get(namespace)
+        if stats is None:
+            return jsonify({"error": "Unknown cache namespace: " + namespace}), 404
+        stats["name"] = namespace
+        stats["recent"] = data_cache.entries(namespace, limit)
+        return jsonify(stats)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route("/api/cache/flush", methods=["POST"])
+def api_cache_flush():
+    try:
+        data = request.get_json(force=True, silent=True) or request.form
+        namespace = data.get("namespace") or None
+        try:
+            dropped = data_cache.flush(namespace)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"success": True, "namespace": namespace, "flushed": dropped})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/changes")
+def api_changes():
+    try:
+        kinds = [k.strip() for k in request.args.get("kinds", "").split(",") if k.strip()]
+        try:
+            limit = int(request.args.get("limit", "500"))
+            result = change_feed.changes_since(request.args.get("since"), kinds or None, limit)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
 
 @app.route("/api/browser-login-status")
@@ -168,6 +757,45 @@ def api_search():
         return jsonify({"error": str(e)}), 500
 
 
+def _write_succeeded(result):
+    """True if a write cmd_* reported success (for set-lineup, any move)"""
+    if not isinstance(result, dict):
+        return False
+    if result.get("success"):
+        return True
+    return any(m.get("success") for m in result.get("moves") or [] if isinstance(m, dict))
+
+
+def _roster_moved(result):
+    """Publish invalidations after an add/drop/swap"""
+    if _write_succeeded(result):
+        invalidation.roster_changed(league_context.TEAM_ID)
+        invalidation.fa_pool_changed()
+
+
+# Browser writes that outlived their request: the route already answered
+# with a timeout, so publish what it would have on success
+_ROSTER_WRITES = ("add_player", "drop_player", "swap_players", "waiver_claim", "waiver_claim_swap")
+_TRADE_WRITES = ("propose_trade", "accept_trade", "reject_trade")
+
+
+def _drained_write(module_name, func_name, result):
+    if module_name != "yahoo_browser" or not _write_succeeded(result):
+        return
+    if func_name in _ROSTER_WRITES:
+        invalidation.roster_changed(league_context.TEAM_ID)
+        invalidation.fa_pool_changed()
+    elif func_name == "set_lineup":
+        invalidation.roster_changed(league_context.TEAM_ID)
+    elif func_name in _TRADE_WRITES:
+        invalidation.trades_changed()
+        if func_name == "accept_trade":
+            invalidation.roster_changed(None)
+
+
+worker_pools.on_drained(_drained_write)
+
+
 @app.route("/api/add", methods=["POST"])
 def api_add():
     try:
@@ -179,6 +807,7 @@ def api_add():
         if not player_id:
             return jsonify({"error": "Missing player_id"}), 400
         result = yahoo_fantasy.cmd_add([player_id], as_json=True)
+        _roster_moved(result)
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -194,6 +823,7 @@ def api_drop():
         if not player_id:
             return jsonify({"error": "Missing player_id"}), 400
         result = yahoo_fantasy.cmd_drop([player_id], as_json=True)
+        _roster_moved(result)
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -212,6 +842,7 @@ def api_swap():
         if not add_id or not drop_id:
             return jsonify({"error": "Missing add_id and/or drop_id"}), 400
         result = yahoo_fantasy.cmd_swap([add_id, drop_id], as_json=True)
+        _roster_moved(result)
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -379,7 +1010,8 @@ def api_projections_update():
     try:
         data = request.get_json(silent=True) or {}
         proj_type = data.get("proj_type", "steamer")
-        result = valuations.ensure_projections(proj_type=proj_type, force=True)
+        result = worker_pools.call("analytics", valuations.ensure_projections, proj_type=proj_type, force=True)
+        invalidation.projections_changed()
         return jsonify({"status": "ok", "result": result})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -397,6 +1029,8 @@ def api_lineup_optimize():
         if apply_flag.lower() == "true":
             args.append("--apply")
         result = season_manager.cmd_lineup_optimize(args, as_json=True)
+        if args and isinstance(result, dict) and result.get("applied") and result.get("suggested_swaps"):
+            invalidation.roster_changed(league_context.TEAM_ID)
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -529,6 +1163,8 @@ def api_propose_trade():
         if note:
             args.append(note)
         result = season_manager.cmd_propose_trade(args, as_json=True)
+        if _write_succeeded(result):
+            invalidation.trades_changed()
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -546,6 +1182,10 @@ def api_accept_trade():
         if note:
             args.append(note)
         result = season_manager.cmd_accept_trade(args, as_json=True)
+        if _write_succeeded(result):
+            invalidation.trades_changed()
+            # Our roster changes once the trade processes, and so does theirs
+            invalidation.roster_changed(None)
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -563,6 +1203,8 @@ def api_reject_trade():
         if note:
             args.append(note)
         result = season_manager.cmd_reject_trade(args, as_json=True)
+        if _write_succeeded(result):
+            invalidation.trades_changed()
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -585,6 +1227,8 @@ def api_set_lineup():
         if not args:
             return jsonify({"error": "No valid moves provided"}), 400
         result = season_manager.cmd_set_lineup(args, as_json=True)
+        if _write_succeeded(result):
+            invalidation.roster_changed(league_context.TEAM_ID)
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -605,6 +1249,7 @@ def api_waiver_claim():
         if faab is not None:
             args.append(str(faab))
         result = yahoo_fantasy.cmd_waiver_claim(args, as_json=True)
+        _roster_moved(result)
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -623,6 +1268,7 @@ def api_waiver_claim_swap():
         if faab is not None:
             args.append(str(faab))
         result = yahoo_fantasy.cmd_waiver_claim_swap(args, as_json=True)
+        _roster_moved(result)
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1019,6 +1665,92 @@ def _safe_call(fn, args=None):
         return {"_error": str(e)}
 
 
+# Streaming: ?stream=1 emits NDJSON, ?stream=sse (or Accept: text/event-stream)
+# emits SSE. Each section is written as soon as it finishes; the synthesized
+# summary (action_items / issues / pairs) needs every section, so it comes last.
+
+
+def _stream_format():
+    """Streaming format requested for a workflow route: 'ndjson', 'sse' or None"""
+    mode = request.args.get("stream", "").strip().lower()
+    if mode in ("", "0", "false", "no"):
+        return None
+    if mode == "sse" or "text/event-stream" in request.headers.get("Accept", ""):
+        return "sse"
+    return "ndjson"
+
+
+def _stream_workflow(fmt, sections, summarize=None):
+    """Build a streaming Response for workflow sections.
+
+    NDJSON lines are {"section": name, "data": ...} followed by {"done": true}.
+    SSE events are named after the section with the data as JSON, followed
+    by a "done" event. If the deadline cut sections off, the done payload
+    also has "partial": true and "timed_out": [names].
+    """
+    # Submit now, while the request's context vars are active
+    results_iter = workflow.iter_sections(sections)
+    spec = g.get("projection")
+
+    def encode(name, data):
+        if fmt == "sse":
+            return "event: " + name + "\ndata: " + app.json.dumps(data) + "\n\n"
+        return app.json.dumps({"section": name, "data": data}) + "\n"
+
+    def generate():
+        results = {}
+        for name, result in results_iter:
+            results[name] = result
+            keep, data = projection.apply_section(spec, name, result)
+            if keep:
+                yield encode(name, data)
+        if summarize is not None:
+            try:
+                for name, data in summarize(results):
+                    keep, data = projection.apply_section(spec, name, data)
+                    if keep:
+                        yield encode(name, data)
+            except Exception as e:
+                yield encode("error", {"error": str(e)})
+        done = _partial_marker(results)
+        if fmt == "sse":
+            yield "event: done\ndata: " + app.json.dumps(done) + "\n\n"
+        else:
+            done["done"] = True
+            yield app.json.dumps(done) + "\n"
+
+    mimetype = "text/event-stream" if fmt == "sse" else "application/x-ndjson"
+    response = Response(generate(), mimetype=mimetype)
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _partial_marker(results, extra_timed_out=None):
+    """{"partial": true, "timed_out": [...]} if any section timed out, else {}"""
+    timed_out = workflow.timed_out(results) + list(extra_timed_out or [])
+    if not timed_out:
+        return {}
+    return {"partial": True, "timed_out": timed_out}
+
+
+def _run_workflow(sections, summarize=None):
+    """Run workflow sections and respond with one JSON document, or stream
+    them if the request asked for it. summarize(results) returns a list of
+    (key, value) pairs placed alongside the sections.
+    """
+    fmt = _stream_format()
+    if fmt:
+        return _stream_workflow(fmt, sections, summarize)
+    results = workflow.run_sections(sections)
+    doc = {}
+    if summarize is not None:
+        doc.update(summarize(results))
+    doc.update(results)
+    doc.update(_partial_marker(results))
+    return jsonify(doc)
+
+
 def _synthesize_morning_actions(injury, lineup, whats_new, waiver_b, waiver_p):
     """Build priority-ranked action items from morning briefing data"""
     actions = []
@@ -1086,29 +1818,25 @@ def _synthesize_morning_actions(injury, lineup, whats_new, waiver_b, waiver_p):
 
 @app.route("/api/workflow/morning-briefing")
 def workflow_morning_briefing():
-    try:
-        injury = _safe_call(season_manager.cmd_injury_report)
-        lineup = _safe_call(season_manager.cmd_lineup_optimize)
-        matchup = _safe_call(yahoo_fantasy.cmd_matchup_detail)
-        strategy = _safe_call(season_manager.cmd_matchup_strategy)
-        whats_new = _safe_call(season_manager.cmd_whats_new)
-        waiver_b = _safe_call(season_manager.cmd_waiver_analyze, ["B", "5"])
-        waiver_p = _safe_call(season_manager.cmd_waiver_analyze, ["P", "5"])
+    def summarize(sections):
+        return [("action_items", _synthesize_morning_actions(
+            sections.get("injury"),
+            sections.get("lineup"),
+            sections.get("whats_new"),
+            sections.get("waiver_batters"),
+            sections.get("waiver_pitchers"),
+        ))]
 
-        action_items = _synthesize_morning_actions(
-            injury, lineup, whats_new, waiver_b, waiver_p
-        )
-
-        return jsonify({
-            "action_items": action_items,
-            "injury": injury,
-            "lineup": lineup,
-            "matchup": matchup,
-            "strategy": strategy,
-            "whats_new": whats_new,
-            "waiver_batters": waiver_b,
-            "waiver_pitchers": waiver_p,
-        })
+    try:
+        return _run_workflow([
+            ("injury", season_manager.cmd_injury_report, None),
+            ("lineup", season_manager.cmd_lineup_optimize, None),
+            ("matchup", yahoo_fantasy.cmd_matchup_detail, None),
+            ("strategy", season_manager.cmd_matchup_strategy, None),
+            ("whats_new", season_manager.cmd_whats_new, None),
+            ("waiver_batters", season_manager.cmd_waiver_analyze, ["B", "5"]),
+            ("waiver_pitchers", season_manager.cmd_waiver_analyze, ["P", "5"]),
+        ], summarize)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1116,23 +1844,15 @@ def workflow_morning_briefing():
 @app.route("/api/workflow/league-landscape")
 def workflow_league_landscape():
     try:
-        standings = _safe_call(yahoo_fantasy.cmd_standings)
-        pace = _safe_call(season_manager.cmd_season_pace)
-        power = _safe_call(season_manager.cmd_power_rankings)
-        pulse = _safe_call(yahoo_fantasy.cmd_league_pulse)
-        transactions = _safe_call(yahoo_fantasy.cmd_transactions, ["", "15"])
-        trade_finder = _safe_call(season_manager.cmd_trade_finder)
-        scoreboard = _safe_call(yahoo_fantasy.cmd_scoreboard)
-
-        return jsonify({
-            "standings": standings,
-            "pace": pace,
-            "power_rankings": power,
-            "league_pulse": pulse,
-            "transactions": transactions,
-            "trade_finder": trade_finder,
-            "scoreboard": scoreboard,
-        })
+        return _run_workflow([
+            ("standings", yahoo_fantasy.cmd_standings, None),
+            ("pace", season_manager.cmd_season_pace, None),
+            ("power_rankings", season_manager.cmd_power_rankings, None),
+            ("league_pulse", yahoo_fantasy.cmd_league_pulse, None),
+            ("transactions", yahoo_fantasy.cmd_transactions, ["", "15"]),
+            ("trade_finder", season_manager.cmd_trade_finder, None),
+            ("scoreboard", yahoo_fantasy.cmd_scoreboard, None),
+        ])
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1190,21 +1910,21 @@ def _synthesize_roster_issues(injury, lineup, roster, busts):
 
 @app.route("/api/workflow/roster-health")
 def workflow_roster_health():
-    try:
-        injury = _safe_call(season_manager.cmd_injury_report)
-        lineup = _safe_call(season_manager.cmd_lineup_optimize)
-        roster = _safe_call(yahoo_fantasy.cmd_roster)
-        busts = _safe_call(intel.cmd_busts, ["B", "20"])
+    def summarize(sections):
+        return [("issues", _synthesize_roster_issues(
+            sections.get("injury"),
+            sections.get("lineup"),
+            sections.get("roster"),
+            sections.get("busts"),
+        ))]
 
-        issues = _synthesize_roster_issues(injury, lineup, roster, busts)
-
-        return jsonify({
-            "issues": issues,
-            "injury": injury,
-            "lineup": lineup,
-            "roster": roster,
-            "busts": busts,
-        })
+    try:
+        return _run_workflow([
+            ("injury", season_manager.cmd_injury_report, None),
+            ("lineup", season_manager.cmd_lineup_optimize, None),
+            ("roster", yahoo_fantasy.cmd_roster, None),
+            ("busts", intel.cmd_busts, ["B", "20"]),
+        ], summarize)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1236,22 +1956,20 @@ def _synthesize_waiver_pairs(waiver_b, waiver_p):
 
 @app.route("/api/workflow/waiver-recommendations")
 def workflow_waiver_recommendations():
+    def summarize(sections):
+        return [("pairs", _synthesize_waiver_pairs(
+            sections.get("waiver_batters"),
+            sections.get("waiver_pitchers"),
+        ))]
+
     try:
         count = request.args.get("count", "5")
-        cat_check = _safe_call(season_manager.cmd_category_check)
-        waiver_b = _safe_call(season_manager.cmd_waiver_analyze, ["B", count])
-        waiver_p = _safe_call(season_manager.cmd_waiver_analyze, ["P", count])
-        roster = _safe_call(yahoo_fantasy.cmd_roster)
-
-        pairs = _synthesize_waiver_pairs(waiver_b, waiver_p)
-
-        return jsonify({
-            "pairs": pairs,
-            "category_check": cat_check,
-            "waiver_batters": waiver_b,
-            "waiver_pitchers": waiver_p,
-            "roster": roster,
-        })
+        return _run_workflow([
+            ("category_check", season_manager.cmd_category_check, None),
+            ("waiver_batters", season_manager.cmd_waiver_analyze, ["B", count]),
+            ("waiver_pitchers", season_manager.cmd_waiver_analyze, ["P", count]),
+            ("roster", yahoo_fantasy.cmd_roster, None),
+        ], summarize)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1265,77 +1983,244 @@ def workflow_trade_analysis():
         if not give_names or not get_names:
             return jsonify({"error": "Missing give_names and/or get_names arrays"}), 400
 
-        # Resolve player names to IDs via value lookup
+        # One valuations load, one Yahoo ID index, intel for all names in parallel
+        resolved = player_resolver.resolve(give_names + get_names)
+
         give_players = []
         get_players = []
         give_ids = []
         get_ids = []
-
-        # Fetch roster once for give-player ID lookups
-        roster = _safe_call(yahoo_fantasy.cmd_roster)
-        roster_players = (roster or {}).get("players", [])
-
-        for name in give_names:
-            try:
-                val = valuations.cmd_value([name], as_json=True)
-                players = val.get("players", [])
-                if players:
-                    p = players[0]
-                    give_players.append(p)
-                    for rp in roster_players:
-                        if str(rp.get("name", "")).lower() == str(p.get("name", "")).lower():
-                            give_ids.append(str(rp.get("player_id", "")))
-                            break
-            except Exception:
-                give_players.append({"name": name, "_error": "not found"})
-
-        for name in get_names:
-            try:
-                val = valuations.cmd_value([name], as_json=True)
-                players = val.get("players", [])
-                if players:
-                    p = players[0]
-                    get_players.append(p)
-                    # Try search for player ID
-                    search = _safe_call(yahoo_fantasy.cmd_search, [name])
-                    for rp in (search or {}).get("results", []):
-                        if str(rp.get("name", "")).lower() == str(p.get("name", "")).lower():
-                            get_ids.append(str(rp.get("player_id", "")))
-                            break
-            except Exception:
-                get_players.append({"name": name, "_error": "not found"})
-
-        # Run trade eval if we have IDs
+        intel_data = {}
+        timed_out = []
+        for names, players, ids, own_side in (
+            (give_names, give_players, give_ids, True),
+            (get_names, get_players, get_ids, False),
+        ):
+            for name in names:
+                r = resolved.get(name) or {}
+                p = r.get("player")
+                if p is None:
+                    players.append({"name": name, "_error": "not found"})
+                else:
+                    packet = r.get("intel")
+                    if isinstance(packet, dict) and not packet.get("_error"):
+                        p["intel"] = {
+                            k: packet.get(k) for k in ("name", "mlb_id", "statcast", "trends") if k in packet
+                        }
+                    players.append(p)
+                # Give-side players must be on our roster
+                if r.get("player_id") and (r.get("yahoo_source") == "roster") == own_side:
+                    ids.append(r.get("player_id"))
+                intel_data[name] = r.get("intel") or {"_error": "unavailable"}
+                for part in r.get("timed_out", []):
+                    label = "yahoo_ids" if part == "yahoo" else part + ":" + name
+                    if label not in timed_out:
+                        timed_out.append(label)
+
+        # Run trade eval if we have IDs (as a section, so the deadline applies)
         trade_eval = None
+        evaluated = {}
         if give_ids and get_ids:
-            try:
-                trade_eval = season_manager.cmd_trade_eval(
-                    [",".join(give_ids), ",".join(get_ids)], as_json=True
-                )
-            except Exception as e:
-                trade_eval = {"_error": str(e)}
+            evaluated = workflow.run_sections([
+                ("trade_eval", season_manager.cmd_trade_eval, [",".join(give_ids), ",".join(get_ids)]),
+            ])
+            trade_eval = evaluated["trade_eval"]
 
-        # Get intel for each player
-        all_names = give_names + get_names
-        intel_data = {}
-        for name in all_names:
-            try:
-                intel_data[name] = intel.cmd_player_report([name], as_json=True)
-            except Exception:
-                intel_data[name] = {"_error": "unavailable"}
-
-        return jsonify({
+        doc = {
             "give_players": give_players,
             "get_players": get_players,
             "give_ids": give_ids,
             "get_ids": get_ids,
             "trade_eval": trade_eval,
             "intel": intel_data,
-        })
+        }
+        doc.update(_partial_marker(evaluated, timed_out))
+        return jsonify(doc)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# --- Batch endpoint ---
+# POST /api/batch {"requests": [{"id": "r", "path": "/api/roster", "params": {...}}]}
+# (or {"requests": {"r": {"path": ..., "params": ...}}}). Sub-requests are
+# dispatched in-process through the normal routing/cache/coalescing hooks on
+# the batch pool, sharing this request's LeagueContext. Only GET routes are
+# allowed; streaming is ignored.
+
+BATCH_MAX_REQUESTS = int(os.environ.get("BATCH_MAX_REQUESTS", "50"))
+BATCH_TIMEOUT = float(os.environ.get("BATCH_TIMEOUT", "90"))
+
+
+def _batch_call(sub, as_json=True):
+    """Dispatch one sub-request through Flask and return {status, data}"""
+    path, params = sub
+    # Fresh app context so each sub-request gets its own flask.g
+    with app.app_context(), app.test_request_context(path, method="GET", query_string=params):
+        response = app.full_dispatch_request()
+        data = response.get_json(silent=True)
+        if data is None:
+            data = response.get_data(as_text=True)
+        return {"status": response.status_code, "data": data}
+
+
+def _parse_batch(body):
+    """Normalize the batch body to a list of (key, path, params). Raises ValueError."""
+    reqs = body.get("requests") if isinstance(body, dict) else None
+    if isinstance(reqs, dict):
+        items = [(str(k), v) for k, v in reqs.items()]
+    elif isinstance(reqs, list):
+        items = [(str((r or {}).get("id", i)) if isinstance(r, dict) else str(i), r)
+                 for i, r in enumerate(reqs)]
+    else:
+        raise ValueError("Body must be {\"requests\": [...]} or {\"requests\": {...}}")
+    if len(items) > BATCH_MAX_REQUESTS:
+        raise ValueError("Too many sub-requests (max " + str(BATCH_MAX_REQUESTS) + ")")
+
+    parsed = []
+    seen = set()
+    for key, r in items:
+        if not isinstance(r, dict) or not isinstance(r.get("path"), str):
+            raise ValueError("Sub-request " + key + " needs a string path")
+        if key in seen:
+            raise ValueError("Duplicate sub-request id: " + key)
+        seen.add(key)
+        params = r.get("params") or {}
+        if not isinstance(params, dict):
+            raise ValueError("Sub-request " + key + " params must be an object")
+        params = {str(k): str(v) for k, v in params.items() if k != "stream" and v is not None}
+        parsed.append((key, r["path"], params))
+    return parsed
+
+
+def _batch_route_allowed(path):
+    """Only GET API routes, and never /api/batch itself"""
+    if not path.startswith("/api/") or path == "/api/batch":
+        return False
+    adapter = app.url_map.bind("localhost")
+    try:
+        adapter.match(path, method="GET")
+    except Exception:
+        return False
+    return True
+
+
+@app.route("/api/batch", methods=["POST"])
+def api_batch():
+    try:
+        try:
+            subs = _parse_batch(request.get_json(silent=True))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        results = {}
+        sections = []
+        for key, path, params in subs:
+            if _batch_route_allowed(path):
+                sections.append((key, _batch_call, (path, params)))
+            else:
+                results[key] = {"status": 404, "data": {"error": "Unknown or non-GET route: " + path}}
+
+        ran = workflow.run_sections(sections, timeout=BATCH_TIMEOUT, pool="batch")
+        partial = _partial_marker(ran)
+        for key, result in ran.items():
+            if isinstance(result, dict) and "_error" in result:
+                status = 504 if result.get("_timeout") else 500
+                result = {"status": status, "data": {"error": result["_error"]}}
+            results[key] = result
+
+        doc = {"results": {key: results.get(key) for key, _, _ in subs}}
+        doc.update(partial)
+        return jsonify(doc)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+# --- Admission control for expensive routes ---
+# Workflows, league-wide analyses and browser writes each get a concurrency
+# limit and a bounded queue (admission.py); overflow gets a 429 with
+# Retry-After. Applied inside the view so cache hits and coalesced waiters
+# never take a slot.
+
+
+def _admitted_view(view):
+    @functools.wraps(view)
+    def wrapper(**kwargs):
+        try:
+            slot = admission.admit(request.path, request.args)
+        except admission.Rejected as e:
+            response = jsonify({"error": str(e), "retry_after": e.retry_after})
+            response.status_code = 429
+            response.headers["Retry-After"] = str(e.retry_after)
+            return response
+        if slot is None:
+            return view(**kwargs)
+        try:
+            rv = app.make_response(view(**kwargs))
+        except BaseException:
+            slot.release()
+            raise
+        # A streamed workflow keeps its slot until the stream is closed
+        if rv.is_streamed:
+            rv.call_on_close(slot.release)
+        else:
+            slot.release()
+        return rv
+
+    return wrapper
+
+
+for _endpoint in list(app.view_functions):
+    if _endpoint != "static":
+        app.view_functions[_endpoint] = _admitted_view(app.view_functions[_endpoint])
+
+
+# --- Single-flight coalescing for identical concurrent GETs ---
+# Concurrent requests for the same route + args share one execution. Only
+# side-effect-free reads are coalesced: every cached route plus the GET
+# workflows (which are made of cached reads).
+
+COALESCED_ROUTES = set(response_cache.ROUTE_TTLS) | {
+    "/api/workflow/morning-briefing",
+    "/api/workflow/league-landscape",
+    "/api/workflow/roster-health",
+    "/api/workflow/waiver-recommendations",
+}
+
+_route_flight = singleflight.group("routes")
+
+
+def _coalesced_view(view):
+    """Wrap a view so concurrent identical requests run it once. The leader's
+    response is snapshotted to bytes so each waiter gets its own Response."""
+
+    @functools.wraps(view)
+    def wrapper(**kwargs):
+        # Streaming responses can't be snapshotted without buffering them
+        if request.args.get("stream"):
+            return view(**kwargs)
+
+        def run():
+            rv = app.make_response(view(**kwargs))
+            return rv.get_data(), rv.status_code, list(rv.headers.items()), g.get("response_uncacheable")
+
+        # Callers with different deadlines may get different (partial) results
+        fmt = serializer.negotiate(request.accept_mimetypes)
+        key = (response_cache.cache_key(request.path, request.args, fmt), request.headers.get("X-Deadline-Ms"))
+        body, status, headers, uncacheable = _route_flight.do(key, run)
+        # Waiters' after_request hooks run in their own context
+        if uncacheable:
+            g.response_uncacheable = True
+        return Response(body, status=status, headers=headers)
+
+    return wrapper
+
+
+for _rule in app.url_map.iter_rules():
+    if _rule.rule in COALESCED_ROUTES and "GET" in _rule.methods:
+        app.view_functions[_rule.endpoint] = _coalesced_view(app.view_functions[_rule.endpoint])
+
+
 if __name__ == "__main__":
+    start_background_tasks()
     port = int(os.environ.get("API_PORT", "8766"))
     app.run(host="0.0.0.0", port=port)
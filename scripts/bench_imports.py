@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Import-time Benchmark - Reports cold import cost per scripts/ module
+
+Each module is imported in a fresh interpreter with `python -X importtime`,
+so nothing is shared between measurements. Reports the module's cumulative
+import time and the heaviest dependencies it pulled in.
+
+Usage:
+  python3 bench_imports.py                    # table for all command modules
+  python3 bench_imports.py intel valuations   # specific modules
+  python3 bench_imports.py --json             # machine-readable output
+  python3 bench_imports.py --max-ms 1500      # exit 1 if any module exceeds this
+"""
+
+import os
+import sys
+import json
+import subprocess
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_MODULES = [
+    "api-server",
+    "yahoo-fantasy",
+    "season-manager",
+    "draft-assistant",
+    "mlb-data",
+    "valuations",
+    "history",
+    "intel",
+    "yahoo_browser",
+    "mlb_id_cache",
+]
+
+TOP_DEPS = 5
+RUNS = 3
+
+
+def _parse_importtime(stderr):
+    """Parse -X importtime output into a list of (cumulative_us, depth, name)"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            cumulative = int(parts[1].strip())
+        except ValueError:
+            continue  # header line
+        raw_name = parts[2]
+        stripped = raw_name.lstrip(" ")
+        depth = (len(raw_name) - len(stripped) - 1) // 2
+        rows.append((cumulative, depth, stripped.strip()))
+    return rows
+
+
+def measure(module):
+    """Import module in a fresh interpreter. Returns dict with total_ms and
+    top dependencies, or an error.
+    """
+    # __import__ goes through the C import path that -X importtime instruments
+    # (importlib.import_module does not); it also accepts hyphenated names
+    code = "__import__(" + repr(module) + ")"
+    best = None
+    for _ in range(RUNS):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=SCRIPTS_DIR,
+            capture_output=True,
+            text=True,
+            env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"),
+        )
+        rows = _parse_importtime(proc.stderr)
+        if proc.returncode != 0:
+            last = proc.stderr.strip().splitlines()[-1:] or ["import failed"]
+            return {"module": module, "error": last[0]}
+        total = 0
+        children = []
+        for idx, (cumulative, depth, name) in enumerate(rows):
+            if name == module and depth == 0:
+                total = cumulative
+                # Output is post-order: the module's direct imports are the
+                # depth-1 rows since the previous top-level row
+                for row in reversed(rows[:idx]):
+                    if row[1] == 0:
+                        break
+                    if row[1] == 1:
+                        children.append(row)
+        if best is None or total < best[0]:
+            best = (total, children)
+
+    total, children = best
+    deps = sorted(children, key=lambda r: r[0], reverse=True)[:TOP_DEPS]
+    return {
+        "module": module,
+        "total_ms": round(total / 1000.0, 1),
+        "top_deps": [{"name": name, "ms": round(us / 1000.0, 1)} for us, _, name in deps],
+    }
+
+
+def main(argv):
+    as_json = False
+    max_ms = None
+    modules = []
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg == "--json":
+            as_json = True
+        elif arg == "--max-ms" and i + 1 < len(argv):
+            max_ms = float(argv[i + 1])
+            i += 1
+        else:
+            modules.append(arg)
+        i += 1
+    if not modules:
+        modules = DEFAULT_MODULES
+
+    results = [measure(m) for m in modules]
+
+    if as_json:
+        print(json.dumps({"results": results}, indent=2))
+    else:
+        print("Cold import time (best of " + str(RUNS) + ")")
+        print("-" * 60)
+        for r in results:
+            if "error" in r:
+                print(r["module"].ljust(20) + "  ERROR: " + r["error"])
+                continue
+            print(r["module"].ljust(20) + str(r["total_ms"]).rjust(9) + " ms")
+            for dep in r["top_deps"]:
+                print("    " + dep["name"].ljust(28) + str(dep["ms"]).rjust(9) + " ms")
+
+    if max_ms is not None:
+        over = [r for r in results if r.get("total_ms", 0) > max_ms]
+        if over:
+            print("Over budget (" + str(max_ms) + " ms): " + ", ".join(r["module"] for r in over))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Serializer Benchmark - Encode time and size per encoder on a recorded payload
+
+Compares what Flask's stdlib encoder does today with serializer.py's
+orjson and MessagePack paths (each only if installed), reporting the best
+encode time over RUNS runs plus raw and gzipped sizes.
+
+Record a payload from a running api-server first (it is saved under
+DATA_DIR/bench/ and reused):
+
+  python3 bench_serializer.py --record                     # morning-briefing
+  python3 bench_serializer.py --record /api/rankings?count=200
+
+Then:
+
+  python3 bench_serializer.py                              # table
+  python3 bench_serializer.py --numpy                      # floats as numpy scalars,
+                                                           # like valuation output
+  python3 bench_serializer.py --file some.json --json
+"""
+
+import os
+import sys
+import json
+import gzip
+import time
+import urllib.request
+
+import serializer
+
+API_URL = os.environ.get("PYTHON_API_URL", "http://localhost:8766")
+DATA_DIR = os.environ.get("DATA_DIR", "/app/data")
+BENCH_DIR = os.path.join(DATA_DIR, "bench")
+DEFAULT_PATH = "/api/workflow/morning-briefing"
+
+RUNS = 20
+
+
+def _payload_file(path):
+    name = path.strip("/").split("?")[0].replace("/", "_") or "root"
+    return os.path.join(BENCH_DIR, name + ".json")
+
+
+def record(path):
+    """Fetch path from the running api-server and save the response body"""
+    with urllib.request.urlopen(API_URL + path, timeout=120) as resp:
+        body = resp.read()
+    json.loads(body)  # make sure it's JSON before saving
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    out = _payload_file(path)
+    with open(out, "wb") as f:
+        f.write(body)
+    return out, len(body)
+
+
+def _with_numpy(obj):
+    """Replace floats/ints with numpy scalars, as pandas-derived results carry"""
+    import numpy as np
+    if isinstance(obj, dict):
+        return {k: _with_numpy(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_with_numpy(v) for v in obj]
+    if isinstance(obj, bool):
+        return obj
+    if isinstance(obj, float):
+        return np.float64(obj)
+    if isinstance(obj, int):
+        return np.int64(obj)
+    return obj
+
+
+def _stdlib_flask(obj):
+    # What Flask's DefaultJSONProvider did (plus numpy conversion, which
+    # callers used to do by hand)
+    return json.dumps(obj, default=serializer.to_builtin, sort_keys=True,
+                      separators=(",", ":"), ensure_ascii=True).encode("utf-8")
+
+
+def _encoders():
+    encoders = [("stdlib json", _stdlib_flask)]
+    if serializer.orjson is not None:
+        encoders.append(("orjson", lambda obj: serializer.orjson.dumps(
+            obj, default=serializer.to_builtin, option=serializer._ORJSON_OPTIONS)))
+    if serializer.msgpack is not None:
+        encoders.append(("msgpack", serializer.pack))
+    return encoders
+
+
+def measure(obj):
+    results = []
+    for name, encode in _encoders():
+        best = None
+        body = b""
+        for _ in range(RUNS):
+            started = time.perf_counter()
+            body = encode(obj)
+            elapsed = time.perf_counter() - started
+            if best is None or elapsed < best:
+                best = elapsed
+        results.append({
+            "encoder": name,
+            "encode_ms": round(best * 1000, 3),
+            "bytes": len(body),
+            "gzip_bytes": len(gzip.compress(body, compresslevel=5)),
+        })
+    return results
+
+
+def main(argv):
+    as_json = False
+    use_numpy = False
+    path = DEFAULT_PATH
+    payload_file = None
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg == "--json":
+            as_json = True
+        elif arg == "--numpy":
+            use_numpy = True
+        elif arg == "--record":
+            if i + 1 < len(argv) and argv[i + 1].startswith("/"):
+                path = argv[i + 1]
+                i += 1
+            out, size = record(path)
+            print("Recorded " + path + " (" + str(size) + " bytes) to " + out)
+            return 0
+        elif arg == "--file" and i + 1 < len(argv):
+            payload_file = argv[i + 1]
+            i += 1
+        i += 1
+
+    payload_file = payload_file or _payload_file(path)
+    if not os.path.exists(payload_file):
+        print("No payload at " + payload_file + "; run with --record first")
+        return 1
+    with open(payload_file, "rb") as f:
+        obj = json.loads(f.read())
+    if use_numpy:
+        obj = _with_numpy(obj)
+
+    results = measure(obj)
+    if as_json:
+        print(json.dumps({"payload": payload_file, "numpy": use_numpy, "results": results}, indent=2))
+        return 0
+
+    print("Payload: " + payload_file + (" (numpy scalars)" if use_numpy else ""))
+    print("Best of " + str(RUNS) + " runs")
+    print("-" * 60)
+    print("encoder".ljust(14) + "encode ms".rjust(11) + "bytes".rjust(12) + "gzip bytes".rjust(13))
+    base = results[0]["encode_ms"] or None
+    for r in results:
+        speedup = ""
+        if base and r["encode_ms"]:
+            speedup = "  x" + str(round(base / r["encode_ms"], 1))
+        print(
+            r["encoder"].ljust(14) + str(r["encode_ms"]).rjust(11)
+            + str(r["bytes"]).rjust(12) + str(r["gzip_bytes"]).rjust(13) + speedup
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
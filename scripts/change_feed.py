@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""Change Feed - Entity-level diffs of league state for cheap client polling
+
+snapshot() reads our roster, the standings, recent transactions and our
+injury report, compares each entity (a player, a team, a transaction) with
+the previous snapshot in DATA_DIR/changes.db and records what was added,
+changed or removed under an increasing sequence number. changes_since(cursor)
+returns just those rows, so a client that polls /api/changes?since=<cursor>
+moves kilobytes instead of re-pulling whole documents.
+
+api-server's background worker snapshots every CHANGES_SNAPSHOT_INTERVAL
+seconds, and sooner after a write publishes an invalidation event.
+"""
+
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+import importlib
+from datetime import datetime, timedelta
+
+import league_context
+
+DATA_DIR = os.environ.get("DATA_DIR", "/app/data")
+DB_FILE = os.path.join(DATA_DIR, "changes.db")
+
+CHANGES_SNAPSHOT_INTERVAL = int(os.environ.get("CHANGES_SNAPSHOT_INTERVAL", "900"))
+CHANGES_RETENTION_DAYS = int(os.environ.get("CHANGES_RETENTION_DAYS", "14"))
+
+KINDS = ("roster", "standings", "transactions", "injuries")
+
+# Most changes a single changes_since() call returns
+MAX_LIMIT = 1000
+
+_snapshot_lock = threading.Lock()
+
+
+def get_db():
+    """Get SQLite connection with tables initialized"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    db = sqlite3.connect(DB_FILE, timeout=10)
+    db.execute("""CREATE TABLE IF NOT EXISTS entities
+                  (kind TEXT, entity_id TEXT, data TEXT, updated_at TEXT,
+                   PRIMARY KEY (kind, entity_id))""")
+    db.execute("""CREATE TABLE IF NOT EXISTS changes
+                  (seq INTEGER PRIMARY KEY AUTOINCREMENT, at TEXT, kind TEXT,
+                   entity_id TEXT, op TEXT, data TEXT, changed_fields TEXT)""")
+    db.execute("""CREATE TABLE IF NOT EXISTS feed_state
+                  (key TEXT PRIMARY KEY, value TEXT)""")
+    db.commit()
+    return db
+
+
+# --- Entity extraction ---
+
+
+def _roster_entities(ctx):
+    result = {}
+    for p in ctx.roster() or []:
+        pid = str(p.get("player_id", ""))
+        if not pid:
+            continue
+        result[pid] = {
+            "name": p.get("name", ""),
+            "position": p.get("selected_position", {}).get("position", ""),
+            "eligible_positions": p.get("eligible_positions", []),
+            "status": p.get("status", ""),
+        }
+    return result
+
+
+def _standings_entities(ctx):
+    result = {}
+    for i, team in enumerate(ctx.standings() or [], 1):
+        key = str(team.get("team_key", "") or team.get("name", ""))
+        outcome = team.get("outcome_totals", {}) or {}
+        result[key] = {
+            "name": team.get("name", ""),
+            "rank": i,
+            "wins": outcome.get("wins", 0),
+            "losses": outcome.get("losses", 0),
+            "ties": outcome.get("ties", 0),
+            "points_for": team.get("points_for", ""),
+        }
+    return result
+
+
+def _transaction_entities(ctx):
+    result = {}
+    for tx_type in ("add", "drop", "trade"):
+        try:
+            transactions = ctx.transactions(tx_type, 25) or []
+        except Exception as e:
+            print("Warning: change feed could not read " + tx_type + " transactions: " + str(e))
+            continue
+        for t in transactions:
+            if not isinstance(t, dict):
+                continue
+            key = t.get("transaction_key") or t.get("transaction_id")
+            if not key:
+                raw = json.dumps(t, sort_keys=True, default=str)
+                key = hashlib.sha1(raw.encode()).hexdigest()[:16]
+            result[str(key)] = {
+                "type": t.get("type", tx_type),
+                "status": t.get("status", ""),
+                "timestamp": t.get("timestamp", ""),
+                "player": t.get("player", t.get("name", "")),
+                "team": t.get("team", ""),
+                "players": t.get("players", ""),
+            }
+    return result
+
+
+def _injury_entities(ctx):
+    # The injury report's classification only: no intel/game-log enrichment
+    season_manager = importlib.import_module("season-manager")
+    report = season_manager.injury_snapshot(ctx)
+    result = {}
+    for section in ("injured_active", "healthy_il", "injured_bench", "il_proper"):
+        for p in report.get(section, []):
+            data = dict(p)
+            data["section"] = section
+            result[str(p.get("name", ""))] = data
+    return result
+
+
+EXTRACTORS = {
+    "roster": _roster_entities,
+    "standings": _standings_entities,
+    "transactions": _transaction_entities,
+    "injuries": _injury_entities,
+}
+
+
+# --- Snapshots ---
+
+
+def _diff(db, kind, current, now):
+    """Record changes for one kind against the stored entities. Returns count."""
+    stored = {
+        row[0]: row[1]
+        for row in db.execute("SELECT entity_id, data FROM entities WHERE kind=?", (kind,))
+    }
+    recorded = 0
+    for entity_id, data in current.items():
+        encoded = json.dumps(data, sort_keys=True, default=str)
+        before = stored.pop(entity_id, None)
+        if before == encoded:
+            continue
+        if before is None:
+            op, fields = "added", None
+        else:
+            old = json.loads(before)
+            new = json.loads(encoded)
+            op = "changed"
+            fields = json.dumps(sorted(k for k in set(old) | set(new) if old.get(k) != new.get(k)))
+        db.execute(
+            "INSERT INTO changes (at, kind, entity_id, op, data, changed_fields) VALUES (?, ?, ?, ?, ?, ?)",
+            (now, kind, entity_id, op, encoded, fields),
+        )
+        db.execute(
+            "INSERT OR REPLACE INTO entities (kind, entity_id, data, updated_at) VALUES (?, ?, ?, ?)",
+            (kind, entity_id, encoded, now),
+        )
+        recorded += 1
+    # Transactions age out of Yahoo's recent list; that isn't a removal
+    if kind != "transactions":
+        for entity_id, before in stored.items():
+            db.execute(
+                "INSERT INTO changes (at, kind, entity_id, op, data, changed_fields) VALUES (?, ?, ?, 'removed', ?, NULL)",
+                (now, kind, entity_id, before),
+            )
+            db.execute("DELETE FROM entities WHERE kind=? AND entity_id=?", (kind, entity_id))
+            recorded += 1
+    return recorded
+
+
+def _prune(db, now):
+    cutoff = (datetime.fromisoformat(now) - timedelta(days=CHANGES_RETENTION_DAYS)).isoformat()
+    db.execute("DELETE FROM entities WHERE kind='transactions' AND updated_at < ?", (cutoff,))
+    row = db.execute("SELECT MAX(seq) FROM changes WHERE at < ?", (cutoff,)).fetchone()
+    if row and row[0]:
+        db.execute("DELETE FROM changes WHERE seq <= ?", (row[0],))
+        db.execute(
+            "INSERT OR REPLACE INTO feed_state (key, value) VALUES ('pruned_through', ?)",
+            (str(row[0]),),
+        )
+
+
+def snapshot(kinds=None, ctx=None):
+    """Snapshot league state and record entity diffs.
+    Returns dict kind -> number of changes recorded (or {"error": ...}).
+    """
+    kinds = [k for k in (kinds or KINDS) if k in EXTRACTORS]
+    ctx = league_context.resolve(ctx)
+    results = {}
+    with _snapshot_lock:
+        db = get_db()
+        try:
+            for kind in kinds:
+                try:
+                    current = EXTRACTORS[kind](ctx)
+                except Exception as e:
+                    # A failed read must not look like every entity was removed
+                    print("Warning: change feed snapshot failed for " + kind + ": " + str(e))
+                    results[kind] = {"error": str(e)}
+                    continue
+                now = datetime.now().isoformat()
+                results[kind] = _diff(db, kind, current, now)
+                db.execute(
+                    "INSERT OR REPLACE INTO feed_state (key, value) VALUES (?, ?)",
+                    ("snapshot_at:" + kind, now),
+                )
+                db.commit()
+            _prune(db, datetime.now().isoformat())
+            db.commit()
+        finally:
+            db.close()
+    return results
+
+
+# --- Reading ---
+
+
+def _state(db):
+    return {row[0]: row[1] for row in db.execute("SELECT key, value FROM feed_state")}
+
+
+def changes_since(cursor=None, kinds=None, limit=500):
+    """Changes after cursor (a seq number as returned in "cursor").
+
+    No cursor: returns only the current cursor, for a client to start from.
+    "reset": true means the cursor is older than the retained history and
+    the client should refetch full documents before polling again.
+    """
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    kinds = [k for k in (kinds or KINDS) if k in KINDS]
+    db = get_db()
+    try:
+        latest = db.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+        state = _state(db)
+        result = {
+            "cursor": str(latest),
+            "changes": [],
+            "has_more": False,
+            "reset": False,
+            "snapshot_at": {k: state.get("snapshot_at:" + k) for k in kinds},
+        }
+        if cursor in (None, ""):
+            return result
+        try:
+            since = int(cursor)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor: " + str(cursor))
+        pruned_through = int(state.get("pruned_through", "0"))
+        if since < pruned_through or since > latest:
+            result["reset"] = True
+            return result
+
+        placeholders = ",".join("?" for _ in kinds)
+        rows = db.execute(
+            "SELECT seq, at, kind, entity_id, op, data, changed_fields FROM changes"
+            " WHERE seq > ? AND kind IN (" + placeholders + ") ORDER BY seq LIMIT ?",
+            [since] + kinds + [limit + 1],
+        ).fetchall()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            result["has_more"] = True
+            result["cursor"] = str(rows[-1][0])
+        for seq, at, kind, entity_id, op, data, fields in rows:
+            change = {
+                "seq": seq,
+                "at": at,
+                "kind": kind,
+                "id": entity_id,
+                "op": op,
+                "data": json.loads(data) if data else None,
+            }
+            if fields:
+                change["changed_fields"] = json.loads(fields)
+            result["changes"].append(change)
+        return result
+    finally:
+        db.close()
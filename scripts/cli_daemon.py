@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""CLI Daemon - Runs ./yf commands inside the warm api-server process
+
+Every ./yf command used to start a fresh interpreter: pandas/pybaseball
+imports, an OAuth file read, and empty intel and MLB ID caches. api-server
+now listens on a Unix socket (CLI_SOCKET); yf_client.py sends it the module
+name and argv, and the command runs here via the module's COMMANDS table
+with its printed output streamed back as it is written.
+
+Protocol: newline-delimited JSON. The client sends one request line,
+{"module": "yahoo-fantasy", "argv": ["roster"]}; the server answers with
+{"out": text} / {"err": text} frames and a final {"exit": code}, or a single
+{"fallback": true} when the command should run in a fresh process instead
+(unknown module or command, usage screens).
+"""
+
+import os
+import sys
+import json
+import socket
+import threading
+import traceback
+import contextvars
+
+import lazy_modules
+import league_context
+import invalidation
+
+CLI_SOCKET = os.environ.get("CLI_SOCKET", "/tmp/fbb-mcp-cli.sock")
+CLI_DAEMON = os.environ.get("CLI_DAEMON", "1") == "1"
+
+# Modules whose COMMANDS the daemon may run. yahoo_browser is left out:
+# login is interactive and needs a local browser.
+MODULES = (
+    "yahoo-fantasy",
+    "season-manager",
+    "valuations",
+    "draft-assistant",
+    "mlb-data",
+    "intel",
+    "history",
+)
+
+# CLI writes print instead of returning a result, so publish on any attempt
+WRITE_EVENTS = {
+    ("yahoo-fantasy", "add"): ("roster_changed", "fa_pool_changed"),
+    ("yahoo-fantasy", "drop"): ("roster_changed", "fa_pool_changed"),
+    ("yahoo-fantasy", "swap"): ("roster_changed", "fa_pool_changed"),
+    ("yahoo-fantasy", "waiver-claim"): ("roster_changed", "fa_pool_changed"),
+    ("yahoo-fantasy", "waiver-claim-swap"): ("roster_changed", "fa_pool_changed"),
+    ("season-manager", "set-lineup"): ("roster_changed",),
+    ("season-manager", "propose-trade"): ("trades_changed",),
+    ("season-manager", "accept-trade"): ("trades_changed", "roster_changed"),
+    ("season-manager", "reject-trade"): ("trades_changed",),
+}
+
+_output = contextvars.ContextVar("cli_output", default=None)
+_stats_lock = threading.Lock()
+_stats = {"commands": 0, "errors": 0, "fallbacks": 0}
+_started = False
+
+
+class _Channel:
+    """One client connection; frames may be sent from several threads"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = threading.Lock()
+
+    def send(self, frame):
+        data = (json.dumps(frame) + "\n").encode("utf-8")
+        with self.lock:
+            self.conn.sendall(data)
+
+
+class _RoutedStream:
+    """Stands in for sys.stdout/sys.stderr: writes from a CLI command (and
+    threads that inherit its context) go to its client, everything else to
+    the original stream."""
+
+    def __init__(self, original, key):
+        self._original = original
+        self._key = key
+
+    def write(self, text):
+        channel = _output.get()
+        if channel is None:
+            return self._original.write(text)
+        if text:
+            channel.send({self._key: text})
+        return len(text)
+
+    def flush(self):
+        if _output.get() is None:
+            self._original.flush()
+
+    def __getattr__(self, attr):
+        return getattr(self._original, attr)
+
+
+def _read_request(conn):
+    buf = b""
+    while b"\n" not in buf:
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        buf += chunk
+    return json.loads(buf.split(b"\n", 1)[0].decode("utf-8"))
+
+
+def _resolve(module_name, argv):
+    """COMMANDS entry for a request, or None if it should fall back"""
+    if module_name not in MODULES or not argv:
+        return None
+    module = lazy_modules.lazy(module_name)
+    commands = getattr(module, "COMMANDS", None) or {}
+    return commands.get(argv[0])
+
+
+def _run(module_name, argv, fn):
+    code = 0
+    ctx_token = league_context.activate(league_context.LeagueContext())
+    try:
+        fn(argv[1:])
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except Exception:
+        code = 1
+        sys.stderr.write(traceback.format_exc())
+    finally:
+        league_context.deactivate(ctx_token)
+    for event in WRITE_EVENTS.get((module_name, argv[0]), ()):
+        if event == "roster_changed":
+            invalidation.roster_changed(league_context.TEAM_ID)
+        else:
+            invalidation.publish(event)
+    return code
+
+
+def _handle(conn):
+    channel = _Channel(conn)
+    try:
+        request = _read_request(conn)
+        module_name = request.get("module", "")
+        argv = [str(a) for a in request.get("argv", [])]
+        fn = _resolve(module_name, argv)
+        if fn is None:
+            with _stats_lock:
+                _stats["fallbacks"] += 1
+            channel.send({"fallback": True})
+            return
+        with _stats_lock:
+            _stats["commands"] += 1
+        token = _output.set(channel)
+        try:
+            code = _run(module_name, argv, fn)
+        finally:
+            _output.reset(token)
+        if code:
+            with _stats_lock:
+                _stats["errors"] += 1
+        channel.send({"exit": code})
+    except (BrokenPipeError, ConnectionResetError):
+        pass  # client went away (e.g. Ctrl-C)
+    except Exception as e:
+        print("Warning: CLI daemon request failed: " + str(e))
+    finally:
+        try:
+            conn.close()
+        except OSError:
+            pass
+
+
+def _serve(server):
+    while True:
+        try:
+            conn, _ = server.accept()
+        except OSError as e:
+            print("Warning: CLI daemon accept failed: " + str(e))
+            continue
+        threading.Thread(target=_handle, args=(conn,), daemon=True).start()
+
+
+def start():
+    """Listen on CLI_SOCKET in a background thread (once per process)"""
+    global _started
+    if _started or not CLI_DAEMON:
+        return
+    _started = True
+    try:
+        if os.path.exists(CLI_SOCKET):
+            os.unlink(CLI_SOCKET)  # left behind by a previous worker
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(CLI_SOCKET)
+        os.chmod(CLI_SOCKET, 0o600)
+        server.listen(16)
+    except OSError as e:
+        print("Warning: CLI daemon could not listen on " + CLI_SOCKET + ": " + str(e))
+        return
+    sys.stdout = _RoutedStream(sys.stdout, "out")
+    sys.stderr = _RoutedStream(sys.stderr, "err")
+    threading.Thread(target=_serve, args=(server,), daemon=True).start()
+    print("CLI daemon listening on " + CLI_SOCKET)
+
+
+def get_stats():
+    with _stats_lock:
+        result = dict(_stats)
+    result["listening"] = _started
+    return result
@@ -0,0 +1,515 @@
+#!/usr/bin/env python3
+"""Data Cache - Bounded two-tier cache for module-level upstream data
+
+Modules register a namespace with its own TTL and use it instead of a
+private dict:
+
+  _reddit_cache = data_cache.namespace("intel.reddit", TTL_REDDIT)
+  posts = _reddit_cache.get(key)
+  ...
+  _reddit_cache.set(key, posts)
+
+All namespaces share one in-memory LRU bounded by DATA_CACHE_MB; entry
+sizes are estimated when stored (deep size of dicts/lists, nbytes for
+numpy, memory_usage for pandas). Expired entries are dropped when read
+and by a periodic sweep, so keys that are never read again (per-player
+searches, game logs) don't accumulate.
+
+Namespaces created with disk=True also write entries to DATA_DIR/cache/
+(pickled). A memory miss falls back to disk, so a restarted worker, or
+another worker, reuses a leaderboard another process already fetched.
+DATA_CACHE_DISK=0 turns the disk tier off.
+
+A namespace created with stale=<seconds> keeps entries that long past
+their TTL. lookup() returns such an entry marked not fresh, and the caller
+can serve it while refresh() fetches a new copy on a background thread
+(stale-while-revalidate); get() treats it as a miss. Inside inline()
+refresh() runs the fetch on the calling thread instead: warm_state() uses it
+in the gunicorn master, whose threads don't survive the fork.
+
+Per-namespace hit/miss/eviction counts are in get_stats(), exposed by
+/api/cache and /api/metrics. flush() clears a namespace in every worker
+(through the invalidation bus).
+"""
+
+import os
+import re
+import sys
+import time
+import pickle
+import hashlib
+import threading
+import contextvars
+from contextlib import contextmanager
+from collections import OrderedDict
+
+import invalidation
+
+DATA_DIR = os.environ.get("DATA_DIR", "/app/data")
+DISK_DIR = os.path.join(DATA_DIR, "cache")
+
+MAX_BYTES = int(float(os.environ.get("DATA_CACHE_MB", "256")) * 1024 * 1024)
+DISK_ENABLED = os.environ.get("DATA_CACHE_DISK", "1") != "0"
+DISK_MAX_BYTES = int(float(os.environ.get("DATA_CACHE_DISK_MB", "1024")) * 1024 * 1024)
+
+# Seconds between sweeps of expired memory entries
+SWEEP_INTERVAL = 60
+# Disk writes between checks of the disk tier's total size
+DISK_PRUNE_EVERY = 50
+
+
+def _parse_ttls(value):
+    """DATA_CACHE_TTLS, e.g. "intel.reddit=600,intel.savant=43200" """
+    ttls = {}
+    for item in (value or "").split(","):
+        item = item.strip()
+        if "=" not in item:
+            continue
+        name, seconds = item.split("=", 1)
+        try:
+            ttls[name.strip()] = float(seconds)
+        except ValueError:
+            print("Warning: ignoring bad DATA_CACHE_TTLS entry: " + item)
+    return ttls
+
+
+TTL_OVERRIDES = _parse_ttls(os.environ.get("DATA_CACHE_TTLS", ""))
+
+# Namespace names double as directory names in the disk tier
+_NAME_RE = re.compile(r"^[A-Za-z0-9_][A-Za-z0-9_.-]*$")
+
+_lock = threading.RLock()
+# (namespace, key) -> [value, size, stored_at, expires_at, drop_at]; oldest use first
+_entries = OrderedDict()
+_bytes = 0
+_namespaces = {}
+_state = {"last_sweep": time.time(), "disk_writes": 0}
+_inline = contextvars.ContextVar("data_cache_inline", default=False)
+
+
+def sizeof(obj):
+    """Approximate deep size of obj in bytes"""
+    seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        nbytes = getattr(o, "nbytes", None)
+        if isinstance(nbytes, int):
+            # numpy arrays; pandas objects report memory_usage below
+            total += nbytes
+            continue
+        memory_usage = getattr(o, "memory_usage", None)
+        if callable(memory_usage) and type(o).__module__.startswith("pandas"):
+            try:
+                usage = memory_usage(deep=True)
+                total += int(usage.sum() if hasattr(usage, "sum") else usage)
+                continue
+            except Exception:
+                pass
+        total += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        elif hasattr(o, "__dict__") and not isinstance(o, type):
+            # Plain objects (e.g. intel.Leaderboard): count their attributes
+            stack.append(vars(o))
+    return total
+
+
+class Namespace:
+    """One named cache: a TTL, a stale window and (optionally) the disk tier"""
+
+    def __init__(self, name, ttl, disk=False, stale=0):
+        self.name = name
+        self.ttl = TTL_OVERRIDES.get(name, ttl)
+        self.disk = disk
+        self.stale = stale
+        self._refreshing = set()
+        self.stats = {
+            "hits": 0,
+            "disk_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "sets": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "disk_errors": 0,
+        }
+
+    # --- Memory tier ---
+
+    def _drop_at(self, expires_at):
+        return expires_at + self.stale if expires_at is not None else None
+
+    def lookup(self, key):
+        """(value, fresh) for key. value is None on a miss; fresh is False
+        for an entry past its TTL but still inside the stale window."""
+        now = time.time()
+        with _lock:
+            entry = _entries.get((self.name, key))
+            if entry is not None:
+                if entry[3] is None or entry[3] > now:
+                    _entries.move_to_end((self.name, key))
+                    self.stats["hits"] += 1
+                    return entry[0], True
+                if entry[4] > now:
+                    _entries.move_to_end((self.name, key))
+                    self.stats["stale_hits"] += 1
+                    return entry[0], False
+                _drop((self.name, key))
+                self.stats["expirations"] += 1
+        if self.disk and DISK_ENABLED:
+            found, value, expires_at = self._disk_get(key, now)
+            if found:
+                fresh = expires_at is None or expires_at > now
+                with _lock:
+                    self.stats["disk_hits" if fresh else "stale_hits"] += 1
+                    _put((self.name, key), value, expires_at, self._drop_at(expires_at))
+                return value, fresh
+        with _lock:
+            self.stats["misses"] += 1
+        return None, False
+
+    def get(self, key, default=None):
+        """Cached value for key, or default if missing/expired"""
+        value, fresh = self.lookup(key)
+        return value if fresh else default
+
+    def set(self, key, value, ttl=None):
+        """Store value under key. ttl overrides the namespace TTL (None = use it)."""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+        with _lock:
+            self.stats["sets"] += 1
+            _put((self.name, key), value, expires_at, self._drop_at(expires_at))
+        if self.disk and DISK_ENABLED:
+            self._disk_set(key, value, expires_at)
+        return value
+
+    def pop(self, key):
+        with _lock:
+            _drop((self.name, key))
+        if self.disk and DISK_ENABLED:
+            try:
+                os.remove(self._disk_path(key))
+            except OSError:
+                pass
+
+    def refresh(self, key, fn, *args):
+        """Run fn(*args) on a background thread to replace a stale entry
+        (fn stores the new value). No-op while a refresh of key is running."""
+        with _lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self.stats["refreshes"] += 1
+        if _inline.get():
+            self._run_refresh(key, fn, args)
+            return True
+        threading.Thread(
+            target=self._run_refresh, args=(key, fn, args),
+            name="cache-refresh-" + self.name, daemon=True,
+        ).start()
+        return True
+
+    def _run_refresh(self, key, fn, args):
+        try:
+            fn(*args)
+        except Exception as e:
+            with _lock:
+                self.stats["refresh_errors"] += 1
+            print("Warning: " + self.name + " background refresh failed: " + str(e))
+        finally:
+            with _lock:
+                self._refreshing.discard(key)
+
+    def clear(self, disk=True):
+        """Drop every entry in this namespace. Returns how many were in memory."""
+        with _lock:
+            keys = [k for k in _entries if k[0] == self.name]
+            for k in keys:
+                _drop(k)
+        if disk and self.disk:
+            directory = _disk_dir(self.name)
+            try:
+                names = os.listdir(directory) if directory else []
+            except OSError:
+                names = []
+            for f in names:
+                try:
+                    os.remove(os.path.join(directory, f))
+                except OSError:
+                    pass
+        return len(keys)
+
+    # --- Disk tier ---
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(DISK_DIR, self.name, digest + ".pkl")
+
+    def _disk_get(self, key, now):
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                stored_key, expires_at, value = pickle.load(f)
+        except FileNotFoundError:
+            return False, None, None
+        except Exception:
+            with _lock:
+                self.stats["disk_errors"] += 1
+            return False, None, None
+        if stored_key != repr(key):
+            return False, None, None
+        drop_at = self._drop_at(expires_at)
+        if drop_at is not None and drop_at <= now:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return False, None, None
+        return True, value, expires_at
+
+    def _disk_set(self, key, value, expires_at):
+        path = self._disk_path(key)
+        tmp = path + "." + str(os.getpid()) + "." + str(threading.get_ident()) + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, "wb") as f:
+                pickle.dump((repr(key), expires_at, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except Exception as e:
+            with _lock:
+                self.stats["disk_errors"] += 1
+            print("Warning: could not write " + self.name + " cache entry to disk: " + str(e))
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        with _lock:
+            _state["disk_writes"] += 1
+            prune = _state["disk_writes"] % DISK_PRUNE_EVERY == 0
+        if prune:
+            _prune_disk()
+
+    def snapshot(self):
+        with _lock:
+            result = dict(self.stats)
+            sizes = [e[1] for k, e in _entries.items() if k[0] == self.name]
+        result["entries"] = len(sizes)
+        result["bytes"] = sum(sizes)
+        result["ttl"] = self.ttl
+        result["stale"] = self.stale
+        result["refreshing"] = len(self._refreshing)
+        result["disk"] = bool(self.disk and DISK_ENABLED)
+        served = result["hits"] + result["disk_hits"] + result["stale_hits"]
+        lookups = served + result["misses"]
+        result["hit_rate"] = round(served / float(lookups), 3) if lookups else None
+        return result
+
+
+# --- Shared LRU (call with _lock held) ---
+
+
+def _drop(full_key):
+    global _bytes
+    entry = _entries.pop(full_key, None)
+    if entry is not None:
+        _bytes -= entry[1]
+
+
+def _put(full_key, value, expires_at, drop_at):
+    global _bytes
+    _drop(full_key)
+    size = sizeof(value)
+    if size > MAX_BYTES:
+        # Would evict everything else; disk-backed namespaces still keep it there
+        return
+    _entries[full_key] = [value, size, time.time(), expires_at, drop_at]
+    _bytes += size
+    while _bytes > MAX_BYTES and _entries:
+        victim, entry = _entries.popitem(last=False)
+        _bytes -= entry[1]
+        ns = _namespaces.get(victim[0])
+        if ns is not None:
+            ns.stats["evictions"] += 1
+    _maybe_sweep()
+
+
+def _maybe_sweep():
+    now = time.time()
+    if now - _state["last_sweep"] < SWEEP_INTERVAL:
+        return
+    _state["last_sweep"] = now
+    expired = [k for k, e in _entries.items() if e[4] is not None and e[4] <= now]
+    for k in expired:
+        _drop(k)
+        ns = _namespaces.get(k[0])
+        if ns is not None:
+            ns.stats["expirations"] += 1
+
+
+def _disk_files():
+    files = []
+    for root, _, names in os.walk(DISK_DIR):
+        for f in names:
+            path = os.path.join(root, f)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+    return files
+
+
+def _valid_name(name):
+    return bool(name) and ".." not in name and _NAME_RE.match(name) is not None
+
+
+def _disk_dir(name):
+    """DISK_DIR/<name>, or None if name would resolve outside DISK_DIR"""
+    if not _valid_name(name):
+        return None
+    root = os.path.realpath(DISK_DIR)
+    directory = os.path.realpath(os.path.join(root, name))
+    if os.path.dirname(directory) != root:
+        return None
+    return directory
+
+
+def _prune_disk():
+    """Delete the oldest disk entries while the tier is over DISK_MAX_BYTES"""
+    files = sorted(_disk_files())
+    total = sum(size for _, size, _ in files)
+    for _, size, path in files:
+        if total <= DISK_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+# --- Registry and admin ---
+
+
+@contextmanager
+def inline():
+    """Run refresh() fetches on the calling thread inside this block"""
+    token = _inline.set(True)
+    try:
+        yield
+    finally:
+        _inline.reset(token)
+
+
+def _after_fork_in_child():
+    # A refresh thread running in the parent doesn't exist here: forget its
+    # key so refresh() isn't a no-op forever, and replace a lock it may hold
+    global _lock
+    _lock = threading.RLock()
+    for ns in _namespaces.values():
+        ns._refreshing = set()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def namespace(name, ttl, disk=False, stale=0):
+    """Get or create the namespace called name (ttl in seconds, None = no
+    expiry; stale = seconds an expired entry may still be served)"""
+    if not _valid_name(name):
+        raise ValueError("Bad cache namespace name: " + repr(name))
+    with _lock:
+        ns = _namespaces.get(name)
+        if ns is None:
+            ns = Namespace(name, ttl, disk=disk, stale=stale)
+            _namespaces[name] = ns
+        return ns
+
+
+def flush(name=None, broadcast=True):
+    """Clear one namespace (or all) here and, with broadcast, in the other
+    workers and on disk too. Returns how many memory entries this process
+    dropped. A namespace whose module hasn't loaded in this worker yet
+    still has its disk tier and the other workers' copies cleared. Raises
+    ValueError for a name that can't be a namespace.
+    """
+    if name is None:
+        targets = list(_namespaces.values())
+    elif name in _namespaces:
+        targets = [_namespaces[name]]
+    elif _valid_name(name):
+        # Unregistered here: a throwaway handle clears DISK_DIR/<name> only
+        targets = [Namespace(name, None, disk=True)]
+    else:
+        raise ValueError("Bad cache namespace name: " + repr(name))
+    dropped = 0
+    for ns in targets:
+        dropped += ns.clear(disk=broadcast)
+    if broadcast:
+        invalidation.cache_flushed(name)
+    return dropped
+
+
+def _on_cache_flushed(namespace=None):
+    # Another worker flushed: it already cleared the disk tier
+    if namespace is None or namespace in _namespaces:
+        flush(namespace, broadcast=False)
+
+
+invalidation.subscribe("cache_flushed", _on_cache_flushed)
+
+
+def entries(name, limit=100):
+    """Most recently used entries of a namespace (key, size, age, ttl left)"""
+    if name not in _namespaces:
+        raise KeyError(name)
+    now = time.time()
+    rows = []
+    with _lock:
+        for (ns, key), (_, size, stored_at, expires_at, _) in reversed(_entries.items()):
+            if ns != name:
+                continue
+            rows.append({
+                "key": repr(key),
+                "bytes": size,
+                "age_seconds": round(now - stored_at, 1),
+                "expires_in": round(expires_at - now, 1) if expires_at is not None else None,
+            })
+            if len(rows) >= limit:
+                break
+    return rows
+
+
+def disk_usage():
+    if not DISK_ENABLED:
+        return {"enabled": False}
+    files = _disk_files()
+    return {
+        "enabled": True,
+        "dir": DISK_DIR,
+        "files": len(files),
+        "bytes": sum(size for _, size, _ in files),
+        "max_bytes": DISK_MAX_BYTES,
+    }
+
+
+def get_stats():
+    """Totals plus per-namespace counters"""
+    with _lock:
+        namespaces = list(_namespaces.values())
+        total = {"entries": len(_entries), "bytes": _bytes, "max_bytes": MAX_BYTES}
+    total["namespaces"] = {ns.name: ns.snapshot() for ns in sorted(namespaces, key=lambda n: n.name)}
+    return total
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Request Deadlines - Lets upstream fetchers use only the time a request has left
+
+api-server activates a deadline per request (X-Deadline-Ms header, else the
+route's default). Fetchers ask timeout(default) for their socket timeout
+instead of a fixed 10-30 s, so a workflow whose budget is nearly spent
+doesn't start a fresh 30 s Savant download. Worker threads inherit the
+deadline through the request's context vars; workflow.iter_sections stops
+waiting for sections when it passes.
+
+Outside a request (CLI runs, warmers) no deadline is set and timeout()
+returns the default unchanged.
+
+Fetches whose result is shared with other callers (cached leaderboards)
+go through shared(): they run without the caller's deadline, and only the
+caller's wait is cut short.
+"""
+
+import time
+import threading
+import contextvars
+
+# Smallest socket timeout handed out while time remains
+MIN_TIMEOUT = 0.5
+
+_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The active request's deadline has passed"""
+
+
+def activate(seconds):
+    """Set a deadline seconds from now for this context. Returns a reset token."""
+    return _deadline.set(time.time() + seconds)
+
+
+def deactivate(token):
+    _deadline.reset(token)
+
+
+def at():
+    """Absolute deadline (epoch seconds) for this context, or None"""
+    return _deadline.get()
+
+
+def remaining():
+    """Seconds left before the deadline, or None if there is none"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def expired():
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def timeout(default):
+    """Timeout for one upstream call: default, capped by the time left.
+    Raises DeadlineExceeded when no time is left.
+    """
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+    return max(MIN_TIMEOUT, min(default, left))
+
+
+def shared(fn, *args):
+    """Run fn(*args), a fetch whose result other callers share, without this
+    context's deadline: it gets its full timeout, so a short deadline can't
+    leave a failure cached for everyone. The caller still stops waiting at
+    its own deadline (DeadlineExceeded) and the fetch finishes in the
+    background.
+    """
+    left = remaining()
+    if left is None:
+        return fn(*args)
+    outcome = {}
+    done = threading.Event()
+
+    def run():
+        _deadline.set(None)
+        try:
+            outcome["result"] = fn(*args)
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            done.set()
+
+    ctx = contextvars.copy_context()
+    threading.Thread(target=ctx.run, args=(run,), name="shared-fetch", daemon=True).start()
+    if not done.wait(max(0.0, left)):
+        raise DeadlineExceeded("Request deadline exceeded")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
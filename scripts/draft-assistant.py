@@ -14,6 +14,7 @@ import yahoo_fantasy_api as yfa
 from valuations import load_all, get_player_by_name
 from mlb_id_cache import get_mlb_id
 from intel import batch_intel
+import metrics
 
 # Docker paths
 OAUTH_FILE = os.environ.get("OAUTH_FILE", "/app/config/yahoo_oauth.json")
@@ -23,6 +24,7 @@ TEAM_ID = os.environ.get("TEAM_ID", "")
 class DraftAssistant:
     def __init__(self):
         self.sc = OAuth2(None, None, from_file=OAUTH_FILE)
+        metrics.instrument_session(self.sc.session)
         self.gm = yfa.Game(self.sc, "mlb")
         self.lg = self.gm.to_league(LEAGUE_ID)
         self.team = self.lg.to_team(TEAM_ID)
@@ -0,0 +1,44 @@
+"""Gunicorn config for the production API server (see entrypoint.sh)
+
+The app is preloaded in the master, warm_state() fills read-mostly caches
+there, and workers are forked afterwards so they share those pages
+copy-on-write. Background threads (browser heartbeat, projection refresh) run
+in whichever single worker holds the background lock.
+"""
+
+import os
+
+bind = "0.0.0.0:" + os.environ.get("API_PORT", "8766")
+workers = int(os.environ.get("API_WORKERS", "2"))
+threads = int(os.environ.get("API_THREADS", "8"))
+worker_class = "gthread"
+preload_app = True
+# Workflows and Playwright writes can take a while
+timeout = int(os.environ.get("API_TIMEOUT", "180"))
+graceful_timeout = 30
+# Recycle workers occasionally to bound memory growth from per-worker caches
+max_requests = int(os.environ.get("API_MAX_REQUESTS", "2000"))
+max_requests_jitter = 200
+accesslog = None
+errorlog = "-"
+
+
+def _api_module():
+    import sys
+    return sys.modules["api-server"]
+
+
+def when_ready(server):
+    """Runs in the master after preload, before any worker is forked"""
+    # Workers write their metrics where every worker's /api/metrics sums them
+    import metrics
+    metrics.share()
+    try:
+        _api_module().warm_state()
+        server.log.info("Warm state loaded")
+    except Exception as e:
+        server.log.warning("Warm state failed: " + str(e))
+
+
+def post_fork(server, worker):
+    _api_module().claim_background_tasks()
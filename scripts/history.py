@@ -7,6 +7,7 @@ import json
 from datetime import datetime
 from yahoo_oauth import OAuth2
 import yahoo_fantasy_api as yfa
+import metrics
 
 # Docker paths
 OAUTH_FILE = os.environ.get("OAUTH_FILE", "/app/config/yahoo_oauth.json")
@@ -35,6 +36,7 @@ def get_connection():
     sc = OAuth2(None, None, from_file=OAUTH_FILE)
     if not sc.token_is_valid():
         sc.refresh_access_token()
+    metrics.instrument_session(sc.session)
     return sc
 
 
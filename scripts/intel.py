@@ -14,16 +14,24 @@ Data sources:
 import sys
 import os
 import json
-import time
 import csv
 import io
 import urllib.request
+import urllib.error
 import urllib.parse
 from datetime import date, datetime, timedelta
 
+import numpy as np
+
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from mlb_id_cache import get_mlb_id
+from singleflight import coalesced
+import metrics
+import projection
+import deadline
+import data_cache
+import upstream_budget
 
 # Current year for all API calls
 YEAR = date.today().year
@@ -34,6 +42,11 @@ MLB_API = "https://statsapi.mlb.com/api/v1"
 # User-Agent header for HTTP requests
 USER_AGENT = "YahooFantasyBot/1.0"
 
+# Socket timeouts in seconds (capped by the request deadline, see deadline.py)
+SAVANT_TIMEOUT = 30
+REDDIT_TIMEOUT = 10
+MLB_TIMEOUT = 15
+
 # TTL values in seconds
 TTL_SAVANT = 21600       # 6 hours
 TTL_PYBASEBALL = 3600    # 1 hour
@@ -41,100 +54,356 @@ TTL_FANGRAPHS = 21600    # 6 hours
 TTL_REDDIT = 900          # 15 minutes
 TTL_MLB = 1800            # 30 minutes
 
+# Leaderboards past their TTL are served for up to this long more while a
+# background thread fetches the new copy
+STALE_LEADERBOARD = 86400  # 1 day
+
+# A failed leaderboard fetch is remembered this long (the stale copy is kept,
+# or an empty result cached) so an outage doesn't make every request wait
+# out the timeout again
+TTL_NEGATIVE = 300        # 5 minutes
+
 
 # ============================================================
-# 1. TTL Cache System
+# 1. Caches (see data_cache.py)
 # ============================================================
 
-_cache = {}
+# Leaderboards are large and slow to fetch, so they also go to disk where
+# other workers (and the next process) pick them up
+_savant_cache = data_cache.namespace("intel.savant", TTL_SAVANT, disk=True, stale=STALE_LEADERBOARD)
+_fangraphs_cache = data_cache.namespace("intel.fangraphs", TTL_FANGRAPHS, disk=True, stale=STALE_LEADERBOARD)
+_reddit_cache = data_cache.namespace("intel.reddit", TTL_REDDIT)
+_mlb_cache = data_cache.namespace("intel.mlb", TTL_MLB)
 
 
-def _cache_get(key, ttl_seconds):
-    """Get cached value if not expired"""
-    entry = _cache.get(key)
-    if entry is None:
-        return None
-    data, fetch_time = entry
-    if time.time() - fetch_time > ttl_seconds:
-        del _cache[key]
-        return None
-    return data
+def _background_load(load, *args):
+    with upstream_budget.background():
+        load(*args)
+
+
+@coalesced
+def _load_once(load, *args):
+    return load(*args)
+
 
+def _stale_while_revalidate(cache, key, load, *args):
+    """Cached value for key; past its TTL the stale copy is returned while
+    load(*args, stale) refreshes it in the background. On a miss load(*args)
+    runs now, once for all concurrent callers and outside the caller's
+    deadline (see deadline.shared). load stores what it fetched and returns it."""
+    cached, fresh = cache.lookup(key)
+    if cached is None:
+        return deadline.shared(_load_once, load, *args)
+    if not fresh:
+        cache.refresh(key, _background_load, load, *(args + (cached,)))
+    return cached
 
-def _cache_set(key, data):
-    """Store value in cache with current timestamp"""
-    _cache[key] = (data, time.time())
+
+def _keep_stale(cache, key, stale, empty):
+    """After a failed fetch: serve the stale copy (or cache the empty result)
+    for TTL_NEGATIVE before trying again"""
+    if stale:
+        return cache.set(key, stale, ttl=TTL_NEGATIVE)
+    return cache.set(key, empty, ttl=TTL_NEGATIVE)
 
 
 # ============================================================
 # 2. Baseball Savant CSV Fetchers
 # ============================================================
 
-def _fetch_csv(url):
-    """Fetch a CSV from a URL and return list of dicts"""
+@coalesced
+def _fetch_csv_conditional(url, etag="", last_modified=""):
+    """Fetch a CSV from a URL, revalidating with the validators from an
+    earlier fetch. Returns (rows, etag, last_modified); rows is None when
+    the server answered 304 Not Modified. Raises on failure.
+    """
+    headers = {"User-Agent": USER_AGENT}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    req = urllib.request.Request(url, headers=headers)
+    timeout = deadline.timeout(SAVANT_TIMEOUT)
+    with metrics.track("savant"):
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as response:
+                raw = response.read().decode("utf-8-sig")
+                etag = response.headers.get("ETag", "")
+                last_modified = response.headers.get("Last-Modified", "")
+        except urllib.error.HTTPError as e:
+            if e.code != 304:
+                raise
+            return None, etag, last_modified
+    return list(csv.DictReader(io.StringIO(raw))), etag, last_modified
+
+
+# Bump when the cached leaderboard structure changes: the disk tier outlives
+# the process, and an old pickle must read as a miss, not a wrong type
+LEADERBOARD_FORMAT = 4
+
+# Savant uses various column names for the player name
+SAVANT_NAME_COLUMNS = ("last_name, first_name", "player_name", "name")
+
+
+class Categorical:
+    """A text column stored as int32 codes into its distinct values"""
+
+    def __init__(self, values):
+        self.categories, codes = np.unique(np.array(values, dtype=str), return_inverse=True)
+        self.categories = self.categories.tolist()
+        self.codes = codes.astype(np.int32)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        return self.categories[self.codes[i]]
+
+    def tolist(self):
+        return [self.categories[c] for c in self.codes]
+
+    def take(self, indices):
+        """The Categorical of the rows at indices"""
+        taken = Categorical([])
+        taken.categories = self.categories
+        taken.codes = self.codes[indices]
+        return taken
+
+
+def _typed_column(values):
+    """float64 array (NaN for blanks) when every non-blank value parses as a
+    number, else a Categorical of the strings"""
+    cells = np.empty(len(values), dtype=object)
+    cells[:] = values
+    blank = np.equal(cells, None) | np.equal(cells, "")
+    cells[blank] = np.nan
     try:
-        req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
-        with urllib.request.urlopen(req, timeout=30) as response:
-            raw = response.read().decode("utf-8-sig")
-        reader = csv.DictReader(io.StringIO(raw))
-        return list(reader)
+        return cells.astype(float)
+    except (ValueError, TypeError):
+        return Categorical(["" if v is None else str(v) for v in values])
+
+
+class LeaderboardRow:
+    """Read-only view of one leaderboard row, with dict-style get().
+    Numeric cells come back as floats (None when blank), text as str."""
+
+    __slots__ = ("board", "index")
+
+    def __init__(self, board, index):
+        self.board = board
+        self.index = index
+
+    def get(self, column, default=None):
+        values = self.board.columns.get(column)
+        if values is None:
+            return default
+        if isinstance(values, Categorical):
+            return values[self.index]
+        val = values[self.index]
+        return None if np.isnan(val) else float(val)
+
+
+class Leaderboard:
+    """A Savant or FanGraphs leaderboard stored by column.
+
+    columns maps each CSV column to a float64 array (numbers parsed once at
+    ingest) or a Categorical (names, teams, pitch types). Lookup indexes
+    are built at ingest too: by_id maps the MLBAM player_id and by_name the
+    normalized player name (see _normalize_name) to a row position, so
+    finding a player is a dict probe rather than a scan. sorted_columns
+    holds every numeric column ascending with blanks dropped, so a
+    percentile rank is a binary search.
+    """
+
+    def __init__(self, rows, name_columns=SAVANT_NAME_COLUMNS, data_season=None):
+        # Rows with neither a name nor an ID can't be looked up
+        kept = [
+            row for row in rows
+            if row.get("player_id", "") or any(row.get(column, "") for column in name_columns)
+        ]
+        columns = {}
+        if kept:
+            for column in kept[0].keys():
+                columns[column] = _typed_column([row.get(column) for row in kept])
+        names = [[row.get(column, "") for row in kept] for column in name_columns]
+        pids = [row.get("player_id", "") for row in kept]
+        self._build(columns, names, pids, data_season)
+
+    @classmethod
+    def from_columns(cls, columns, name_columns=SAVANT_NAME_COLUMNS, data_season=None):
+        """Leaderboard from already-typed columns (float64 arrays or
+        Categoricals of one length), without going through row dicts.
+        Text name columns only; there is no player_id."""
+        length = len(next(iter(columns.values()))) if columns else 0
+        names = [columns[c].tolist() if c in columns else [""] * length for c in name_columns]
+        keep = [i for i in range(length) if any(n[i] for n in names)]
+        if len(keep) < length:
+            indices = np.array(keep, dtype=np.intp)
+            columns = {c: v.take(indices) for c, v in columns.items()}
+            names = [[n[i] for i in keep] for n in names]
+        board = cls.__new__(cls)
+        board._build(columns, names, [""] * len(keep), data_season)
+        return board
+
+    def _build(self, columns, names, pids, data_season):
+        """Set the columns and build the lookup indexes. names holds one list
+        per name column and pids the player_id of each row."""
+        self.data_season = data_season
+        self.by_id = {}
+        self.by_name = {}
+        # (normalized name, row position) in leaderboard order, for the fuzzy pass
+        self.names = []
+        alt_names = {}
+        for i, pid in enumerate(pids):
+            name_key = ""
+            for column_names in names:
+                name_key = column_names[i]
+                if name_key:
+                    break
+            if pid:
+                self.by_id[str(pid)] = i
+            if name_key:
+                norm = _normalize_name(name_key)
+                self.by_name[norm] = i
+                self.names.append((norm, i))
+            for column_names in names:
+                alt = _normalize_name(column_names[i])
+                if alt:
+                    alt_names.setdefault(alt, i)
+        for alt, i in alt_names.items():
+            self.by_name.setdefault(alt, i)
+
+        self.length = len(pids)
+        self.columns = columns
+        self.sorted_columns = {}
+        for column, values in columns.items():
+            if not isinstance(values, Categorical):
+                present = values[~np.isnan(values)]
+                if len(present):
+                    self.sorted_columns[column] = np.sort(present)
+
+    def __len__(self):
+        return self.length
+
+    def row(self, i):
+        return LeaderboardRow(self, i)
+
+    def find(self, player_name, mlb_id=None):
+        """Row for a player: by MLB ID, then normalized name, then a fuzzy
+        match where every part of the name appears in the row's name"""
+        if mlb_id:
+            i = self.by_id.get(str(mlb_id))
+            if i is not None:
+                return self.row(i)
+        norm = _normalize_name(player_name)
+        i = self.by_name.get(norm)
+        if i is not None:
+            return self.row(i)
+        parts = norm.split()
+        if parts:
+            for row_norm, i in self.names:
+                if all(p in row_norm for p in parts):
+                    return self.row(i)
+        return None
+
+    def numeric(self, name):
+        """A numeric column in row order (NaN for blanks), or None"""
+        values = self.columns.get(name)
+        if values is None or isinstance(values, Categorical):
+            return None
+        return values
+
+    def text(self, *names):
+        """The first of names present, as a list of strings in row order"""
+        for name in names:
+            values = self.columns.get(name)
+            if values is not None:
+                if isinstance(values, Categorical):
+                    return values.tolist()
+                return ["" if np.isnan(v) else str(v) for v in values]
+        return [""] * self.length
+
+    def column(self, *names):
+        """Sorted values of the first of names that has any, else None"""
+        for name in names:
+            values = self.sorted_columns.get(name)
+            if values is not None:
+                return values
+        return None
+
+    def percentile(self, value, *columns, higher_is_better=True):
+        """Percentile rank (0-100) of value within the first populated column"""
+        return _percentile_rank(value, self.column(*columns), higher_is_better)
+
+    def percentiles(self, values, *columns, higher_is_better=True):
+        """Percentile ranks for many players' values in one vectorized pass"""
+        return _percentile_ranks(values, self.column(*columns), higher_is_better)
+
+
+def _index_savant_rows(rows, data_season=None):
+    """Build the Leaderboard (typed columns, name and player_id indexes) for CSV rows"""
+    return Leaderboard(rows or [], SAVANT_NAME_COLUMNS, data_season)
+
+
+def _savant_rows(url, revalidate=False):
+    """CSV rows for a Savant leaderboard URL, [] if the fetch failed, or None
+    if revalidate was set and the copy we fetched last is still current"""
+    validators_key = ("validators", url)
+    etag, last_modified = ("", "")
+    if revalidate:
+        etag, last_modified = _savant_cache.get(validators_key) or ("", "")
+    try:
+        rows, etag, last_modified = _fetch_csv_conditional(url, etag, last_modified)
+    except deadline.DeadlineExceeded:
+        # Not the upstream's fault: nothing gets negative-cached
+        raise
     except Exception as e:
         print("Warning: CSV fetch failed for " + url + ": " + str(e))
         return []
+    if etag or last_modified:
+        _savant_cache.set(validators_key, (etag, last_modified), ttl=TTL_SAVANT + STALE_LEADERBOARD)
+    return rows
 
 
-def _index_savant_rows(rows):
-    """Build dict keyed by 'last_name, first_name' AND by player_id"""
-    result = {}
-    for row in rows:
-        # Savant uses various column names for the player name
-        name_key = (
-            row.get("last_name, first_name", "")
-            or row.get("player_name", "")
-            or row.get("name", "")
-        )
-        if name_key:
-            result[name_key] = row
-        pid = row.get("player_id", "")
-        if pid:
-            result["id:" + str(pid)] = row
-    return result
+def _savant_key(cache_prefix, player_type, year):
+    return (cache_prefix, player_type, year, LEADERBOARD_FORMAT)
 
 
-def _savant_with_fallback(url_template, cache_prefix, player_type):
-    """Fetch Savant data with pre-season fallback to prior year.
-    Returns (indexed_rows, data_season) tuple.
-    """
+def _load_savant(url_template, cache_prefix, player_type, stale=None):
+    """Fetch a Savant leaderboard (pre-season: falling back to last year)
+    and cache it. stale is the copy being refreshed, if any."""
+    cache_key = _savant_key(cache_prefix, player_type, YEAR)
     year = YEAR
-    cache_key = (cache_prefix, player_type, year)
-    cached = _cache_get(cache_key, TTL_SAVANT)
-    if cached is not None:
-        return cached
-
     url = url_template.replace("{YEAR}", str(year))
-    rows = _fetch_csv(url)
-    result = _index_savant_rows(rows)
+    rows = _savant_rows(url, revalidate=bool(stale) and stale.data_season == YEAR)
+    if rows is None:
+        return _savant_cache.set(cache_key, stale)
+    result = _index_savant_rows(rows, year)
 
     # Pre-season fallback: if empty and before May, try last year
     if not result and date.today().month < 5:
         year = YEAR - 1
-        fallback_key = (cache_prefix, player_type, year)
-        cached_fb = _cache_get(fallback_key, TTL_SAVANT)
-        if cached_fb is not None:
-            return cached_fb
+        fallback_key = _savant_key(cache_prefix, player_type, year)
+        cached_fb = _savant_cache.get(fallback_key)
+        if cached_fb:
+            return _savant_cache.set(cache_key, cached_fb)
         url = url_template.replace("{YEAR}", str(year))
-        rows = _fetch_csv(url)
-        result = _index_savant_rows(rows)
+        result = _index_savant_rows(_savant_rows(url), year)
         if result:
-            result["__data_season"] = year
-            _cache_set(fallback_key, result)
-            _cache_set(cache_key, result)
-            return result
-
-    if result:
-        result["__data_season"] = year
-    _cache_set(cache_key, result)
-    return result
+            _savant_cache.set(fallback_key, result)
+            return _savant_cache.set(cache_key, result)
+
+    if not result:
+        return _keep_stale(_savant_cache, cache_key, stale, Leaderboard([]))
+    return _savant_cache.set(cache_key, result)
+
+
+def _savant_with_fallback(url_template, cache_prefix, player_type):
+    """Fetch Savant data with pre-season fallback to prior year.
+    Returns a Leaderboard (data_season says which season it covers).
+    """
+    cache_key = _savant_key(cache_prefix, player_type, YEAR)
+    return _stale_while_revalidate(_savant_cache, cache_key, _load_savant, url_template, cache_prefix, player_type)
 
 
 def _fetch_savant_expected(player_type):
@@ -207,132 +476,89 @@ def _fetch_savant_percentile_rankings(player_type):
 # 3. FanGraphs via pybaseball
 # ============================================================
 
+# FanGraphs column -> the plate discipline field it becomes
+FANGRAPHS_COLUMNS = {
+    "BB%": "bb_rate",
+    "K%": "k_rate",
+    "O-Swing%": "o_swing_pct",
+    "Z-Contact%": "z_contact_pct",
+    "SwStr%": "swstr_pct",
+}
+
+
+def _index_fangraphs(df, year):
+    """Leaderboard of plate discipline stats, indexed by player name"""
+    if df is None or "Name" not in df:
+        return Leaderboard([], ("Name",), year)
+    columns = {"Name": Categorical(df["Name"].fillna("").astype(str).to_numpy())}
+    for source, field in FANGRAPHS_COLUMNS.items():
+        if source not in df:
+            columns[field] = np.full(len(df), np.nan)
+            continue
+        try:
+            columns[field] = df[source].to_numpy(dtype=float)
+        except (ValueError, TypeError):
+            # Object column with text cells: parse like a CSV leaderboard column
+            columns[field] = _typed_column(df[source].tolist())
+    return Leaderboard.from_columns(columns, ("Name",), year)
+
+
+def _load_fangraphs(kind, stale=None):
+    """Fetch FanGraphs batting or pitching stats (pre-season: falling back
+    to last year) and cache them. stale is the copy being refreshed, if any."""
+    cache_key = ("fangraphs_" + kind, YEAR, LEADERBOARD_FORMAT)
+    # Pre-season fallback: if empty (or failing) and before May, try last year
+    years = [YEAR, YEAR - 1] if date.today().month < 5 else [YEAR]
+    result = None
+    for year in years:
+        try:
+            if kind == "batting":
+                from pybaseball import batting_stats as fetch_stats
+            else:
+                from pybaseball import pitching_stats as fetch_stats
+            with metrics.track("pybaseball"):
+                df = fetch_stats(year, qual=25)
+        except deadline.DeadlineExceeded:
+            raise
+        except Exception as e:
+            print("Warning: FanGraphs " + kind + " fetch failed: " + str(e))
+            continue
+        result = _index_fangraphs(df, year)
+        if result:
+            break
+    if not result:
+        return _keep_stale(_fangraphs_cache, cache_key, stale, Leaderboard([], ("Name",)))
+    return _fangraphs_cache.set(cache_key, result)
+
+
 def _fetch_fangraphs_batting():
     """Fetch FanGraphs batting stats for plate discipline"""
-    cache_key = ("fangraphs_batting", YEAR)
-    cached = _cache_get(cache_key, TTL_FANGRAPHS)
-    if cached is not None:
-        return cached
-    try:
-        from pybaseball import batting_stats
-        year = YEAR
-        df = batting_stats(year, qual=25)
-        result = {}
-        # Pre-season fallback: if empty and before May, try last year
-        if (df is None or len(df) == 0) and date.today().month < 5:
-            year = YEAR - 1
-            df = batting_stats(year, qual=25)
-        if df is not None:
-            for _, row in df.iterrows():
-                name = row.get("Name", "")
-                if name:
-                    result[name.lower()] = {
-                        "bb_rate": row.get("BB%", None),
-                        "k_rate": row.get("K%", None),
-                        "o_swing_pct": row.get("O-Swing%", None),
-                        "z_contact_pct": row.get("Z-Contact%", None),
-                        "swstr_pct": row.get("SwStr%", None),
-                        "data_season": year,
-                    }
-        _cache_set(cache_key, result)
-        return result
-    except Exception as e:
-        print("Warning: FanGraphs batting fetch failed: " + str(e))
-        # Pre-season fallback on exception
-        if date.today().month < 5:
-            try:
-                from pybaseball import batting_stats
-                df = batting_stats(YEAR - 1, qual=25)
-                result = {}
-                if df is not None:
-                    for _, row in df.iterrows():
-                        name = row.get("Name", "")
-                        if name:
-                            result[name.lower()] = {
-                                "bb_rate": row.get("BB%", None),
-                                "k_rate": row.get("K%", None),
-                                "o_swing_pct": row.get("O-Swing%", None),
-                                "z_contact_pct": row.get("Z-Contact%", None),
-                                "swstr_pct": row.get("SwStr%", None),
-                                "data_season": YEAR - 1,
-                            }
-                _cache_set(cache_key, result)
-                return result
-            except Exception:
-                pass
-        return {}
+    cache_key = ("fangraphs_batting", YEAR, LEADERBOARD_FORMAT)
+    return _stale_while_revalidate(_fangraphs_cache, cache_key, _load_fangraphs, "batting")
 
 
 def _fetch_fangraphs_pitching():
     """Fetch FanGraphs pitching stats for plate discipline"""
-    cache_key = ("fangraphs_pitching", YEAR)
-    cached = _cache_get(cache_key, TTL_FANGRAPHS)
-    if cached is not None:
-        return cached
-    try:
-        from pybaseball import pitching_stats
-        year = YEAR
-        df = pitching_stats(year, qual=25)
-        result = {}
-        # Pre-season fallback: if empty and before May, try last year
-        if (df is None or len(df) == 0) and date.today().month < 5:
-            year = YEAR - 1
-            df = pitching_stats(year, qual=25)
-        if df is not None:
-            for _, row in df.iterrows():
-                name = row.get("Name", "")
-                if name:
-                    result[name.lower()] = {
-                        "bb_rate": row.get("BB%", None),
-                        "k_rate": row.get("K%", None),
-                        "o_swing_pct": row.get("O-Swing%", None),
-                        "z_contact_pct": row.get("Z-Contact%", None),
-                        "swstr_pct": row.get("SwStr%", None),
-                        "data_season": year,
-                    }
-        _cache_set(cache_key, result)
-        return result
-    except Exception as e:
-        print("Warning: FanGraphs pitching fetch failed: " + str(e))
-        # Pre-season fallback on exception
-        if date.today().month < 5:
-            try:
-                from pybaseball import pitching_stats
-                df = pitching_stats(YEAR - 1, qual=25)
-                result = {}
-                if df is not None:
-                    for _, row in df.iterrows():
-                        name = row.get("Name", "")
-                        if name:
-                            result[name.lower()] = {
-                                "bb_rate": row.get("BB%", None),
-                                "k_rate": row.get("K%", None),
-                                "o_swing_pct": row.get("O-Swing%", None),
-                                "z_contact_pct": row.get("Z-Contact%", None),
-                                "swstr_pct": row.get("SwStr%", None),
-                                "data_season": YEAR - 1,
-                            }
-                _cache_set(cache_key, result)
-                return result
-            except Exception:
-                pass
-        return {}
+    cache_key = ("fangraphs_pitching", YEAR, LEADERBOARD_FORMAT)
+    return _stale_while_revalidate(_fangraphs_cache, cache_key, _load_fangraphs, "pitching")
 
 
 # ============================================================
 # 4. Reddit JSON API Fetcher
 # ============================================================
 
+@coalesced
 def _fetch_reddit_hot():
     """Fetch hot posts from r/fantasybaseball"""
     cache_key = ("reddit_hot",)
-    cached = _cache_get(cache_key, TTL_REDDIT)
+    cached = _reddit_cache.get(cache_key)
     if cached is not None:
         return cached
     try:
         url = "https://www.reddit.com/r/fantasybaseball/hot.json?limit=50"
         req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
-        with urllib.request.urlopen(req, timeout=10) as response:
+        timeout = deadline.timeout(REDDIT_TIMEOUT)
+        with metrics.track("reddit"), urllib.request.urlopen(req, timeout=timeout) as response:
             data = json.loads(response.read().decode())
         posts = []
         for child in data.get("data", {}).get("children", []):
@@ -345,17 +571,18 @@ def _fetch_reddit_hot():
                 "created_utc": post.get("created_utc", 0),
                 "flair": post.get("link_flair_text", ""),
             })
-        _cache_set(cache_key, posts)
+        _reddit_cache.set(cache_key, posts)
         return posts
     except Exception as e:
         print("Warning: Reddit fetch failed: " + str(e))
         return []
 
 
+@coalesced
 def _search_reddit_player(player_name):
     """Search r/fantasybaseball for a specific player"""
     cache_key = ("reddit_search", player_name.lower())
-    cached = _cache_get(cache_key, TTL_REDDIT)
+    cached = _reddit_cache.get(cache_key)
     if cached is not None:
         return cached
     try:
@@ -366,7 +593,8 @@ def _search_reddit_player(player_name):
             + "&sort=new&restrict_sr=on&limit=10"
         )
         req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
-        with urllib.request.urlopen(req, timeout=10) as response:
+        timeout = deadline.timeout(REDDIT_TIMEOUT)
+        with metrics.track("reddit"), urllib.request.urlopen(req, timeout=timeout) as response:
             data = json.loads(response.read().decode())
         posts = []
         for child in data.get("data", {}).get("children", []):
@@ -377,7 +605,7 @@ def _search_reddit_player(player_name):
                 "num_comments": post.get("num_comments", 0),
                 "created_utc": post.get("created_utc", 0),
             })
-        _cache_set(cache_key, posts)
+        _reddit_cache.set(cache_key, posts)
         return posts
     except Exception as e:
         print("Warning: Reddit search failed: " + str(e))
@@ -388,24 +616,43 @@ def _search_reddit_player(player_name):
 # 5. MLB Stats API Fetchers
 # ============================================================
 
+@coalesced
 def _mlb_fetch(endpoint):
-    """Fetch from MLB Stats API"""
+    """Fetch from MLB Stats API. Returns None if the fetch failed."""
     url = MLB_API + endpoint
     try:
         req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
-        with urllib.request.urlopen(req, timeout=15) as response:
+        timeout = deadline.timeout(MLB_TIMEOUT)
+        with metrics.track("mlb_api"), urllib.request.urlopen(req, timeout=timeout) as response:
             return json.loads(response.read().decode())
+    except deadline.DeadlineExceeded:
+        raise
     except Exception as e:
         print("Warning: MLB API fetch failed for " + endpoint + ": " + str(e))
-        return {}
+        return None
+
+
+def _cached_mlb(cache_key, load, *args):
+    """_mlb_cache[cache_key], else load(*args) outside the caller's deadline
+    (see deadline.shared). load caches what it fetched; a failed fetch, or
+    running out of time here, gives [] without caching it."""
+    cached = _mlb_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    try:
+        return deadline.shared(load, *args)
+    except deadline.DeadlineExceeded:
+        return []
 
 
 def _fetch_mlb_transactions(days=7):
     """Fetch recent MLB transactions"""
+    return _cached_mlb(("mlb_transactions", days), _load_mlb_transactions, days)
+
+
+@coalesced
+def _load_mlb_transactions(days):
     cache_key = ("mlb_transactions", days)
-    cached = _cache_get(cache_key, TTL_MLB)
-    if cached is not None:
-        return cached
     try:
         end_date = date.today()
         start_date = end_date - timedelta(days=days)
@@ -414,6 +661,8 @@ def _fetch_mlb_transactions(days=7):
             + "&endDate=" + end_date.strftime("%m/%d/%Y")
         )
         data = _mlb_fetch(endpoint)
+        if data is None:
+            return []
         transactions = []
         for tx in data.get("transactions", []):
             tx_type = tx.get("typeDesc", "")
@@ -430,7 +679,7 @@ def _fetch_mlb_transactions(days=7):
                 "player_name": player_name,
                 "team": team_name,
             })
-        _cache_set(cache_key, transactions)
+        _mlb_cache.set(cache_key, transactions)
         return transactions
     except Exception as e:
         print("Warning: MLB transactions fetch failed: " + str(e))
@@ -442,9 +691,12 @@ def _fetch_mlb_game_log(mlb_id, stat_group="hitting", days=30):
     if not mlb_id:
         return []
     cache_key = ("mlb_gamelog", mlb_id, stat_group, days)
-    cached = _cache_get(cache_key, TTL_MLB)
-    if cached is not None:
-        return cached
+    return _cached_mlb(cache_key, _load_mlb_game_log, mlb_id, stat_group, days)
+
+
+@coalesced
+def _load_mlb_game_log(mlb_id, stat_group, days):
+    cache_key = ("mlb_gamelog", mlb_id, stat_group, days)
     try:
         end_date = date.today()
         start_date = end_date - timedelta(days=days)
@@ -456,6 +708,8 @@ def _fetch_mlb_game_log(mlb_id, stat_group="hitting", days=30):
             + "&endDate=" + end_date.strftime("%m/%d/%Y")
         )
         data = _mlb_fetch(endpoint)
+        if data is None:
+            return []
         games = []
         for split_group in data.get("stats", []):
             for split in split_group.get("splits", []):
@@ -465,7 +719,7 @@ def _fetch_mlb_game_log(mlb_id, stat_group="hitting", days=30):
                 entry = {"date": game_date, "opponent": opponent}
                 entry.update(stat)
                 games.append(entry)
-        _cache_set(cache_key, games)
+        _mlb_cache.set(cache_key, games)
         return games
     except Exception as e:
         print("Warning: MLB game log fetch failed for " + str(mlb_id) + ": " + str(e))
@@ -491,87 +745,49 @@ def _normalize_name(name):
     return name.strip()
 
 
-def _find_in_savant(player_name, savant_data):
-    """Find a player in Baseball Savant data by name matching"""
+def _find_in_savant(player_name, savant_data, mlb_id=None):
+    """Find a player in a Savant Leaderboard by MLB ID, falling back to name matching"""
     if not savant_data:
         return None
-    norm = _normalize_name(player_name)
-    # Try direct match on normalized names
-    for key, row in savant_data.items():
-        if key.startswith("id:"):
-            continue
-        if _normalize_name(key) == norm:
-            return row
-        # Also try the player_name field if it exists
-        if _normalize_name(row.get("player_name", "")) == norm:
-            return row
-        if _normalize_name(row.get("last_name, first_name", "")) == norm:
-            return row
-    # Fuzzy: check if all parts of the search name appear
-    parts = norm.split()
-    if parts:
-        for key, row in savant_data.items():
-            if key.startswith("id:"):
-                continue
-            row_norm = _normalize_name(key)
-            if all(p in row_norm for p in parts):
-                return row
-    return None
+    return savant_data.find(player_name, mlb_id)
 
 
 def _find_in_fangraphs(player_name, fg_data):
-    """Find a player in FanGraphs data by name matching"""
+    """Find a player in a FanGraphs Leaderboard by name matching"""
     if not fg_data:
         return None
-    norm = _normalize_name(player_name)
-    # Direct match
-    result = fg_data.get(norm)
-    if result:
-        return result
-    # Try partial matching
-    parts = norm.split()
-    if parts:
-        for key, row in fg_data.items():
-            if all(p in key for p in parts):
-                return row
-    return None
+    return fg_data.find(player_name)
 
 
 # ============================================================
 # 7. Percentile Rank Calculator
 # ============================================================
 
-def _percentile_rank(value, all_values, higher_is_better=True):
-    """Calculate percentile rank (0-100) for a value within a distribution"""
-    if not all_values or value is None:
-        return None
-    try:
-        val = float(value)
-        sorted_vals = sorted([float(v) for v in all_values if v is not None])
-        if not sorted_vals:
-            return None
-        count_below = sum(1 for v in sorted_vals if v < val)
-        pct = int(round(count_below / len(sorted_vals) * 100))
-        if not higher_is_better:
-            pct = 100 - pct
-        return max(0, min(100, pct))
-    except (ValueError, TypeError):
-        return None
+def _percentile_ranks(values, sorted_values, higher_is_better=True):
+    """Percentile ranks (0-100) for many values at once within an ascending
+    array: the share of the distribution strictly below each value, found
+    by binary search. Values that are None or not numbers rank None."""
+    if sorted_values is None or not len(sorted_values):
+        return [None] * len(values)
+    arr = np.full(len(values), np.nan)
+    for i, v in enumerate(values):
+        try:
+            arr[i] = float(v)
+        except (ValueError, TypeError):
+            pass
+    below = np.searchsorted(sorted_values, arr, side="left")
+    pct = np.rint(below / float(len(sorted_values)) * 100)
+    if not higher_is_better:
+        pct = 100 - pct
+    pct = np.clip(pct, 0, 100)
+    return [None if np.isnan(a) else int(p) for a, p in zip(arr, pct)]
 
 
-def _collect_column_values(savant_data, column):
-    """Collect all non-empty values for a column from Savant data"""
-    values = []
-    for key, row in savant_data.items():
-        if key.startswith("id:"):
-            continue
-        val = row.get(column, "")
-        if val != "" and val is not None:
-            try:
-                values.append(float(val))
-            except (ValueError, TypeError):
-                pass
-    return values
+def _percentile_rank(value, sorted_values, higher_is_better=True):
+    """Percentile rank (0-100) of one value within an ascending array"""
+    if value is None:
+        return None
+    return _percentile_ranks([value], sorted_values, higher_is_better)[0]
 
 
 # ============================================================
@@ -656,11 +872,11 @@ def _detect_player_type(name, mlb_id):
     """
     # Check batter data first
     batter_data = _fetch_savant_expected("batter")
-    if _find_in_savant(name, batter_data):
+    if _find_in_savant(name, batter_data, mlb_id):
         return "batter"
     # Check pitcher data
     pitcher_data = _fetch_savant_expected("pitcher")
-    if _find_in_savant(name, pitcher_data):
+    if _find_in_savant(name, pitcher_data, mlb_id):
         return "pitcher"
     # Fallback: try MLB API
     if mlb_id:
@@ -688,12 +904,12 @@ def _build_statcast(name, mlb_id):
         statcast_data = _fetch_savant_statcast(savant_type)
         sprint_data = _fetch_savant_sprint_speed(savant_type) if player_type == "batter" else {}
 
-        expected_row = _find_in_savant(name, expected_data)
-        statcast_row = _find_in_savant(name, statcast_data)
-        sprint_row = _find_in_savant(name, sprint_data)
+        expected_row = _find_in_savant(name, expected_data, mlb_id)
+        statcast_row = _find_in_savant(name, statcast_data, mlb_id)
+        sprint_row = _find_in_savant(name, sprint_data, mlb_id)
 
         # Determine data season (may be prior year in pre-season)
-        data_season = expected_data.get("__data_season", YEAR) if expected_data else YEAR
+        data_season = (expected_data.data_season or YEAR) if expected_data else YEAR
 
         result = {"player_type": player_type, "data_season": data_season}
 
@@ -707,13 +923,9 @@ def _build_statcast(name, mlb_id):
             slg = _safe_float(expected_row.get("slg"))
             pa = _safe_float(expected_row.get("pa"))
 
-            all_xwoba = _collect_column_values(expected_data, "est_woba")
-            all_xba = _collect_column_values(expected_data, "est_ba")
-            all_xslg = _collect_column_values(expected_data, "est_slg")
-
-            xwoba_pct = _percentile_rank(xwoba, all_xwoba)
-            xba_pct = _percentile_rank(xba, all_xba)
-            xslg_pct = _percentile_rank(xslg, all_xslg)
+            xwoba_pct = expected_data.percentile(xwoba, "est_woba")
+            xba_pct = expected_data.percentile(xba, "est_ba")
+            xslg_pct = expected_data.percentile(xslg, "est_slg")
 
             result["expected"] = {
                 "xwoba": xwoba,
@@ -738,13 +950,9 @@ def _build_statcast(name, mlb_id):
             hard_hit_pct = _safe_float(statcast_row.get("hard_hit_percent", statcast_row.get("hard_hit_rate")))
             la = _safe_float(statcast_row.get("avg_launch_angle", statcast_row.get("launch_angle_avg")))
 
-            all_ev = _collect_column_values(statcast_data, "avg_hit_speed") or _collect_column_values(statcast_data, "exit_velocity_avg")
-            all_barrel = _collect_column_values(statcast_data, "brl_percent") or _collect_column_values(statcast_data, "barrel_batted_rate")
-            all_hard = _collect_column_values(statcast_data, "hard_hit_percent") or _collect_column_values(statcast_data, "hard_hit_rate")
-
-            ev_pct = _percentile_rank(avg_ev, all_ev)
-            barrel_pct_rank = _percentile_rank(barrel_pct, all_barrel)
-            hard_pct_rank = _percentile_rank(hard_hit_pct, all_hard)
+            ev_pct = statcast_data.percentile(avg_ev, "avg_hit_speed", "exit_velocity_avg")
+            barrel_pct_rank = statcast_data.percentile(barrel_pct, "brl_percent", "barrel_batted_rate")
+            hard_pct_rank = statcast_data.percentile(hard_hit_pct, "hard_hit_percent", "hard_hit_rate")
 
             result["batted_ball"] = {
                 "avg_exit_velo": avg_ev,
@@ -762,11 +970,7 @@ def _build_statcast(name, mlb_id):
         # Sprint speed (batters only)
         if sprint_row:
             sprint_speed = _safe_float(sprint_row.get("hp_to_1b", sprint_row.get("sprint_speed")))
-            all_sprint = (
-                _collect_column_values(sprint_data, "hp_to_1b")
-                or _collect_column_values(sprint_data, "sprint_speed")
-            )
-            sprint_pct = _percentile_rank(sprint_speed, all_sprint)
+            sprint_pct = sprint_data.percentile(sprint_speed, "hp_to_1b", "sprint_speed")
             result["speed"] = {
                 "sprint_speed": sprint_speed,
                 "sprint_pct": sprint_pct,
@@ -777,7 +981,7 @@ def _build_statcast(name, mlb_id):
         if player_type == "pitcher":
             try:
                 arsenal_data = _fetch_savant_pitch_arsenal("pitcher")
-                arsenal_row = _find_in_savant(name, arsenal_data)
+                arsenal_row = _find_in_savant(name, arsenal_data, mlb_id)
                 if arsenal_row:
                     result["pitch_arsenal"] = {
                         "pitch_type": arsenal_row.get("pitch_type", ""),
@@ -956,11 +1160,11 @@ def _build_percentiles(name, mlb_id):
         if not pct_data:
             return {"note": "Percentile data not available"}
 
-        row = _find_in_savant(name, pct_data)
+        row = _find_in_savant(name, pct_data, mlb_id)
         if not row:
             return {"note": "Player not found in percentile rankings"}
 
-        data_season = pct_data.get("__data_season", YEAR)
+        data_season = pct_data.data_season or YEAR
 
         # Extract available percentile columns
         result = {"data_season": data_season, "player_type": player_type}
@@ -1032,6 +1236,10 @@ def player_intel(name, include=None):
     """
     if include is None:
         include = ["statcast", "trends", "context", "discipline", "percentiles"]
+    # Sections the API request's exclude= projection would drop anyway
+    skipped = projection.skipped_intel_sections()
+    if skipped:
+        include = [s for s in include if s not in skipped]
 
     result = {"name": name}
 
@@ -1206,6 +1414,34 @@ def cmd_player_report(args, as_json=False):
         print("  " + percentiles.get("note", ""))
 
 
+def _column_or_zeros(board, name):
+    values = board.numeric(name)
+    return values if values is not None else np.zeros(len(board))
+
+
+def _woba_gap_candidates(expected, sign):
+    """Players whose xwOBA - wOBA gap (times sign) exceeds .020, biggest first.
+    Filters the whole leaderboard with column arithmetic; rows with a blank
+    xwOBA, wOBA or PA are skipped."""
+    xwoba = _column_or_zeros(expected, "est_woba")
+    woba = _column_or_zeros(expected, "woba")
+    pa = _column_or_zeros(expected, "pa")
+    diff = (xwoba - woba) * sign
+    picked = np.flatnonzero((diff > 0.020) & ~np.isnan(pa))
+    names = expected.text("player_name", "last_name, first_name")
+    candidates = []
+    for i in picked:
+        candidates.append({
+            "name": names[i],
+            "woba": round(float(woba[i]), 3),
+            "xwoba": round(float(xwoba[i]), 3),
+            "diff": round(float(diff[i]), 3),
+            "pa": int(pa[i]),
+        })
+    candidates.sort(key=lambda x: -x.get("diff", 0))
+    return candidates
+
+
 def cmd_breakouts(args, as_json=False):
     """Players where xwOBA >> wOBA (unlucky, due for positive regression)"""
     pos_type = args[0] if args else "B"
@@ -1223,25 +1459,7 @@ def cmd_breakouts(args, as_json=False):
         print("Could not fetch Savant data")
         return
     # Find players with biggest positive xwOBA - wOBA diff
-    candidates = []
-    for key, row in expected.items():
-        if key.startswith("id:"):
-            continue
-        try:
-            xwoba = float(row.get("est_woba", 0))
-            woba = float(row.get("woba", 0))
-            diff = xwoba - woba
-            if diff > 0.020:
-                candidates.append({
-                    "name": row.get("player_name", key),
-                    "woba": round(woba, 3),
-                    "xwoba": round(xwoba, 3),
-                    "diff": round(diff, 3),
-                    "pa": int(float(row.get("pa", 0))),
-                })
-        except (ValueError, TypeError):
-            pass
-    candidates.sort(key=lambda x: -x.get("diff", 0))
+    candidates = _woba_gap_candidates(expected, 1)
     candidates = candidates[:count]
     if as_json:
         return {"pos_type": pos_type, "candidates": candidates}
@@ -1276,25 +1494,7 @@ def cmd_busts(args, as_json=False):
         print("Could not fetch Savant data")
         return
     # Find players with biggest negative xwOBA - wOBA diff (wOBA >> xwOBA)
-    candidates = []
-    for key, row in expected.items():
-        if key.startswith("id:"):
-            continue
-        try:
-            xwoba = float(row.get("est_woba", 0))
-            woba = float(row.get("woba", 0))
-            diff = woba - xwoba
-            if diff > 0.020:
-                candidates.append({
-                    "name": row.get("player_name", key),
-                    "woba": round(woba, 3),
-                    "xwoba": round(xwoba, 3),
-                    "diff": round(diff, 3),
-                    "pa": int(float(row.get("pa", 0))),
-                })
-        except (ValueError, TypeError):
-            pass
-    candidates.sort(key=lambda x: -x.get("diff", 0))
+    candidates = _woba_gap_candidates(expected, -1)
     candidates = candidates[:count]
     if as_json:
         return {"pos_type": pos_type, "candidates": candidates}
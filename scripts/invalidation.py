@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Invalidation Bus - Write operations announce which league state they changed
+
+Caches subscribe to events and evict only what the event makes stale, so
+they can keep long TTLs without serving a pre-move roster after our own add,
+drop, lineup change or trade. Events:
+
+  roster_changed(team)   a team's roster or lineup changed (team=None: unknown team)
+  fa_pool_changed()      players were added to or removed from the free agent pool
+  trades_changed()       a trade was proposed, accepted or rejected
+  projections_changed()  projection CSVs were refreshed
+  cache_flushed(namespace)  a data_cache namespace was flushed (None: all)
+
+publish() runs this process's subscribers right away and appends the event
+to a shared log in DATA_DIR; other api-server workers pick it up on their
+next poll() (called before each request).
+"""
+
+import os
+import json
+import time
+import fcntl
+import threading
+
+DATA_DIR = os.environ.get("DATA_DIR", "/app/data")
+LOG_FILE = os.path.join(DATA_DIR, ".invalidation.log")
+
+# The log is truncated when it grows past this; a reader that notices the
+# truncation replays every event with no payload (broad eviction)
+LOG_MAX_BYTES = 262144
+
+EVENTS = ("roster_changed", "fa_pool_changed", "trades_changed", "projections_changed")
+
+_lock = threading.Lock()
+_subscribers = {}
+_stats = {"published": {}, "received": {}, "subscriber_errors": 0}
+
+
+def _log_size():
+    try:
+        return os.path.getsize(LOG_FILE)
+    except OSError:
+        return 0
+
+
+# Bytes of LOG_FILE already applied by this process. Set at import so a new
+# process (or the gunicorn master, before forking) skips old events.
+_offset = _log_size()
+
+
+def subscribe(event, fn):
+    """Call fn(**payload) whenever event is published (in any worker)"""
+    with _lock:
+        _subscribers.setdefault(event, []).append(fn)
+
+
+def _dispatch(event, payload, counter):
+    with _lock:
+        fns = list(_subscribers.get(event, []))
+        _stats[counter][event] = _stats[counter].get(event, 0) + 1
+    for fn in fns:
+        try:
+            fn(**payload)
+        except Exception as e:
+            with _lock:
+                _stats["subscriber_errors"] += 1
+            print("Warning: invalidation subscriber failed for " + event + ": " + str(e))
+
+
+def _append(event, payload):
+    line = json.dumps({"event": event, "payload": payload, "pid": os.getpid(), "at": time.time()}) + "\n"
+    try:
+        os.makedirs(DATA_DIR, exist_ok=True)
+        with open(LOG_FILE, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                if os.fstat(f.fileno()).st_size > LOG_MAX_BYTES:
+                    f.truncate(0)
+                f.write(line)
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+    except OSError as e:
+        print("Warning: could not write invalidation log: " + str(e))
+
+
+def publish(event, **payload):
+    """Announce a state change to every subscriber in every worker"""
+    _dispatch(event, payload, "published")
+    _append(event, payload)
+
+
+def poll():
+    """Apply events published by other processes since the last poll.
+    Returns how many were applied.
+    """
+    global _offset
+    size = _log_size()
+    with _lock:
+        if size == _offset:
+            return 0
+        truncated = size < _offset
+        start = 0 if truncated else _offset
+        try:
+            with open(LOG_FILE, "r") as f:
+                f.seek(start)
+                data = f.read(size - start)
+        except OSError:
+            return 0
+        # Leave a partially written last line for the next poll
+        end = data.rfind("\n") + 1
+        _offset = start + end
+    entries = []
+    for line in data[:end].splitlines():
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            continue
+    if truncated:
+        # Events between our last poll and the truncation are lost
+        for event in EVENTS:
+            _dispatch(event, {}, "received")
+    me = os.getpid()
+    applied = 0
+    for entry in entries:
+        if entry.get("pid") == me:
+            continue
+        _dispatch(entry.get("event", ""), entry.get("payload") or {}, "received")
+        applied += 1
+    return applied
+
+
+# --- Event helpers ---
+
+
+def roster_changed(team=None):
+    publish("roster_changed", team=team)
+
+
+def fa_pool_changed():
+    publish("fa_pool_changed")
+
+
+def trades_changed():
+    publish("trades_changed")
+
+
+def projections_changed():
+    publish("projections_changed")
+
+
+def cache_flushed(namespace=None):
+    publish("cache_flushed", namespace=namespace)
+
+
+def get_stats():
+    """Published/received counts per event"""
+    with _lock:
+        return {
+            "published": dict(_stats["published"]),
+            "received": dict(_stats["received"]),
+            "subscriber_errors": _stats["subscriber_errors"],
+            "subscribers": {event: len(fns) for event, fns in _subscribers.items()},
+        }
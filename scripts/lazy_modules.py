@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Lazy Module Registry - Defers importing command modules until first use
+
+api-server used to import every command module (and through them pandas,
+numpy, yahoo_fantasy_api, ...) at startup. lazy("season-manager") returns a
+stand-in that imports the real module on the first attribute access, so a
+route only pays for the modules it actually touches.
+"""
+
+import time
+import threading
+import importlib
+
+# RLock: importing one module may touch another lazy module
+_lock = threading.RLock()
+_registry = {}
+_load_times = {}
+
+
+class LazyModule:
+    """Proxy that imports a module on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            with _lock:
+                module = self._module
+                if module is None:
+                    started = time.time()
+                    module = importlib.import_module(self._name)
+                    _load_times[self._name] = round((time.time() - started) * 1000, 1)
+                    self._module = module
+        return module
+
+    def __getattr__(self, attr):
+        # Only called for names not set in __init__
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return "<lazy module " + repr(self._name) + " (" + state + ")>"
+
+
+def lazy(name):
+    """Get the shared lazy proxy for a module name (hyphenated names are fine)"""
+    with _lock:
+        proxy = _registry.get(name)
+        if proxy is None:
+            proxy = LazyModule(name)
+            _registry[name] = proxy
+        return proxy
+
+
+def preload(names=None):
+    """Import registered modules now (all of them by default), e.g. in the
+    gunicorn master before forking. Failures are reported, not raised.
+    """
+    with _lock:
+        targets = list(_registry) if names is None else list(names)
+    for name in targets:
+        try:
+            lazy(name)._load()
+        except Exception as e:
+            print("Warning: could not preload " + name + ": " + str(e))
+
+
+def get_stats():
+    """Which registered modules are loaded and how long each import took (ms)"""
+    with _lock:
+        return {
+            name: {
+                "loaded": proxy._module is not None,
+                "import_ms": _load_times.get(name),
+            }
+            for name, proxy in _registry.items()
+        }
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""Request-scoped Yahoo League Context - Memoizes Yahoo reads for one API request or CLI run
+
+Every cmd_* used to open its own OAuth connection, build yfa.Game and
+to_league(), then re-fetch the roster/scoreboard/teams it needed. A
+LeagueContext does that setup once and caches each upstream read, so a
+workflow that fans out to five commands makes one Yahoo call per resource.
+
+Returned objects are shared between callers in the same scope; treat them
+as read-only.
+
+yahoo_oauth and yahoo_fantasy_api are imported on first connect, so
+importing this module (api-server, cli_daemon) stays cheap.
+"""
+
+import os
+import fcntl
+import threading
+import contextvars
+
+import metrics
+
+OAUTH_FILE = os.environ.get("OAUTH_FILE", "/app/config/yahoo_oauth.json")
+LEAGUE_ID = os.environ.get("LEAGUE_ID", "")
+TEAM_ID = os.environ.get("TEAM_ID", "")
+
+# Token refresh rewrites OAUTH_FILE, so only one context may connect at a time
+# (the thread lock covers this process, the file lock other api-server workers)
+_connect_lock = threading.Lock()
+OAUTH_LOCK_FILE = OAUTH_FILE + ".lock"
+
+# The context active for the current request / CLI run (see activate())
+_current = contextvars.ContextVar("league_context", default=None)
+
+
+def _connect():
+    """Get authenticated Yahoo connection"""
+    from yahoo_oauth import OAuth2
+    with _connect_lock:
+        with open(OAUTH_LOCK_FILE, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                sc = OAuth2(None, None, from_file=OAUTH_FILE)
+                if not sc.token_is_valid():
+                    sc.refresh_access_token()
+                metrics.instrument_session(sc.session)
+                return sc
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class LeagueContext:
+    """Lazily connects to Yahoo and memoizes league reads for one scope"""
+
+    def __init__(self, league_id=None, team_id=None):
+        self.league_id = league_id or LEAGUE_ID
+        self.team_id = team_id or TEAM_ID
+        self._lock = threading.Lock()
+        self._memo = {}
+        self._key_locks = {}
+
+    def _get(self, key, fetch):
+        """Return the memoized value for key, fetching it at most once.
+        Concurrent callers of the same key wait for the first fetch. Errors
+        are not cached, so the next caller retries.
+        """
+        with self._lock:
+            if key in self._memo:
+                return self._memo[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                if key in self._memo:
+                    return self._memo[key]
+            value = fetch()
+            with self._lock:
+                self._memo[key] = value
+            return value
+
+    # --- Connection objects ---
+
+    def connection(self):
+        """Authenticated OAuth2 session"""
+        return self._get(("connection",), _connect)
+
+    def game(self):
+        """yfa.Game for MLB"""
+        import yahoo_fantasy_api as yfa
+        return self._get(("game",), lambda: yfa.Game(self.connection(), "mlb"))
+
+    def league(self):
+        """yfa.League for LEAGUE_ID"""
+        if not self.league_id or not self.team_id:
+            raise ValueError("LEAGUE_ID and TEAM_ID environment variables are required")
+        return self._get(("league",), lambda: self.game().to_league(self.league_id))
+
+    def team(self, team_key=None):
+        """yfa.Team for team_key (default: our team)"""
+        team_key = team_key or self.team_id
+        return self._get(("team", team_key), lambda: self.league().to_team(team_key))
+
+    # --- Memoized reads ---
+
+    def roster(self, team_key=None):
+        """Current roster for team_key (default: our team)"""
+        team_key = team_key or self.team_id
+        return self._get(("roster", team_key), lambda: self.team(team_key).roster())
+
+    def scoreboard(self):
+        """Current week scoreboard"""
+        return self._get(("scoreboard",), lambda: self.league().scoreboard())
+
+    def matchups(self, week=None):
+        """Raw matchups payload, for the current week or a given week"""
+        if week:
+            return self._get(("matchups", str(week)), lambda: self.league().matchups(week=week))
+        return self._get(("matchups", None), lambda: self.league().matchups())
+
+    def teams(self):
+        """All league teams keyed by team_key"""
+        return self._get(("teams",), lambda: self.league().teams())
+
+    def standings(self):
+        """League standings"""
+        return self._get(("standings",), lambda: self.league().standings())
+
+    def settings(self):
+        """League settings"""
+        return self._get(("settings",), lambda: self.league().settings())
+
+    def stat_categories(self):
+        """League scoring categories"""
+        return self._get(("stat_categories",), lambda: self.league().stat_categories())
+
+    def current_week(self):
+        """Current matchup week number"""
+        return self._get(("current_week",), lambda: self.league().current_week())
+
+    def free_agents(self, pos_type):
+        """Full free agent list for a position type (B, P, or a position)"""
+        return self._get(("free_agents", pos_type), lambda: self.league().free_agents(pos_type))
+
+    def taken_players(self):
+        """Every player on a league roster"""
+        return self._get(("taken_players",), lambda: self.league().taken_players())
+
+    def transactions(self, tx_type, count):
+        """Recent league transactions of a type"""
+        return self._get(
+            ("transactions", tx_type, str(count)),
+            lambda: self.league().transactions(tx_type, count),
+        )
+
+
+def current():
+    """Return the active LeagueContext for this request/run, or None"""
+    return _current.get()
+
+
+def activate(ctx):
+    """Make ctx the active context. Returns a token for deactivate()."""
+    return _current.set(ctx)
+
+
+def deactivate(token):
+    """Restore whatever context was active before activate()"""
+    _current.reset(token)
+
+
+def resolve(ctx=None):
+    """Pick the context a cmd_* should use: the one passed in, else the
+    active request-scoped one, else a fresh one for this call only.
+    """
+    if ctx is not None:
+        return ctx
+    active = _current.get()
+    if active is not None:
+        return active
+    return LeagueContext()
@@ -0,0 +1,643 @@
+#!/usr/bin/env python3
+"""Metrics - Route latency histograms and upstream call accounting
+
+Routes are recorded by api-server's request hooks; upstream call sites
+(Savant CSVs, MLB Stats API, Yahoo, pybaseball, Playwright) wrap their work
+in track(kind). Upstream calls are also charged to the API request that made
+them -- including calls made on workflow/batch worker threads, which inherit
+the request's context -- so /api/metrics can show e.g. that morning-briefing
+averages 23 Yahoo calls and 8 s in pybaseball.
+
+Exposed by api-server at /api/metrics as Prometheus text (default) or a JSON
+summary (?format=json).
+
+Under gunicorn every worker records its own numbers. After share() (called
+in the master before workers fork) each process writes its raw counters,
+histogram buckets and recent samples to DATA_DIR/metrics/<pid>.json every
+FLUSH_INTERVAL seconds, and snapshot()/prometheus_text() sum every file, so
+whichever worker answers a scrape reports the same server-wide counters
+(like Prometheus' multiprocess mode). A dead worker's file is folded into
+archive.json so counters never go backwards; its quantile samples are
+dropped. Series passed in as extra (response cache, pools, ...) stay per
+process and carry a worker="<pid>" label.
+"""
+
+import os
+import json
+import time
+import fcntl
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+import upstream_budget
+
+# Histogram bucket upper bounds in seconds (+Inf is implicit)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Recent samples kept per histogram for p50/p95/p99
+RESERVOIR_SIZE = 1024
+
+# Known upstream kinds, so they show up in output before the first call
+UPSTREAMS = ("yahoo", "savant", "mlb_api", "pybaseball", "playwright", "reddit", "fangraphs")
+
+SHARED_DIR = os.path.join(os.environ.get("DATA_DIR", "/app/data"), "metrics")
+# Seconds between writes of this process's state to SHARED_DIR
+FLUSH_INTERVAL = 5.0
+
+_lock = threading.Lock()
+_started = time.time()
+_shared = {"dir": None, "stop": None}
+
+
+class Histogram:
+    """Cumulative bucket counts plus a window of recent samples for quantiles"""
+
+    def __init__(self, reservoir=RESERVOIR_SIZE):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        # None keeps every sample (a merged view of several workers' windows)
+        self.recent = deque(maxlen=reservoir)
+
+    def observe(self, seconds):
+        idx = len(BUCKETS)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                idx = i
+                break
+        self.counts[idx] += 1
+        self.total += seconds
+        self.count += 1
+        self.recent.append(seconds)
+
+    def export(self, samples=True):
+        return {
+            "counts": list(self.counts),
+            "total": self.total,
+            "count": self.count,
+            "recent": list(self.recent) if samples else [],
+        }
+
+    def merge(self, data):
+        """Add another process's exported histogram into this one"""
+        for i, c in enumerate(data.get("counts", [])[:len(self.counts)]):
+            self.counts[i] += c
+        self.total += data.get("total", 0.0)
+        self.count += data.get("count", 0)
+        self.recent.extend(data.get("recent", []))
+
+    def quantiles(self):
+        """p50/p95/p99 over the recent window, in seconds"""
+        samples = sorted(self.recent)
+        if not samples:
+            return {"p50": None, "p95": None, "p99": None}
+        n = len(samples)
+        return {
+            "p50": samples[min(n - 1, int(n * 0.50))],
+            "p95": samples[min(n - 1, int(n * 0.95))],
+            "p99": samples[min(n - 1, int(n * 0.99))],
+        }
+
+
+def _new_usage():
+    return {"calls": 0, "errors": 0, "seconds": 0.0}
+
+
+def _new_route(reservoir=RESERVOIR_SIZE):
+    return {
+        "latency": Histogram(reservoir),
+        "requests": 0,
+        "errors": 0,
+        "cache_hits": 0,
+        "cache_misses": 0,
+        "not_modified": 0,
+        "upstream": {},
+    }
+
+
+_routes = {}
+_upstreams = {kind: {"latency": Histogram(), "calls": 0, "errors": 0} for kind in UPSTREAMS}
+
+
+class _RequestUsage:
+    """Upstream calls made on behalf of one API request (shared across its threads)"""
+
+    def __init__(self, parent=None, log=None):
+        self.parent = parent
+        self.lock = threading.Lock()
+        self.by_kind = {}
+        self.log = log
+
+    def add(self, kind, seconds, error):
+        with self.lock:
+            if self.log is not None:
+                self.log.append((kind, seconds, error))
+            usage = self.by_kind.setdefault(kind, _new_usage())
+            usage["calls"] += 1
+            usage["seconds"] += seconds
+            if error:
+                usage["errors"] += 1
+
+
+_current_usage = contextvars.ContextVar("metrics_request_usage", default=None)
+
+# List that upstream calls are also appended to as timed spans, while a
+# profile (profiling.py) is recording this request
+_span_sink = contextvars.ContextVar("metrics_span_sink", default=None)
+
+
+# --- Upstream calls ---
+
+
+def record_upstream(kind, seconds, error=False):
+    """Record one upstream call globally and against the current request"""
+    with _lock:
+        stats = _upstreams.get(kind)
+        if stats is None:
+            stats = {"latency": Histogram(), "calls": 0, "errors": 0}
+            _upstreams[kind] = stats
+        stats["latency"].observe(seconds)
+        stats["calls"] += 1
+        if error:
+            stats["errors"] += 1
+    usage = _current_usage.get()
+    if usage is not None:
+        usage.add(kind, seconds, error)
+    spans = _span_sink.get()
+    if spans is not None:
+        spans.append((kind, time.time() - seconds, seconds, error, threading.get_ident()))
+
+
+@contextmanager
+def track(kind):
+    """Time the enclosed upstream call; an exception counts as an error and
+    is re-raised. Waits for the upstream's rate budget first (not timed)."""
+    upstream_budget.acquire(kind)
+    started = time.time()
+    error = False
+    try:
+        yield
+    except BaseException as e:
+        error = True
+        status = getattr(e, "code", None) or getattr(getattr(e, "response", None), "status_code", None)
+        if upstream_budget.is_throttle_status(status):
+            upstream_budget.throttled(kind)
+        raise
+    finally:
+        record_upstream(kind, time.time() - started, error)
+
+
+def instrument_session(session, kind="yahoo"):
+    """Count every HTTP request made through a requests.Session (used for the
+    yahoo_oauth session that yahoo_fantasy_api calls go through). 4xx/5xx
+    responses count as errors; each request also waits for the rate budget."""
+    if getattr(session, "_metrics_instrumented", False):
+        return session
+    original = session.request
+
+    def request(*args, **kwargs):
+        upstream_budget.acquire(kind)
+        started = time.time()
+        error = True
+        try:
+            response = original(*args, **kwargs)
+            error = response.status_code >= 400
+            if upstream_budget.is_throttle_status(response.status_code):
+                upstream_budget.throttled(kind)
+            return response
+        finally:
+            record_upstream(kind, time.time() - started, error)
+
+    session.request = request
+    session._metrics_instrumented = True
+    return session
+
+
+# --- API routes ---
+
+
+def begin_request():
+    """Start charging upstream calls to a new request. Returns a token for end_request()."""
+    return _current_usage.set(_RequestUsage(parent=_current_usage.get()))
+
+
+def end_request(token, route, status, seconds, cache=None):
+    """Record a finished request. cache is the X-Cache value ("HIT"/"MISS") if any."""
+    usage = _current_usage.get()
+    _current_usage.reset(token)
+    by_kind = {}
+    if usage is not None:
+        with usage.lock:
+            by_kind = {k: dict(v) for k, v in usage.by_kind.items()}
+        # A /api/batch sub-request's calls also count toward the batch
+        if usage.parent is not None:
+            with usage.parent.lock:
+                for kind, u in by_kind.items():
+                    total = usage.parent.by_kind.setdefault(kind, _new_usage())
+                    for field in ("calls", "errors", "seconds"):
+                        total[field] += u[field]
+
+    with _lock:
+        stats = _routes.get(route)
+        if stats is None:
+            stats = _new_route()
+            _routes[route] = stats
+        stats["latency"].observe(seconds)
+        stats["requests"] += 1
+        if status >= 500:
+            stats["errors"] += 1
+        if status == 304:
+            stats["not_modified"] += 1
+        if cache == "HIT":
+            stats["cache_hits"] += 1
+        elif cache == "MISS":
+            stats["cache_misses"] += 1
+        for kind, u in by_kind.items():
+            total = stats["upstream"].setdefault(kind, _new_usage())
+            for field in ("calls", "errors", "seconds"):
+                total[field] += u[field]
+    return by_kind
+
+
+def begin_capture():
+    """Keep a list of the upstream calls made from here on (used by pool
+    workers to hand their calls back to the api-server process)"""
+    return _current_usage.set(_RequestUsage(log=[]))
+
+
+def end_capture(token):
+    """Stop capturing. Returns [(kind, seconds, error), ...]."""
+    usage = _current_usage.get()
+    _current_usage.reset(token)
+    return list(usage.log) if usage is not None else []
+
+
+def begin_spans():
+    """Collect upstream calls made from here on (and in threads that copy
+    this context) as (kind, started_at, seconds, error, thread_ident).
+    Returns (token for end_spans(), the list being filled)."""
+    spans = []
+    return _span_sink.set(spans), spans
+
+
+def end_spans(token):
+    """Stop collecting in this context. Threads that already copied it keep
+    appending to the list."""
+    _span_sink.reset(token)
+
+
+def replay(calls):
+    """Record upstream calls captured in another process"""
+    for kind, seconds, error in calls:
+        record_upstream(kind, seconds, error)
+
+
+# --- Sharing across gunicorn workers ---
+
+
+def _export(samples=True):
+    """This process's raw state as plain data (call with _lock held)"""
+    routes = {}
+    for route, s in _routes.items():
+        r = {k: v for k, v in s.items() if k not in ("latency", "upstream")}
+        r["latency"] = s["latency"].export(samples)
+        r["upstream"] = {kind: dict(u) for kind, u in s["upstream"].items()}
+        routes[route] = r
+    upstreams = {
+        kind: {"latency": s["latency"].export(samples), "calls": s["calls"], "errors": s["errors"]}
+        for kind, s in _upstreams.items()
+    }
+    return {"routes": routes, "upstreams": upstreams}
+
+
+def _merge_into(routes, upstreams, data):
+    for route, r in data.get("routes", {}).items():
+        stats = routes.get(route)
+        if stats is None:
+            stats = _new_route(None)
+            routes[route] = stats
+        stats["latency"].merge(r.get("latency", {}))
+        for field in ("requests", "errors", "cache_hits", "cache_misses", "not_modified"):
+            stats[field] += r.get(field, 0)
+        for kind, u in r.get("upstream", {}).items():
+            total = stats["upstream"].setdefault(kind, _new_usage())
+            for field in ("calls", "errors", "seconds"):
+                total[field] += u.get(field, 0)
+    for kind, u in data.get("upstreams", {}).items():
+        stats = upstreams.get(kind)
+        if stats is None:
+            stats = {"latency": Histogram(None), "calls": 0, "errors": 0}
+            upstreams[kind] = stats
+        stats["latency"].merge(u.get("latency", {}))
+        stats["calls"] += u.get("calls", 0)
+        stats["errors"] += u.get("errors", 0)
+
+
+def _write_json(path, data):
+    tmp = path + "." + str(os.getpid()) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def flush():
+    """Write this process's state to the shared directory (if sharing)"""
+    directory = _shared["dir"]
+    if directory is None:
+        return
+    with _lock:
+        data = _export()
+    try:
+        _write_json(os.path.join(directory, str(os.getpid()) + ".json"), data)
+    except OSError as e:
+        print("Warning: could not write shared metrics: " + str(e))
+
+
+def _archive_dead(directory):
+    """Fold the files of workers that have exited into archive.json"""
+    dead = []
+    for f in os.listdir(directory):
+        if f.endswith(".json") and f[:-len(".json")].isdigit():
+            if not _pid_alive(int(f[:-len(".json")])):
+                dead.append(os.path.join(directory, f))
+    if not dead:
+        return
+    with open(os.path.join(directory, ".lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        archive_path = os.path.join(directory, "archive.json")
+        routes, upstreams = {}, {}
+        _merge_into(routes, upstreams, _read_json(archive_path) or {})
+        folded = []
+        for path in dead:
+            data = _read_json(path)
+            if data is None:
+                continue
+            _merge_into(routes, upstreams, data)
+            folded.append(path)
+        if not folded:
+            return
+        archived = {
+            "routes": {r: dict(s, latency=s["latency"].export(False)) for r, s in routes.items()},
+            "upstreams": {k: dict(s, latency=s["latency"].export(False)) for k, s in upstreams.items()},
+        }
+        _write_json(archive_path, archived)
+        for path in folded:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _collect():
+    """(routes, upstreams) to report: this process's, plus every other
+    worker's and the archive's when sharing"""
+    routes = {}
+    upstreams = {kind: {"latency": Histogram(None), "calls": 0, "errors": 0} for kind in UPSTREAMS}
+    with _lock:
+        own = _export()
+    _merge_into(routes, upstreams, own)
+    directory = _shared["dir"]
+    if directory is None:
+        return routes, upstreams
+    try:
+        _archive_dead(directory)
+        names = os.listdir(directory)
+    except OSError as e:
+        print("Warning: could not read shared metrics: " + str(e))
+        return routes, upstreams
+    for f in names:
+        if not f.endswith(".json") or f == str(os.getpid()) + ".json":
+            continue
+        data = _read_json(os.path.join(directory, f))
+        if data is not None:
+            _merge_into(routes, upstreams, data)
+    return routes, upstreams
+
+
+def _flush_loop(stop):
+    while not stop.wait(FLUSH_INTERVAL):
+        flush()
+
+
+def _start_flusher():
+    stop = threading.Event()
+    _shared["stop"] = stop
+    threading.Thread(target=_flush_loop, args=(stop,), name="metrics-flush", daemon=True).start()
+
+
+def share(directory=SHARED_DIR):
+    """Aggregate metrics across the processes forked from this one. Call once
+    in the gunicorn master before workers fork; clears what an earlier
+    server run left in directory."""
+    os.makedirs(directory, exist_ok=True)
+    for f in os.listdir(directory):
+        try:
+            os.remove(os.path.join(directory, f))
+        except OSError:
+            pass
+    _shared["dir"] = directory
+    _start_flusher()
+    flush()
+
+
+def _after_fork_in_child():
+    # The parent keeps reporting what it recorded; start this worker at zero
+    global _lock, _started
+    _lock = threading.Lock()
+    if _shared["dir"] is None:
+        return
+    _routes.clear()
+    for kind in list(_upstreams):
+        _upstreams[kind] = {"latency": Histogram(), "calls": 0, "errors": 0}
+    _started = time.time()
+    _start_flusher()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+# --- Output ---
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def snapshot(extra=None):
+    """JSON summary of everything recorded (every worker's, when sharing).
+    extra is merged in at top level."""
+    all_routes, all_upstreams = _collect()
+    routes = {}
+    for route, s in sorted(all_routes.items()):
+        q = s["latency"].quantiles()
+        lookups = s["cache_hits"] + s["cache_misses"]
+        requests = s["requests"]
+        routes[route] = {
+            "requests": requests,
+            "errors": s["errors"],
+            "p50_ms": _ms(q["p50"]),
+            "p95_ms": _ms(q["p95"]),
+            "p99_ms": _ms(q["p99"]),
+            "mean_ms": _ms(s["latency"].total / requests) if requests else None,
+            "cache_hits": s["cache_hits"],
+            "cache_misses": s["cache_misses"],
+            "cache_hit_ratio": round(s["cache_hits"] / float(lookups), 3) if lookups else None,
+            "not_modified": s["not_modified"],
+            "upstream": {
+                kind: {
+                    "calls": u["calls"],
+                    "errors": u["errors"],
+                    "seconds": round(u["seconds"], 3),
+                    "calls_per_request": round(u["calls"] / float(requests), 2) if requests else None,
+                    "seconds_per_request": round(u["seconds"] / float(requests), 3) if requests else None,
+                }
+                for kind, u in sorted(s["upstream"].items())
+            },
+        }
+    upstreams = {}
+    for kind, s in sorted(all_upstreams.items()):
+        q = s["latency"].quantiles()
+        upstreams[kind] = {
+            "calls": s["calls"],
+            "errors": s["errors"],
+            "seconds": round(s["latency"].total, 3),
+            "p50_ms": _ms(q["p50"]),
+            "p95_ms": _ms(q["p95"]),
+            "p99_ms": _ms(q["p99"]),
+        }
+    result = {
+        "uptime_seconds": int(time.time() - _started),
+        "worker": os.getpid(),
+        "aggregated": _shared["dir"] is not None,
+        "routes": routes,
+        "upstreams": upstreams,
+    }
+    if extra:
+        result.update(extra)
+    return result
+
+
+def _label(value):
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+
+def _histogram_lines(name, labels, hist):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(BUCKETS, hist.counts):
+        cumulative += count
+        lines.append(name + "_bucket{" + labels + ",le=" + _label(bound) + "} " + str(cumulative))
+    cumulative += hist.counts[-1]
+    lines.append(name + "_bucket{" + labels + ',le="+Inf"} ' + str(cumulative))
+    lines.append(name + "_sum{" + labels + "} " + repr(round(hist.total, 6)))
+    lines.append(name + "_count{" + labels + "} " + str(hist.count))
+    return lines
+
+
+def _quantile_lines(name, labels, hist):
+    """Reservoir quantiles as gauge samples (their own family: a histogram
+    family may only hold _bucket/_sum/_count)"""
+    lines = []
+    q = hist.quantiles()
+    for key, quantile in (("p50", "0.5"), ("p95", "0.95"), ("p99", "0.99")):
+        if q[key] is not None:
+            lines.append(name + "{" + labels + ",quantile=" + _label(quantile) + "} " + repr(round(q[key], 6)))
+    return lines
+
+
+def prometheus_text(extra=None):
+    """Prometheus text exposition. fbb_route_* and fbb_upstream_* cover every
+    worker when sharing. extra: optional
+    {metric_name: (type, {((label, value), ...): number})} for series owned by
+    other modules, such as response cache stats; those are this process's
+    and get a worker label."""
+    routes, upstreams = _collect()
+    out = []
+    out.append("# HELP fbb_route_latency_seconds API route latency")
+    out.append("# TYPE fbb_route_latency_seconds histogram")
+    for route, s in sorted(routes.items()):
+        out.extend(_histogram_lines("fbb_route_latency_seconds", "route=" + _label(route), s["latency"]))
+    out.append("# HELP fbb_route_latency_quantile_seconds API route latency quantiles (recent sample)")
+    out.append("# TYPE fbb_route_latency_quantile_seconds gauge")
+    for route, s in sorted(routes.items()):
+        out.extend(_quantile_lines("fbb_route_latency_quantile_seconds", "route=" + _label(route), s["latency"]))
+
+    for metric, field, help_text in (
+        ("fbb_route_requests_total", "requests", "API requests"),
+        ("fbb_route_errors_total", "errors", "API requests that returned 5xx"),
+        ("fbb_route_cache_hits_total", "cache_hits", "Responses served from the response cache"),
+        ("fbb_route_cache_misses_total", "cache_misses", "Cacheable responses computed fresh"),
+        ("fbb_route_not_modified_total", "not_modified", "304 Not Modified responses"),
+    ):
+        out.append("# HELP " + metric + " " + help_text)
+        out.append("# TYPE " + metric + " counter")
+        for route, s in sorted(routes.items()):
+            out.append(metric + "{route=" + _label(route) + "} " + str(s[field]))
+
+    out.append("# HELP fbb_route_upstream_calls_total Upstream calls made while serving a route")
+    out.append("# TYPE fbb_route_upstream_calls_total counter")
+    for route, s in sorted(routes.items()):
+        for kind, u in sorted(s["upstream"].items()):
+            out.append(
+                "fbb_route_upstream_calls_total{route=" + _label(route)
+                + ",upstream=" + _label(kind) + "} " + str(u["calls"])
+            )
+    out.append("# HELP fbb_route_upstream_seconds_total Time spent in upstream calls while serving a route")
+    out.append("# TYPE fbb_route_upstream_seconds_total counter")
+    for route, s in sorted(routes.items()):
+        for kind, u in sorted(s["upstream"].items()):
+            out.append(
+                "fbb_route_upstream_seconds_total{route=" + _label(route)
+                + ",upstream=" + _label(kind) + "} " + repr(round(u["seconds"], 6))
+            )
+
+    out.append("# HELP fbb_upstream_latency_seconds Upstream call latency")
+    out.append("# TYPE fbb_upstream_latency_seconds histogram")
+    for kind, s in sorted(upstreams.items()):
+        out.extend(_histogram_lines("fbb_upstream_latency_seconds", "upstream=" + _label(kind), s["latency"]))
+    out.append("# HELP fbb_upstream_latency_quantile_seconds Upstream call latency quantiles (recent sample)")
+    out.append("# TYPE fbb_upstream_latency_quantile_seconds gauge")
+    for kind, s in sorted(upstreams.items()):
+        out.extend(_quantile_lines("fbb_upstream_latency_quantile_seconds", "upstream=" + _label(kind), s["latency"]))
+    out.append("# HELP fbb_upstream_errors_total Failed upstream calls")
+    out.append("# TYPE fbb_upstream_errors_total counter")
+    for kind, s in sorted(upstreams.items()):
+        out.append("fbb_upstream_errors_total{upstream=" + _label(kind) + "} " + str(s["errors"]))
+
+    worker = (("worker", str(os.getpid())),)
+    for metric, (metric_type, series) in sorted((extra or {}).items()):
+        out.append("# TYPE " + metric + " " + metric_type)
+        for labels, value in sorted(series.items()):
+            label_str = ",".join(k + "=" + _label(v) for k, v in tuple(labels) + worker)
+            out.append(metric + ("{" + label_str + "}" if label_str else "") + " " + str(value))
+
+    return "\n".join(out) + "\n"
+
+
+def reset():
+    """Forget everything recorded so far"""
+    with _lock:
+        _routes.clear()
+        for kind in list(_upstreams):
+            _upstreams[kind] = {"latency": Histogram(), "calls": 0, "errors": 0}
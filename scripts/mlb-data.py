@@ -5,13 +5,17 @@ import sys
 import json
 import urllib.request
 from datetime import date
+import metrics
+import deadline
 
 MLB_API = "https://statsapi.mlb.com/api/v1"
+MLB_TIMEOUT = 15  # seconds, capped by the request deadline
 
 def fetch(endpoint):
     """Fetch from MLB API"""
     url = MLB_API + endpoint
-    with urllib.request.urlopen(url) as response:
+    timeout = deadline.timeout(MLB_TIMEOUT)
+    with metrics.track("mlb_api"), urllib.request.urlopen(url, timeout=timeout) as response:
         return json.loads(response.read().decode())
 
 def cmd_teams(args, as_json=False):
@@ -238,7 +242,8 @@ def cmd_draft(args, as_json=False):
     year = args[0] if args else str(date.today().year)
     try:
         url = "https://statsapi.mlb.com/api/v1/draft/" + str(year)
-        with urllib.request.urlopen(url) as response:
+        timeout = deadline.timeout(MLB_TIMEOUT)
+        with metrics.track("mlb_api"), urllib.request.urlopen(url, timeout=timeout) as response:
             data = json.loads(response.read().decode())
     except Exception as e:
         if as_json:
@@ -3,6 +3,7 @@
 
 import json
 import os
+import threading
 import urllib.request
 
 try:
@@ -10,44 +11,72 @@ try:
 except ImportError:
     statsapi = None
 
+from singleflight import coalesced
+import metrics
+import deadline
+
 DATA_DIR = os.environ.get("DATA_DIR", "/app/data")
 CACHE_FILE = os.path.join(DATA_DIR, "mlb-id-cache.json")
+FETCH_TIMEOUT = 30  # seconds, capped by the request deadline
 
 _cache = None
 
+# Guards _cache; api-server looks up IDs from many threads at once
+_lock = threading.Lock()
+# Serializes writes of CACHE_FILE
+_save_lock = threading.Lock()
+
 
 def _load_cache():
     """Load cache from disk"""
     global _cache
-    if _cache is not None:
-        return
-    try:
-        if os.path.exists(CACHE_FILE):
-            with open(CACHE_FILE, "r") as f:
-                _cache = json.load(f)
-        else:
+    with _lock:
+        if _cache is not None:
+            return
+        try:
+            if os.path.exists(CACHE_FILE):
+                with open(CACHE_FILE, "r") as f:
+                    _cache = json.load(f)
+            else:
+                _cache = {}
+        except Exception as e:
+            print("Warning: could not load MLB ID cache: " + str(e))
             _cache = {}
-    except Exception as e:
-        print("Warning: could not load MLB ID cache: " + str(e))
-        _cache = {}
 
 
 def _save_cache():
     """Persist cache to disk"""
-    global _cache
-    if _cache is None:
-        return
-    try:
-        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
-        with open(CACHE_FILE, "w") as f:
-            json.dump(_cache, f)
-    except Exception as e:
-        print("Warning: could not save MLB ID cache: " + str(e))
+    with _lock:
+        if _cache is None:
+            return
+        snapshot = dict(_cache)
+    with _save_lock:
+        try:
+            os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+            # Write-then-rename so other api-server workers never read a torn file
+            tmp_path = CACHE_FILE + "." + str(os.getpid()) + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, CACHE_FILE)
+        except Exception as e:
+            print("Warning: could not save MLB ID cache: " + str(e))
+
+
+def _cache_lookup(key):
+    """Thread-safe read of one cached name"""
+    with _lock:
+        return _cache.get(key) if _cache else None
 
 
+def _cache_is_empty():
+    """True until the cache has been loaded or populated with any names"""
+    with _lock:
+        return not _cache
+
+
+@coalesced
 def populate_cache():
     """Fetch all active MLB players and build the name->id cache"""
-    global _cache
     _load_cache()
 
     from datetime import date
@@ -55,60 +84,76 @@ def populate_cache():
 
     url = "https://statsapi.mlb.com/api/v1/sports/1/players?season=" + year
     try:
-        with urllib.request.urlopen(url) as response:
+        timeout = deadline.timeout(FETCH_TIMEOUT)
+        with metrics.track("mlb_api"), urllib.request.urlopen(url, timeout=timeout) as response:
             data = json.loads(response.read().decode())
 
-        for player in data.get("people", []):
-            name = player.get("fullName", "")
-            pid = player.get("id")
-            if name and pid:
-                _cache[name.lower()] = pid
+        with _lock:
+            for player in data.get("people", []):
+                name = player.get("fullName", "")
+                pid = player.get("id")
+                if name and pid:
+                    _cache[name.lower()] = pid
 
         _save_cache()
     except Exception as e:
         print("Warning: could not populate MLB ID cache: " + str(e))
 
 
+def warm():
+    """Load (or populate) the name->id map up front, e.g. before forking workers"""
+    _load_cache()
+    if _cache_is_empty():
+        populate_cache()
+
+
 def get_mlb_id(name):
     """Look up MLB ID for a player name. Returns int or None."""
     if not name:
         return None
 
-    global _cache
     _load_cache()
 
     # Auto-populate on first real lookup if cache is empty
-    if not _cache:
+    if _cache_is_empty():
         populate_cache()
 
     # Direct lookup
     key = name.lower().strip()
-    result = _cache.get(key)
+    result = _cache_lookup(key)
     if result:
         return result
 
     # Fallback: statsapi.lookup_player
     if statsapi:
-        try:
+        return _lookup_and_store(key, name)
+
+    return None
+
+
+@coalesced
+def _lookup_and_store(key, name):
+    """statsapi fallback for a name missing from the bulk cache"""
+    try:
+        with metrics.track("mlb_api"):
             matches = statsapi.lookup_player(name)
-            if matches:
-                pid = matches[0].get("id")
-                if pid:
+        if matches:
+            pid = matches[0].get("id")
+            if pid:
+                with _lock:
                     _cache[key] = pid
-                    _save_cache()
-                    return pid
-        except Exception:
-            pass
-
+                _save_cache()
+                return pid
+    except Exception:
+        pass
     return None
 
 
 def resolve_mlb_ids(names):
     """Batch resolve a list of names to MLB IDs. Returns dict name->id."""
-    global _cache
     _load_cache()
 
-    if not _cache:
+    if _cache_is_empty():
         populate_cache()
 
     result = {}
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Batched Player Resolution - Maps free-text names to valuations, Yahoo IDs and intel in one pass
+
+trade-analysis used to call valuations.cmd_value once per name (each one a
+full load_all(): CSV reads, z-scores, maybe a live stats refetch), then
+cmd_search per get-side name and cmd_player_report per name, all in
+sequence. resolve() loads valuations once, matches every name against the
+same frames, builds one Yahoo name -> player_id index from the active
+LeagueContext, and fetches intel for all names concurrently.
+"""
+
+import league_context
+import valuations
+import intel
+import workflow
+
+# Yahoo sources tried in order until every name has an ID; later ones cost
+# more calls (free agents are paged), so they are only fetched when needed
+YAHOO_SOURCES = ("roster", "taken", "free_agent")
+
+
+def _yahoo_players(ctx, source):
+    if source == "roster":
+        return ctx.roster() or []
+    if source == "taken":
+        return ctx.taken_players() or []
+    players = []
+    for pos_type in ("B", "P"):
+        players.extend(ctx.free_agents(pos_type) or [])
+    return players
+
+
+def yahoo_ids(names, ctx=None, sources=YAHOO_SOURCES):
+    """Map names to Yahoo player_ids by exact (case-insensitive) name.
+    Returns dict name -> {"player_id", "source"}; unmatched names are omitted.
+    """
+    ctx = league_context.resolve(ctx)
+    wanted = {}
+    for name in names:
+        if name:
+            wanted.setdefault(name.lower(), []).append(name)
+
+    found = {}
+    for source in sources:
+        if not wanted:
+            break
+        for p in _yahoo_players(ctx, source):
+            key = str(p.get("name", "")).lower()
+            for name in wanted.pop(key, []):
+                found[name] = {"player_id": str(p.get("player_id", "")), "source": source}
+    return found
+
+
+def _yahoo_section(args, as_json=True):
+    return yahoo_ids(args)
+
+
+def _intel_section(args, as_json=True):
+    return intel.player_intel(args[0])
+
+
+def resolve(names, with_intel=True):
+    """Resolve free-text names in one pass.
+
+    Returns dict query -> {
+        "player": valuation JSON for the best match (None if not found),
+        "player_id": Yahoo player_id or None,
+        "yahoo_source": "roster" / "taken" / "free_agent" or None,
+        "intel": full intel packet (if with_intel),
+        "timed_out": parts cut off by the request deadline ("yahoo", "intel"),
+    }
+    Valuations are loaded once; Yahoo lookups and intel run concurrently.
+    """
+    queries = []
+    for name in names:
+        if name and name not in queries:
+            queries.append(name)
+    if not queries:
+        return {}
+
+    try:
+        hitters, pitchers, _ = valuations.load_all()
+        matches = valuations.find_players(queries, hitters, pitchers)
+    except Exception as e:
+        print("Warning: valuation lookup failed: " + str(e))
+        matches = {}
+
+    # Look players up by their full valuation name when we have one
+    full_names = {}
+    for q in queries:
+        rows = matches.get(q) or []
+        full_names[q] = str(rows[0].get("Name", q)) if rows else q
+
+    sections = [("yahoo", _yahoo_section, list(full_names.values()))]
+    if with_intel:
+        for q in queries:
+            sections.append(("intel:" + q, _intel_section, [full_names[q]]))
+    fetched = workflow.run_sections(sections)
+
+    ids = fetched.get("yahoo") or {}
+    yahoo_timed_out = bool(ids.get("_timeout"))
+    if ids.get("_error"):
+        print("Warning: Yahoo ID lookup failed: " + str(ids.get("_error")))
+        ids = {}
+
+    result = {}
+    for q in queries:
+        rows = matches.get(q) or []
+        entry = {
+            "player": valuations.player_json(rows[0]) if rows else None,
+            "player_id": None,
+            "yahoo_source": None,
+            "timed_out": ["yahoo"] if yahoo_timed_out else [],
+        }
+        yahoo = ids.get(full_names[q])
+        if isinstance(yahoo, dict):
+            entry["player_id"] = yahoo.get("player_id")
+            entry["yahoo_source"] = yahoo.get("source")
+        if with_intel:
+            entry["intel"] = fetched.get("intel:" + q)
+            if (entry["intel"] or {}).get("_timeout"):
+                entry["timed_out"].append("intel")
+        result[q] = entry
+    return result
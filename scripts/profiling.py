@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""Request Profiling - Opt-in sampling profiler that writes flamegraph artifacts
+
+A request is profiled when it sends X-Profile: 1, or when its path matches
+PROFILE_ROUTES (comma-separated, a trailing * matches a prefix, e.g.
+"/api/trade-finder,/api/workflow/*"). A sampler thread records the stacks
+of the request thread, and of the workflow/batch threads running its
+sections, every PROFILE_INTERVAL_MS. When the request finishes (or its
+stream closes) three files land in DATA_DIR/profiles/:
+
+  <name>.speedscope.json  open at https://www.speedscope.app
+  <name>.folded           collapsed stacks for flamegraph.pl / inferno
+  <name>.txt              top functions by self and total time, plus time
+                          spent inside upstream calls per kind
+
+Upstream calls (metrics.track / instrumented sessions) are recorded as
+timed spans. Samples taken during one get a synthetic "[upstream yahoo]"
+leaf frame, so a flamegraph of cmd_trade_finder separates time waiting on
+Yahoo from time in Python loops.
+
+The response carries X-Profile: <name>. PROFILING=0 turns it all off.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+import contextvars
+from contextlib import contextmanager
+
+import metrics
+
+DATA_DIR = os.environ.get("DATA_DIR", "/app/data")
+PROFILE_DIR = os.path.join(DATA_DIR, "profiles")
+
+ENABLED = os.environ.get("PROFILING", "1") != "0"
+PROFILE_ROUTES = [r.strip() for r in os.environ.get("PROFILE_ROUTES", "").split(",") if r.strip()]
+INTERVAL = float(os.environ.get("PROFILE_INTERVAL_MS", "5")) / 1000.0
+
+# Stop sampling a request after this long (the request itself continues)
+MAX_SECONDS = 300
+# Functions listed in each part of the summary
+TOP_N = 25
+# Profiles kept on disk; older ones are deleted
+KEEP = int(os.environ.get("PROFILE_KEEP", "100"))
+# Deepest stack recorded per sample
+MAX_DEPTH = 200
+
+_active = contextvars.ContextVar("active_profile", default=None)
+
+
+def requested(path, headers):
+    """Should this request be profiled?"""
+    if not ENABLED:
+        return False
+    if headers.get("X-Profile", "") == "1":
+        return True
+    for route in PROFILE_ROUTES:
+        if route.endswith("*") and path.startswith(route[:-1]):
+            return True
+        if path == route:
+            return True
+    return False
+
+
+def _frame_label(code):
+    return code.co_name + " (" + os.path.basename(code.co_filename) + ":" + str(code.co_firstlineno) + ")"
+
+
+class Profile:
+    """Samples a set of threads until stop()"""
+
+    def __init__(self, route):
+        self.route = route
+        self.name = time.strftime("%Y%m%d-%H%M%S") + "-" + _slug(route) + "-" + uuid.uuid4().hex[:6]
+        self.started = time.time()
+        self.ended = None
+        self.threads = {threading.get_ident(): threading.current_thread().name}
+        self.samples = []  # (offset seconds, weight seconds, thread ident, stack root -> leaf)
+        self.spans = []
+        self._spans_token = None
+        self._token = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._sampler = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._spans_token, self.spans = metrics.begin_spans()
+        self._token = _active.set(self)
+        self._sampler.start()
+
+    def detach(self):
+        """Leave the request's context (after_request); sampling continues"""
+        if self._token is not None:
+            _active.reset(self._token)
+            self._token = None
+        if self._spans_token is not None:
+            metrics.end_spans(self._spans_token)
+            self._spans_token = None
+
+    def attach_thread(self):
+        with self._lock:
+            self.threads[threading.get_ident()] = threading.current_thread().name
+
+    def detach_thread(self):
+        with self._lock:
+            self.threads.pop(threading.get_ident(), None)
+
+    def _run(self):
+        last = time.time()
+        while not self._stop.wait(INTERVAL):
+            now = time.time()
+            if now - self.started > MAX_SECONDS:
+                break
+            frames = sys._current_frames()
+            with self._lock:
+                idents = list(self.threads)
+            for ident in idents:
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_DEPTH:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples.append((now - self.started, now - last, ident, tuple(stack)))
+            last = now
+
+    def stop(self):
+        """Stop sampling and write the artifacts (in the background). Idempotent."""
+        with self._lock:
+            if self.ended is not None:
+                return
+            self.ended = time.time()
+        self._stop.set()
+        threading.Thread(target=self._finish, name="profile-writer", daemon=True).start()
+
+    def _finish(self):
+        self._sampler.join(5)
+        try:
+            write(self)
+        except Exception as e:
+            print("Warning: could not write profile " + self.name + ": " + str(e))
+
+
+def _slug(route):
+    slug = "".join(c if c.isalnum() else "-" for c in route.strip("/"))
+    return slug.strip("-")[:60] or "root"
+
+
+def start(route):
+    """Start profiling the current request. Returns the Profile."""
+    profile = Profile(route)
+    profile.start()
+    return profile
+
+
+@contextmanager
+def attach():
+    """Sample the current thread too while inside this block, if the context
+    it copied is being profiled (workflow sections use this)"""
+    profile = _active.get()
+    if profile is None:
+        yield
+        return
+    profile.attach_thread()
+    try:
+        yield
+    finally:
+        profile.detach_thread()
+
+
+# --- Output ---
+
+
+def _annotated(profile):
+    """Samples with an "[upstream kind]" leaf frame when taken during an upstream call"""
+    spans = [(kind, at - profile.started, seconds, ident) for kind, at, seconds, _, ident in list(profile.spans)]
+    result = []
+    for offset, weight, ident, stack in profile.samples:
+        for kind, span_start, seconds, span_ident in spans:
+            if span_ident == ident and span_start <= offset <= span_start + seconds:
+                stack = stack + ("[upstream " + kind + "]",)
+                break
+        result.append((offset, weight, ident, stack))
+    return result
+
+
+def _speedscope(profile, samples):
+    frames = []
+    index = {}
+    by_thread = {}
+    for offset, weight, ident, stack in samples:
+        ids = []
+        for label in stack:
+            i = index.get(label)
+            if i is None:
+                i = len(frames)
+                index[label] = i
+                name, _, where = label.partition(" (")
+                file_name, _, line = where.rstrip(")").partition(":")
+                if label.startswith("["):
+                    frames.append({"name": label})
+                else:
+                    frames.append({"name": name, "file": file_name, "line": int(line) if line.isdigit() else None})
+            ids.append(i)
+        by_thread.setdefault(ident, []).append((ids, weight))
+    duration_ms = round(((profile.ended or time.time()) - profile.started) * 1000, 3)
+    profiles = []
+    for ident, rows in by_thread.items():
+        profiles.append({
+            "type": "sampled",
+            "name": profile.threads.get(ident) or ("thread " + str(ident)),
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": duration_ms,
+            "samples": [ids for ids, _ in rows],
+            "weights": [round(w * 1000, 3) for _, w in rows],
+        })
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": profile.route,
+        "exporter": "fbb-mcp profiling.py",
+        "activeProfileIndex": 0,
+        "shared": {"frames": frames},
+        "profiles": profiles,
+    }
+
+
+def _folded(samples):
+    counts = {}
+    for _, weight, _, stack in samples:
+        key = ";".join(label.replace(";", ",") for label in stack)
+        counts[key] = counts.get(key, 0) + weight
+    # flamegraph.pl wants integer counts: use microseconds
+    return "".join(key + " " + str(int(w * 1e6)) + "\n" for key, w in sorted(counts.items()))
+
+
+def summarize(profile, samples):
+    """Top functions by self/total time and time inside upstream calls"""
+    total = sum(w for _, w, _, _ in samples) or 0.0
+    self_time = {}
+    total_time = {}
+    in_upstream = {}
+    for _, weight, _, stack in samples:
+        if not stack:
+            continue
+        leaf = stack[-1]
+        if leaf.startswith("[upstream "):
+            kind = leaf[len("[upstream "):-1]
+            in_upstream[kind] = in_upstream.get(kind, 0.0) + weight
+            leaf = stack[-2] if len(stack) > 1 else leaf
+        self_time[leaf] = self_time.get(leaf, 0.0) + weight
+        for label in set(stack):
+            total_time[label] = total_time.get(label, 0.0) + weight
+
+    spans = {}
+    for kind, _, seconds, error, _ in list(profile.spans):
+        s = spans.setdefault(kind, {"calls": 0, "errors": 0, "seconds": 0.0})
+        s["calls"] += 1
+        s["seconds"] += seconds
+        if error:
+            s["errors"] += 1
+
+    def top(d):
+        rows = sorted(d.items(), key=lambda kv: kv[1], reverse=True)[:TOP_N]
+        return [{"function": k, "ms": round(v * 1000, 1), "pct": round(100 * v / total, 1) if total else None} for k, v in rows]
+
+    return {
+        "route": profile.route,
+        "name": profile.name,
+        "duration_ms": round(((profile.ended or time.time()) - profile.started) * 1000, 1),
+        "sampled_ms": round(total * 1000, 1),
+        "samples": len(samples),
+        "threads": len(set(ident for _, _, ident, _ in samples)),
+        "upstream_calls": {
+            kind: {"calls": s["calls"], "errors": s["errors"], "ms": round(s["seconds"] * 1000, 1)}
+            for kind, s in sorted(spans.items())
+        },
+        "sampled_in_upstream_ms": {kind: round(v * 1000, 1) for kind, v in sorted(in_upstream.items())},
+        "top_self": top(self_time),
+        "top_total": top(total_time),
+    }
+
+
+def _summary_text(summary):
+    lines = [
+        "Profile " + summary["name"],
+        "Route: " + summary["route"],
+        "Duration: " + str(summary["duration_ms"]) + " ms, " + str(summary["samples"]) + " samples across "
+        + str(summary["threads"]) + " thread(s) (" + str(summary["sampled_ms"]) + " ms sampled)",
+        "",
+        "Upstream calls:",
+    ]
+    if not summary["upstream_calls"]:
+        lines.append("  (none)")
+    for kind, s in summary["upstream_calls"].items():
+        lines.append(
+            "  " + kind.ljust(12) + str(s["calls"]).rjust(5) + " calls" + str(s["ms"]).rjust(10) + " ms"
+            + ("  (" + str(s["errors"]) + " errors)" if s["errors"] else "")
+            + "   sampled inside: " + str(summary["sampled_in_upstream_ms"].get(kind, 0.0)) + " ms"
+        )
+    for title, key in (("Top by self time:", "top_self"), ("Top by total time:", "top_total")):
+        lines.append("")
+        lines.append(title)
+        for row in summary[key]:
+            lines.append("  " + str(row["ms"]).rjust(9) + " ms " + (str(row["pct"]) + "%").rjust(7) + "  " + row["function"])
+    return "\n".join(lines) + "\n"
+
+
+def _prune():
+    try:
+        names = sorted(
+            (f for f in os.listdir(PROFILE_DIR) if f.endswith(".txt")),
+            key=lambda f: os.path.getmtime(os.path.join(PROFILE_DIR, f)),
+        )
+    except OSError:
+        return
+    for f in names[:max(0, len(names) - KEEP)]:
+        base = f[:-len(".txt")]
+        for suffix in (".txt", ".folded", ".speedscope.json"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, base + suffix))
+            except OSError:
+                pass
+
+
+def write(profile):
+    """Write the three artifacts for a finished profile. Returns the summary."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    samples = _annotated(profile)
+    summary = summarize(profile, samples)
+    base = os.path.join(PROFILE_DIR, profile.name)
+    with open(base + ".speedscope.json", "w") as f:
+        json.dump(_speedscope(profile, samples), f)
+    with open(base + ".folded", "w") as f:
+        f.write(_folded(samples))
+    # The summary goes last: _prune() keys on it
+    with open(base + ".txt", "w") as f:
+        f.write(_summary_text(summary))
+    _prune()
+    return summary
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Response Field Projection - fields= / exclude= trimming for API responses
+
+Paths are dot-separated keys from the response root; "*" matches any one
+key and "**" any number of levels. Lists are transparent, so a path applies
+to every element:
+
+  fields=action_items,injury.injured_active
+  exclude=**.trends,waiver_batters.recommendations.intel
+
+fields keeps only the listed paths (a top-level "error" always survives);
+exclude then drops its paths.
+
+Pushdown: an intel section excluded at every depth ("**.trends") is not
+computed at all -- player_intel() asks skipped_intel_sections() for the
+active request. Only the per-player sections that cost upstream calls are
+pushed down; statcast is always built because waiver/streaming scores
+depend on it.
+"""
+
+import contextvars
+
+# Intel sections player_intel() may skip when a projection drops them
+PUSHDOWN_SECTIONS = ("trends", "context", "discipline", "percentiles")
+
+_active = contextvars.ContextVar("projection_spec", default=None)
+
+
+def _split(value):
+    return [p.strip() for p in (value or "").split(",") if p.strip()]
+
+
+def _tree(paths):
+    """Build a nested dict from dotted paths; True marks a whole subtree"""
+    tree = {}
+    for path in paths:
+        node = tree
+        parts = [p for p in path.split(".") if p]
+        for i, part in enumerate(parts):
+            if i == len(parts) - 1:
+                node[part] = True
+            else:
+                child = node.get(part)
+                if child is True:
+                    break
+                if child is None:
+                    child = {}
+                    node[part] = child
+                node = child
+    return tree
+
+
+def parse(fields=None, exclude=None):
+    """Build a projection spec from fields/exclude strings, or None if both are empty"""
+    field_paths = _split(fields)
+    exclude_paths = _split(exclude)
+    if not field_paths and not exclude_paths:
+        return None
+    return {
+        "fields": _tree(field_paths) if field_paths else None,
+        "exclude": _tree(exclude_paths) if exclude_paths else None,
+        "exclude_paths": exclude_paths,
+    }
+
+
+def from_args(args):
+    """Spec from request query args (fields=, exclude=)"""
+    return parse(args.get("fields"), args.get("exclude"))
+
+
+def _merge(a, b):
+    if a is True or b is True:
+        return True
+    merged = dict(a)
+    for k, v in b.items():
+        merged[k] = _merge(merged[k], v) if k in merged else v
+    return merged
+
+
+def _match(tree, key):
+    """Subtree for key, combining an exact match, "*" and "**" """
+    subs = [t for t in (tree.get(key), tree.get("*")) if t is not None]
+    deep = tree.get("**")
+    if deep is True:
+        return True
+    if deep is not None:
+        # "**" may match zero levels here, or keep descending
+        subs.append({"**": deep})
+        here = _match(deep, key)
+        if here is not None:
+            subs.append(here)
+    if not subs:
+        return None
+    result = subs[0]
+    for sub in subs[1:]:
+        result = _merge(result, sub)
+    return result
+
+
+def _keep(obj, tree):
+    if tree is True:
+        return obj
+    if isinstance(obj, list):
+        return [_keep(item, tree) for item in obj]
+    if isinstance(obj, dict):
+        result = {}
+        for k, v in obj.items():
+            sub = _match(tree, str(k))
+            if sub is None:
+                continue
+            # A deeper path can't match inside a scalar
+            if sub is not True and not isinstance(v, (dict, list)):
+                continue
+            result[k] = _keep(v, sub)
+        return result
+    return obj
+
+
+def _drop(obj, tree):
+    if isinstance(obj, list):
+        return [_drop(item, tree) for item in obj]
+    if isinstance(obj, dict):
+        result = {}
+        for k, v in obj.items():
+            sub = _match(tree, str(k))
+            if sub is True:
+                continue
+            result[k] = _drop(v, sub) if sub else v
+        return result
+    return obj
+
+
+def apply(spec, obj):
+    """Project a JSON-able object"""
+    if not spec:
+        return obj
+    if spec["fields"] is not None:
+        error = obj.get("error") if isinstance(obj, dict) else None
+        obj = _keep(obj, spec["fields"])
+        if error is not None:
+            obj["error"] = error
+    if spec["exclude"] is not None:
+        obj = _drop(obj, spec["exclude"])
+    return obj
+
+
+def apply_section(spec, name, value):
+    """Project one top-level section of a streamed response.
+    Returns (keep, projected_value)."""
+    if not spec:
+        return True, value
+    projected = apply(spec, {name: value})
+    if name not in projected:
+        return False, None
+    return True, projected[name]
+
+
+# --- Pushdown into intel.player_intel ---
+
+
+def activate(spec):
+    """Make spec the active projection for this request. Returns a reset token."""
+    return _active.set(spec)
+
+
+def deactivate(token):
+    _active.reset(token)
+
+
+def skipped_intel_sections():
+    """Intel sections the active projection drops at every depth (exclude=**.name)"""
+    spec = _active.get()
+    if not spec:
+        return set()
+    skipped = set()
+    for path in spec["exclude_paths"]:
+        parts = [p for p in path.split(".") if p]
+        if len(parts) == 2 and parts[0] == "**" and parts[1] in PUSHDOWN_SECTIONS:
+            skipped.add(parts[1])
+    return skipped
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""API Response Cache - Per-route TTL cache with ETag/304 support for api-server
+
+GET responses for routes in ROUTE_TTLS are stored as serialized bytes keyed
+by path + normalized query args + representation (JSON or MessagePack), and served without re-running the route
+until their TTL expires. Every JSON GET response carries an ETag, and a
+matching If-None-Match gets a bodyless 304.
+
+Writes publish invalidation events (see invalidation.py); each event evicts
+only the routes listed for it below. The cache holds at most
+API_CACHE_MAX_ENTRIES responses per worker, least recently used going first;
+expired entries are dropped when next looked up.
+"""
+
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date
+
+from flask import Response, g
+
+import invalidation
+import serializer
+
+# Marker for routes keyed by ?year= -- finished seasons never change
+PAST_SEASON = "past_season"
+
+# TTL for the current season on PAST_SEASON routes
+CURRENT_SEASON_TTL = 3600
+
+# Seconds each GET route's response may be reused. None = forever.
+# Routes not listed here are never cached (writes, live draft, lineup apply,
+# whats-new which advances its own digest state, workflows).
+ROUTE_TTLS = {
+    # League state (yahoo-fantasy.py)
+    "/api/roster": 60,
+    "/api/free-agents": 300,
+    "/api/standings": 300,
+    "/api/info": 3600,
+    "/api/search": 300,
+    "/api/matchups": 300,
+    "/api/scoreboard": 120,
+    "/api/matchup-detail": 120,
+    "/api/transactions": 300,
+    "/api/stat-categories": 86400,
+    "/api/transaction-trends": 1800,
+    "/api/league-pulse": 600,
+    "/api/who-owns": 300,
+    # Valuations
+    "/api/rankings": 1800,
+    "/api/compare": 1800,
+    "/api/value": 1800,
+    # Season manager
+    "/api/category-check": 300,
+    "/api/injury-report": 300,
+    "/api/waiver-analyze": 300,
+    "/api/streaming": 900,
+    "/api/scout-opponent": 300,
+    "/api/matchup-strategy": 300,
+    "/api/trade-finder": 900,
+    "/api/power-rankings": 900,
+    "/api/week-planner": 900,
+    "/api/season-pace": 900,
+    "/api/closer-monitor": 1800,
+    "/api/pitcher-matchup": 1800,
+    # MLB data
+    "/api/mlb/teams": 86400,
+    "/api/mlb/roster": 3600,
+    "/api/mlb/player": 86400,
+    "/api/mlb/stats": 1800,
+    "/api/mlb/injuries": 900,
+    "/api/mlb/standings": 900,
+    "/api/mlb/draft": 86400,
+    "/api/mlb/schedule": 300,
+    # History
+    "/api/league-history": 86400,
+    "/api/record-book": 86400,
+    "/api/past-standings": PAST_SEASON,
+    "/api/past-draft": PAST_SEASON,
+    "/api/past-teams": PAST_SEASON,
+    "/api/past-trades": PAST_SEASON,
+    "/api/past-matchup": PAST_SEASON,
+    # Intel
+    "/api/intel/player": 900,
+    "/api/intel/breakouts": 3600,
+    "/api/intel/busts": 3600,
+    "/api/intel/reddit": 900,
+    "/api/intel/trending": 900,
+    "/api/intel/prospects": 1800,
+    "/api/intel/transactions": 1800,
+    "/api/intel/batch": 900,
+}
+
+# Routes built from our own roster (evicted when our team's roster changes)
+OWN_ROSTER_ROUTES = (
+    "/api/roster",
+    "/api/category-check",
+    "/api/injury-report",
+    "/api/waiver-analyze",
+    "/api/streaming",
+    "/api/matchup-strategy",
+    "/api/week-planner",
+    "/api/closer-monitor",
+    "/api/pitcher-matchup",
+)
+
+# Routes built from every team's roster (evicted when any roster changes)
+LEAGUE_ROSTER_ROUTES = (
+    "/api/who-owns",
+    "/api/trade-finder",
+    "/api/power-rankings",
+    "/api/scout-opponent",
+)
+
+EVENT_ROUTES = {
+    "fa_pool_changed": (
+        "/api/free-agents",
+        "/api/search",
+        "/api/waiver-analyze",
+        "/api/streaming",
+        "/api/who-owns",
+        "/api/transactions",
+        "/api/league-pulse",
+    ),
+    "trades_changed": (
+        "/api/transactions",
+        "/api/league-pulse",
+        "/api/trade-finder",
+    ),
+    "projections_changed": (
+        "/api/rankings",
+        "/api/compare",
+        "/api/value",
+    ),
+}
+
+TEAM_ID = os.environ.get("TEAM_ID", "")
+
+MAX_ENTRIES = int(os.environ.get("API_CACHE_MAX_ENTRIES", "2000"))
+
+# key -> (body, etag, stored_at, ttl); oldest use first
+_cache = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "not_modified": 0, "evicted": 0, "lru_evicted": 0}
+
+
+def route_ttl(path, args):
+    """Resolve the TTL for a request. Returns (cacheable, ttl_seconds_or_None)."""
+    if path not in ROUTE_TTLS:
+        return False, 0
+    ttl = ROUTE_TTLS.get(path)
+    if ttl == PAST_SEASON:
+        try:
+            year = int(args.get("year", ""))
+        except (ValueError, TypeError):
+            return True, CURRENT_SEASON_TTL
+        if year < date.today().year:
+            return True, None
+        return True, CURRENT_SEASON_TTL
+    return True, ttl
+
+
+def cache_key(path, args, fmt="json"):
+    """Build a cache key from path + normalized query args (sorted, empties
+    dropped) + representation ("json" or "msgpack", see serializer.py)"""
+    items = []
+    for k in sorted(args.keys()):
+        values = [v.strip() for v in args.getlist(k) if v.strip() != ""]
+        if values:
+            items.append((k, tuple(values)))
+    return (path, tuple(items), fmt)
+
+
+def make_etag(body):
+    """Strong ETag for a serialized response body"""
+    return hashlib.sha1(body).hexdigest()[:20]
+
+
+def _get(key):
+    """Return a live (body, etag) entry or None, evicting it if expired"""
+    with _lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        body, etag, stored_at, ttl = entry
+        if ttl is not None and time.time() - stored_at > ttl:
+            _cache.pop(key, None)
+            return None
+        _cache.move_to_end(key)
+        return body, etag
+
+
+def _set(key, body, etag, ttl):
+    """Store a serialized body, dropping least recently used entries past MAX_ENTRIES"""
+    with _lock:
+        _cache[key] = (body, etag, time.time(), ttl)
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_ENTRIES:
+            _cache.popitem(last=False)
+            _stats["lru_evicted"] += 1
+
+
+def check_payload(obj):
+    """Called with a view's result before it is serialized. cmd_* report
+    failures as {"error": ...} with a 200, and deadline-cut responses are
+    marked "partial" -- flag either so store() never pins it.
+    """
+    if isinstance(obj, dict) and (obj.get("error") or obj.get("partial")):
+        g.response_uncacheable = True
+
+
+def serve(request):
+    """before_request hook: answer from cache when possible, else None"""
+    if request.method != "GET":
+        return None
+    cacheable, _ = route_ttl(request.path, request.args)
+    if not cacheable:
+        return None
+    fmt = serializer.negotiate(request.accept_mimetypes)
+    entry = _get(cache_key(request.path, request.args, fmt))
+    if entry is None:
+        with _lock:
+            _stats["misses"] += 1
+        return None
+    body, etag = entry
+    with _lock:
+        _stats["hits"] += 1
+    g.response_cache_hit = True
+    response = Response(body, mimetype=serializer.MIMETYPES[fmt])
+    if serializer.msgpack is not None:
+        response.vary.add("Accept")
+    response.set_etag(etag)
+    response.headers["X-Cache"] = "HIT"
+    response = response.make_conditional(request)
+    if response.status_code == 304:
+        with _lock:
+            _stats["not_modified"] += 1
+    return response
+
+
+def store(request, response):
+    """after_request hook: tag JSON GET responses with an ETag, cache them
+    when the route has a TTL, and downgrade to 304 on If-None-Match.
+    """
+    if request.method != "GET" or response.status_code != 200:
+        return response
+    if response.direct_passthrough or response.is_streamed:
+        return response
+    if response.mimetype not in (serializer.JSON_MIMETYPE, serializer.MSGPACK_MIMETYPE):
+        return response
+    if g.get("response_cache_hit"):
+        return response
+
+    body = response.get_data()
+    etag = make_etag(body)
+    response.set_etag(etag)
+
+    cacheable, ttl = route_ttl(request.path, request.args)
+    # Under a caller-supplied deadline a section may have been cut short
+    # (a nested {"error"}/{"note"}); the cache key doesn't carry the deadline
+    if g.get("caller_deadline") or g.get("response_uncacheable"):
+        cacheable = False
+    if cacheable:
+        fmt = "msgpack" if response.mimetype == serializer.MSGPACK_MIMETYPE else "json"
+        _set(cache_key(request.path, request.args, fmt), body, etag, ttl)
+        response.headers["X-Cache"] = "MISS"
+
+    response = response.make_conditional(request)
+    if response.status_code == 304:
+        with _lock:
+            _stats["not_modified"] += 1
+    return response
+
+
+def clear(path=None):
+    """Drop cached responses, for one route or all of them"""
+    with _lock:
+        if path is None:
+            _cache.clear()
+            return
+        for key in [k for k in _cache if k[0] == path]:
+            _cache.pop(key, None)
+
+
+def evict(paths):
+    """Drop cached responses for several routes. Returns how many went."""
+    paths = set(paths)
+    with _lock:
+        keys = [k for k in _cache if k[0] in paths]
+        for key in keys:
+            _cache.pop(key, None)
+        _stats["evicted"] += len(keys)
+    return len(keys)
+
+
+def _on_roster_changed(team=None):
+    if team is None or team == TEAM_ID:
+        evict(OWN_ROSTER_ROUTES + LEAGUE_ROSTER_ROUTES)
+    else:
+        evict(LEAGUE_ROSTER_ROUTES)
+
+
+invalidation.subscribe("roster_changed", _on_roster_changed)
+for _event, _paths in EVENT_ROUTES.items():
+    invalidation.subscribe(_event, lambda _paths=_paths, **payload: evict(_paths))
+
+
+def get_stats():
+    """Hit/miss counters and current entry count"""
+    with _lock:
+        result = dict(_stats)
+        result["entries"] = len(_cache)
+    return result
@@ -5,7 +5,6 @@ import sys
 import json
 import os
 import sqlite3
-import time
 import importlib
 import urllib.request
 from datetime import datetime, date, timedelta
@@ -20,6 +19,10 @@ except ImportError:
 
 from mlb_id_cache import get_mlb_id
 from intel import batch_intel
+import league_context
+import metrics
+import deadline
+import data_cache
 
 # Docker paths
 OAUTH_FILE = os.environ.get("OAUTH_FILE", "/app/config/yahoo_oauth.json")
@@ -33,6 +36,7 @@ from yahoo_browser import is_scope_error as _is_scope_error, write_method as _wr
 
 
 MLB_API = "https://statsapi.mlb.com/api/v1"
+MLB_TIMEOUT = 15  # seconds, capped by the request deadline
 
 # Common MLB team name mappings (Yahoo name -> MLB Stats API name)
 # Yahoo sometimes uses short names; this helps match them
@@ -76,6 +80,7 @@ def get_connection():
     sc = OAuth2(None, None, from_file=OAUTH_FILE)
     if not sc.token_is_valid():
         sc.refresh_access_token()
+    metrics.instrument_session(sc.session)
     return sc
 
 
@@ -93,13 +98,14 @@ def get_db():
     return db
 
 
-_trend_cache = {"data": None, "time": 0}
+# Shared with yahoo-fantasy.py: both read the same game-wide trends
+_trend_cache = data_cache.namespace("transaction_trends", 1800)
 
 def _get_trend_lookup():
     """Get a name->trend dict from transaction trends, cached 30 min"""
-    now = time.time()
-    if _trend_cache.get("data") and now - _trend_cache.get("time", 0) < 1800:
-        return _trend_cache.get("data", {})
+    cached = _trend_cache.get("lookup")
+    if cached:
+        return cached
     try:
         yf_mod = importlib.import_module("yahoo-fantasy")
         raw = yf_mod.cmd_transaction_trends([], as_json=True)
@@ -120,8 +126,8 @@ def _get_trend_lookup():
                     "rank": i + 1,
                     "percent_owned": p.get("percent_owned", 0),
                 }
-        _trend_cache["data"] = lookup
-        _trend_cache["time"] = now
+        if lookup:
+            _trend_cache.set("lookup", lookup)
         return lookup
     except Exception:
         return {}
@@ -130,7 +136,8 @@ def _get_trend_lookup():
 def mlb_fetch(endpoint):
     """Fetch from MLB Stats API (fallback when statsapi not available)"""
     url = MLB_API + endpoint
-    with urllib.request.urlopen(url) as response:
+    timeout = deadline.timeout(MLB_TIMEOUT)
+    with metrics.track("mlb_api"), urllib.request.urlopen(url, timeout=timeout) as response:
         return json.loads(response.read().decode())
 
 
@@ -139,7 +146,8 @@ def get_todays_schedule():
     today = date.today().isoformat()
     if statsapi:
         try:
-            return statsapi.schedule(date=today)
+            with metrics.track("mlb_api"):
+                return statsapi.schedule(date=today)
         except Exception as e:
             print("  Warning: statsapi schedule failed, falling back to urllib: " + str(e))
     # Fallback to urllib
@@ -166,7 +174,8 @@ def get_schedule_for_range(start_date, end_date):
     """Get MLB schedule for a date range"""
     if statsapi:
         try:
-            return statsapi.schedule(start_date=start_date, end_date=end_date)
+            with metrics.track("mlb_api"):
+                return statsapi.schedule(start_date=start_date, end_date=end_date)
         except Exception as e:
             print("  Warning: statsapi range schedule failed: " + str(e))
     # Fallback
@@ -261,7 +270,7 @@ def _player_info(p):
 # ---------- Commands ----------
 
 
-def cmd_lineup_optimize(args, as_json=False):
+def cmd_lineup_optimize(args, as_json=False, ctx=None):
     """Cross-reference roster with MLB schedule to find off-day players"""
     apply_changes = "--apply" in args
 
@@ -269,13 +278,11 @@ def cmd_lineup_optimize(args, as_json=False):
         print("Lineup Optimizer")
         print("=" * 50)
 
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
-    team = lg.to_team(TEAM_ID)
+    ctx = league_context.resolve(ctx)
+    team = ctx.team()
 
     try:
-        roster = team.roster()
+        roster = ctx.roster()
     except Exception as e:
         if as_json:
             return {"error": "Error fetching roster: " + str(e)}
@@ -456,18 +463,16 @@ def cmd_lineup_optimize(args, as_json=False):
         print("Use --apply to execute these changes")
 
 
-def cmd_category_check(args, as_json=False):
+def cmd_category_check(args, as_json=False, ctx=None):
     """Show where you rank in each stat category vs the league"""
     if not as_json:
         print("Category Check")
         print("=" * 50)
 
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
+    ctx = league_context.resolve(ctx)
 
     try:
-        scoreboard = lg.scoreboard()
+        scoreboard = ctx.scoreboard()
     except Exception as e:
         if as_json:
             return {"error": "Error fetching scoreboard: " + str(e)}
@@ -553,7 +558,7 @@ def cmd_category_check(args, as_json=False):
 
     sorted_cats = sorted(cat_ranks.items(), key=lambda x: x[1]["rank"])
     num_teams = max(c["total"] for c in cat_ranks.values()) if cat_ranks else 0
-    week = lg.current_week()
+    week = ctx.current_week()
 
     strong = [c for c, i in sorted_cats if i["rank"] <= 3]
     weak = [c for c, i in sorted_cats if i["rank"] >= (i["total"] - 2) and i["total"] > 3]
@@ -621,58 +626,23 @@ def cmd_category_check(args, as_json=False):
         print("Weakest:   " + ", ".join(weak))
 
 
-def cmd_injury_report(args, as_json=False):
-    """Check roster for injured/IL-eligible players"""
-    if not as_json:
-        print("Injury Report")
-        print("=" * 50)
-
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
-    team = lg.to_team(TEAM_ID)
-
-    try:
-        roster = team.roster()
-    except Exception as e:
-        if as_json:
-            return {"error": "Error fetching roster: " + str(e)}
-        print("Error fetching roster: " + str(e))
-        return
-
-    if not roster:
-        if as_json:
-            return {"injured_active": [], "healthy_il": [], "injured_bench": [], "il_proper": []}
-        print("Roster is empty")
-        return
-
-    # Get MLB injuries
+def _fetch_mlb_injuries():
+    """MLB injury list keyed by lowercased player name"""
     mlb_injuries = {}
-    try:
-        if statsapi:
-            data = mlb_fetch("/injuries")
-            for inj in data.get("injuries", []):
-                player_name = inj.get("player", {}).get("fullName", "")
-                if player_name:
-                    mlb_injuries[player_name.lower()] = {
-                        "description": inj.get("description", "Unknown"),
-                        "date": inj.get("date", ""),
-                        "status": inj.get("status", ""),
-                    }
-        else:
-            data = mlb_fetch("/injuries")
-            for inj in data.get("injuries", []):
-                player_name = inj.get("player", {}).get("fullName", "")
-                if player_name:
-                    mlb_injuries[player_name.lower()] = {
-                        "description": inj.get("description", "Unknown"),
-                        "date": inj.get("date", ""),
-                        "status": inj.get("status", ""),
-                    }
-    except Exception as e:
-        if not as_json:
-            print("  Warning: could not fetch MLB injuries: " + str(e))
+    data = mlb_fetch("/injuries")
+    for inj in data.get("injuries", []):
+        player_name = inj.get("player", {}).get("fullName", "")
+        if player_name:
+            mlb_injuries[player_name.lower()] = {
+                "description": inj.get("description", "Unknown"),
+                "date": inj.get("date", ""),
+                "status": inj.get("status", ""),
+            }
+    return mlb_injuries
 
+
+def _classify_injuries(roster, mlb_injuries):
+    """Split a roster into (injured_active, healthy_il, injured_bench, il_proper)"""
     injured_active = []   # Injured but in active roster slot (bad)
     healthy_il = []       # On IL slot but no injury status (inefficient)
     il_proper = []        # Injured and on IL (correct)
@@ -681,7 +651,6 @@ def cmd_injury_report(args, as_json=False):
     for p in roster:
         name = p.get("name", "Unknown")
         status = p.get("status", "")
-        pos = get_player_position(p)
         has_yahoo_injury = status and status not in ("", "Healthy")
         mlb_inj = mlb_injuries.get(name.lower())
 
@@ -698,32 +667,84 @@ def cmd_injury_report(args, as_json=False):
             if has_yahoo_injury or mlb_inj:
                 injured_active.append(p)
 
-    if as_json:
-        def injury_info(p):
-            info = _player_info(p)
-            mlb_inj = mlb_injuries.get(p.get("name", "").lower())
-            if mlb_inj:
-                info["injury_description"] = mlb_inj.get("description", "")
-            return info
+    return injured_active, healthy_il, injured_bench, il_proper
+
+
+def _injury_sections(roster, mlb_injuries):
+    """Injury report sections as JSON (player info plus MLB injury
+    description), without intel enrichment"""
+    def injury_info(p):
+        info = _player_info(p)
+        mlb_inj = mlb_injuries.get(p.get("name", "").lower())
+        if mlb_inj:
+            info["injury_description"] = mlb_inj.get("description", "")
+        return info
+
+    injured_active, healthy_il, injured_bench, il_proper = _classify_injuries(roster, mlb_injuries)
+    return {
+        "injured_active": [injury_info(p) for p in injured_active],
+        "healthy_il": [injury_info(p) for p in healthy_il],
+        "injured_bench": [injury_info(p) for p in injured_bench],
+        "il_proper": [injury_info(p) for p in il_proper],
+    }
 
-        injured_active_info = [injury_info(p) for p in injured_active]
-        healthy_il_info = [injury_info(p) for p in healthy_il]
-        injured_bench_info = [injury_info(p) for p in injured_bench]
-        il_proper_info = [injury_info(p) for p in il_proper]
+
+def injury_snapshot(ctx=None):
+    """Injury report sections for the change feed: no intel enrichment.
+    Raises if the roster can't be fetched."""
+    ctx = league_context.resolve(ctx)
+    roster = ctx.roster() or []
+    try:
+        mlb_injuries = _fetch_mlb_injuries() if roster else {}
+    except Exception:
+        mlb_injuries = {}
+    return _injury_sections(roster, mlb_injuries)
+
+
+def cmd_injury_report(args, as_json=False, ctx=None):
+    """Check roster for injured/IL-eligible players"""
+    if not as_json:
+        print("Injury Report")
+        print("=" * 50)
+
+    ctx = league_context.resolve(ctx)
+
+    try:
+        roster = ctx.roster()
+    except Exception as e:
+        if as_json:
+            return {"error": "Error fetching roster: " + str(e)}
+        print("Error fetching roster: " + str(e))
+        return
+
+    if not roster:
+        if as_json:
+            return {"injured_active": [], "healthy_il": [], "injured_bench": [], "il_proper": []}
+        print("Roster is empty")
+        return
+
+    # Get MLB injuries
+    mlb_injuries = {}
+    try:
+        mlb_injuries = _fetch_mlb_injuries()
+    except Exception as e:
+        if not as_json:
+            print("  Warning: could not fetch MLB injuries: " + str(e))
+
+    if as_json:
+        result = _injury_sections(roster, mlb_injuries)
         try:
-            all_players = injured_active_info + healthy_il_info + injured_bench_info + il_proper_info
+            all_players = (result["injured_active"] + result["healthy_il"]
+                           + result["injured_bench"] + result["il_proper"])
             names = [p.get("name", "") for p in all_players]
             intel_data = batch_intel(names, include=["statcast", "trends"])
             for p in all_players:
                 p["intel"] = intel_data.get(p.get("name", ""))
         except Exception as e:
             print("Warning: intel enrichment failed: " + str(e))
-        return {
-            "injured_active": injured_active_info,
-            "healthy_il": healthy_il_info,
-            "injured_bench": injured_bench_info,
-            "il_proper": il_proper_info,
-        }
+        return result
+
+    injured_active, healthy_il, injured_bench, il_proper = _classify_injuries(roster, mlb_injuries)
 
     # Report
     if injured_active:
@@ -777,7 +798,7 @@ def cmd_injury_report(args, as_json=False):
         print("Roster looks healthy and correctly configured!")
 
 
-def cmd_waiver_analyze(args, as_json=False):
+def cmd_waiver_analyze(args, as_json=False, ctx=None):
     """Score free agents by how much they'd improve your weakest categories"""
     pos_type = args[0] if args else "B"
     count = int(args[1]) if len(args) > 1 else 15
@@ -786,13 +807,11 @@ def cmd_waiver_analyze(args, as_json=False):
         print("Waiver Wire Analysis (" + ("Batters" if pos_type == "B" else "Pitchers") + ")")
         print("=" * 50)
 
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
+    ctx = league_context.resolve(ctx)
 
     # First, get our weak categories from the scoreboard
     try:
-        scoreboard = lg.scoreboard()
+        scoreboard = ctx.scoreboard()
     except Exception as e:
         if as_json:
             return {"error": "Error fetching scoreboard: " + str(e)}
@@ -864,7 +883,7 @@ def cmd_waiver_analyze(args, as_json=False):
 
     # Fetch free agents
     try:
-        fa = lg.free_agents(pos_type)[:count * 2]  # Fetch extra to filter
+        fa = ctx.free_agents(pos_type)[:count * 2]  # Fetch extra to filter
     except Exception as e:
         if as_json:
             return {"error": "Error fetching free agents: " + str(e)}
@@ -1027,24 +1046,22 @@ def cmd_waiver_analyze(args, as_json=False):
         print("Focus: Target players strong in " + ", ".join(weak_cat_names))
 
 
-def cmd_streaming(args, as_json=False):
+def cmd_streaming(args, as_json=False, ctx=None):
     """Recommend streaming pitchers for a given week"""
     if not as_json:
         print("Streaming Pitcher Recommendations")
         print("=" * 50)
 
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
+    ctx = league_context.resolve(ctx)
 
     # Determine the week
-    target_week = int(args[0]) if args else lg.current_week()
+    target_week = int(args[0]) if args else ctx.current_week()
     if not as_json:
         print("Analyzing week " + str(target_week) + "...")
 
     # Get the week date range
     try:
-        settings = lg.settings()
+        settings = ctx.settings()
         start_date_str = settings.get("start_date", "")
         if start_date_str:
             season_start = datetime.strptime(start_date_str, "%Y-%m-%d").date()
@@ -1093,7 +1110,7 @@ def cmd_streaming(args, as_json=False):
 
     # Get free agent pitchers
     try:
-        fa_pitchers = lg.free_agents("P")[:40]
+        fa_pitchers = ctx.free_agents("P")[:40]
     except Exception as e:
         if as_json:
             return {"error": "Error fetching free agent pitchers: " + str(e)}
@@ -1232,7 +1249,7 @@ def cmd_streaming(args, as_json=False):
     print("*2S* = Likely two-start pitcher (7+ team games this week)")
 
 
-def cmd_trade_eval(args, as_json=False):
+def cmd_trade_eval(args, as_json=False, ctx=None):
     """Evaluate a potential trade"""
     if len(args) < 2:
         if as_json:
@@ -1249,14 +1266,11 @@ def cmd_trade_eval(args, as_json=False):
         print("Trade Evaluation")
         print("=" * 50)
 
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
-    team = lg.to_team(TEAM_ID)
+    ctx = league_context.resolve(ctx)
 
     # Fetch roster to find players we're giving
     try:
-        roster = team.roster()
+        roster = ctx.roster()
     except Exception as e:
         if as_json:
             return {"error": "Error fetching roster: " + str(e)}
@@ -1265,7 +1279,7 @@ def cmd_trade_eval(args, as_json=False):
 
     # Get stat categories
     try:
-        categories = lg.stat_categories()
+        categories = ctx.stat_categories()
     except Exception:
         categories = []
 
@@ -1416,16 +1430,17 @@ def cmd_trade_eval(args, as_json=False):
         print("  Position coverage unchanged")
 
 
-def cmd_daily_update(args, as_json=False):
+def cmd_daily_update(args, as_json=False, ctx=None):
     """Run all daily checks in sequence"""
+    ctx = league_context.resolve(ctx)
     if as_json:
         result = {}
         try:
-            result["lineup"] = cmd_lineup_optimize([], as_json=True)
+            result["lineup"] = cmd_lineup_optimize([], as_json=True, ctx=ctx)
         except Exception as e:
             result["lineup"] = {"error": str(e)}
         try:
-            result["injuries"] = cmd_injury_report([], as_json=True)
+            result["injuries"] = cmd_injury_report([], as_json=True, ctx=ctx)
         except Exception as e:
             result["injuries"] = {"error": str(e)}
         return result
@@ -1441,7 +1456,7 @@ def cmd_daily_update(args, as_json=False):
     print("[1/2] Checking lineup...")
     print("-" * 40)
     try:
-        cmd_lineup_optimize([])  # No --apply
+        cmd_lineup_optimize([], ctx=ctx)  # No --apply
     except Exception as e:
         print("  Error in lineup check: " + str(e))
     print("")
@@ -1450,7 +1465,7 @@ def cmd_daily_update(args, as_json=False):
     print("[2/2] Checking injuries...")
     print("-" * 40)
     try:
-        cmd_injury_report([])
+        cmd_injury_report([], ctx=ctx)
     except Exception as e:
         print("  Error in injury check: " + str(e))
     print("")
@@ -1464,7 +1479,7 @@ def cmd_daily_update(args, as_json=False):
     print("  streaming                  Get streaming pitcher picks")
 
 
-def cmd_category_simulate(args, as_json=False):
+def cmd_category_simulate(args, as_json=False, ctx=None):
     """Simulate category impact of adding/dropping a player"""
     if not args:
         if as_json:
@@ -1483,14 +1498,11 @@ def cmd_category_simulate(args, as_json=False):
             print("            Drop " + drop_name)
         print("")
 
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
-    team = lg.to_team(TEAM_ID)
+    ctx = league_context.resolve(ctx)
 
     # 1. Get current category ranks (reuse category-check logic)
     try:
-        scoreboard = lg.scoreboard()
+        scoreboard = ctx.scoreboard()
     except Exception as e:
         if as_json:
             return {"error": "Error fetching scoreboard: " + str(e)}
@@ -1563,7 +1575,7 @@ def cmd_category_simulate(args, as_json=False):
         # Search free agents for the player
         for pos_type in ["B", "P"]:
             try:
-                fa = lg.free_agents(pos_type)
+                fa = ctx.free_agents(pos_type)
                 for p in fa:
                     if add_name.lower() in p.get("name", "").lower():
                         add_player_info = p
@@ -1606,7 +1618,7 @@ def cmd_category_simulate(args, as_json=False):
     drop_player_info = None
     if drop_name:
         try:
-            roster = team.roster()
+            roster = ctx.roster()
             for p in roster:
                 if drop_name.lower() in p.get("name", "").lower():
                     drop_player_info = p
@@ -1753,19 +1765,17 @@ def cmd_category_simulate(args, as_json=False):
     print(summary)
 
 
-def cmd_scout_opponent(args, as_json=False):
+def cmd_scout_opponent(args, as_json=False, ctx=None):
     """Scout the current week's opponent - analyze their strengths and weaknesses"""
     if not as_json:
         print("Opponent Scout Report")
         print("=" * 50)
 
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
+    ctx = league_context.resolve(ctx)
 
     # Get stat categories for category names
     try:
-        stat_cats = lg.stat_categories()
+        stat_cats = ctx.stat_categories()
         stat_id_to_name = {}
         for cat in stat_cats:
             sid = str(cat.get("stat_id", ""))
@@ -1779,7 +1789,7 @@ def cmd_scout_opponent(args, as_json=False):
 
     # Get raw matchup data (same approach as yahoo-fantasy.py's matchup detail)
     try:
-        raw = lg.matchups()
+        raw = ctx.matchups()
     except Exception as e:
         if as_json:
             return {"error": "Error fetching matchup data: " + str(e)}
@@ -1941,7 +1951,7 @@ def cmd_scout_opponent(args, as_json=False):
             opp_weaknesses = []
 
             try:
-                scoreboard = lg.scoreboard()
+                scoreboard = ctx.scoreboard()
                 all_teams_cats = {}
                 if isinstance(scoreboard, list):
                     for m in scoreboard:
@@ -2097,19 +2107,17 @@ def _count_roster_games(roster, team_games):
     return {"batter_games": batter_games, "pitcher_games": pitcher_games}
 
 
-def cmd_matchup_strategy(args, as_json=False):
+def cmd_matchup_strategy(args, as_json=False, ctx=None):
     """Analyze your matchup and build a category-by-category game plan to maximize wins"""
     if not as_json:
         print("Matchup Strategy")
         print("=" * 50)
 
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
+    ctx = league_context.resolve(ctx)
 
     # ── 1. Matchup + category comparison (reuse scout-opponent parsing) ──
     try:
-        stat_cats = lg.stat_categories()
+        stat_cats = ctx.stat_categories()
         stat_id_to_name = {}
         for cat in stat_cats:
             sid = str(cat.get("stat_id", ""))
@@ -2133,7 +2141,7 @@ def cmd_matchup_strategy(args, as_json=False):
     RATE_STATS = {"AVG", "OBP", "ERA", "WHIP"}
 
     try:
-        raw = lg.matchups()
+        raw = ctx.matchups()
     except Exception as e:
         if as_json:
             return {"error": "Error fetching matchup data: " + str(e)}
@@ -2293,9 +2301,9 @@ def cmd_matchup_strategy(args, as_json=False):
 
         # ── 2. Schedule analysis — remaining games this week ──
         try:
-            settings = lg.settings()
+            settings = ctx.settings()
             start_date_str = settings.get("start_date", "")
-            current_week = lg.current_week()
+            current_week = ctx.current_week()
             target_week = int(week) if str(week).isdigit() else current_week
             if start_date_str:
                 season_start = datetime.strptime(start_date_str, "%Y-%m-%d").date()
@@ -2333,8 +2341,7 @@ def cmd_matchup_strategy(args, as_json=False):
 
             # Count games for each roster
             try:
-                my_team = lg.to_team(TEAM_ID)
-                my_roster = my_team.roster()
+                my_roster = ctx.roster()
                 my_games = _count_roster_games(my_roster, team_games)
                 schedule_data["my_batter_games"] = my_games.get("batter_games", 0)
                 schedule_data["my_pitcher_games"] = my_games.get("pitcher_games", 0)
@@ -2343,8 +2350,7 @@ def cmd_matchup_strategy(args, as_json=False):
                     print("  Warning: could not count my roster games: " + str(e))
 
             try:
-                opp_team = lg.to_team(opp_key)
-                opp_roster = opp_team.roster()
+                opp_roster = ctx.roster(opp_key)
                 opp_games = _count_roster_games(opp_roster, team_games)
                 schedule_data["opp_batter_games"] = opp_games.get("batter_games", 0)
                 schedule_data["opp_pitcher_games"] = opp_games.get("pitcher_games", 0)
@@ -2363,7 +2369,7 @@ def cmd_matchup_strategy(args, as_json=False):
         opp_transactions = []
         for tx_type in ["add", "drop"]:
             try:
-                raw_tx = lg.transactions(tx_type, 15)
+                raw_tx = ctx.transactions(tx_type, 15)
                 if not raw_tx:
                     continue
                 for tx in raw_tx:
@@ -2456,7 +2462,7 @@ def cmd_matchup_strategy(args, as_json=False):
             """Score free agents for target categories, return top 5"""
             results = []
             try:
-                fa = lg.free_agents(pos_type)[:25]
+                fa = ctx.free_agents(pos_type)[:25]
             except Exception:
                 return results
             for p in fa:
@@ -2635,12 +2641,10 @@ def cmd_set_lineup(args, as_json=False):
         print("Browser fallback error: " + str(e))
 
 
-def cmd_pending_trades(args, as_json=False):
+def cmd_pending_trades(args, as_json=False, ctx=None):
     """View all pending trade proposals"""
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
-    team = lg.to_team(TEAM_ID)
+    ctx = league_context.resolve(ctx)
+    team = ctx.team()
     try:
         trades = team.proposed_trades()
         if not trades:
@@ -2846,12 +2850,10 @@ def cmd_reject_trade(args, as_json=False):
         print(msg)
 
 
-def cmd_whats_new(args, as_json=False):
+def cmd_whats_new(args, as_json=False, ctx=None):
     """Single digest: injuries, pending trades, opponent moves, trending pickups, prospect call-ups"""
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
-    team = lg.to_team(TEAM_ID)
+    ctx = league_context.resolve(ctx)
+    team = ctx.team()
 
     db = get_db()
     now = datetime.now().isoformat()
@@ -2875,7 +2877,7 @@ def cmd_whats_new(args, as_json=False):
 
     # 1. Injury updates
     try:
-        injury_data = cmd_injury_report([], as_json=True)
+        injury_data = cmd_injury_report([], as_json=True, ctx=ctx)
         injured = []
         for p in injury_data.get("injured_active", []):
             injured.append({
@@ -2897,7 +2899,7 @@ def cmd_whats_new(args, as_json=False):
 
     # 2. Pending trades
     try:
-        trade_data = cmd_pending_trades([], as_json=True)
+        trade_data = cmd_pending_trades([], as_json=True, ctx=ctx)
         result["pending_trades"] = trade_data.get("trades", [])
     except Exception as e:
         print("Warning: pending trades check failed: " + str(e))
@@ -2905,7 +2907,7 @@ def cmd_whats_new(args, as_json=False):
     # 3. Recent league activity (filter out our own transactions)
     try:
         yf_mod = importlib.import_module("yahoo-fantasy")
-        tx_data = yf_mod.cmd_transactions([], as_json=True)
+        tx_data = yf_mod.cmd_transactions([], as_json=True, ctx=ctx)
         transactions = tx_data.get("transactions", [])
         my_team_name = team.team_data.get("name", "") if hasattr(team, "team_data") else ""
         activity = []
@@ -3001,16 +3003,13 @@ def cmd_whats_new(args, as_json=False):
         print("")
 
 
-def cmd_trade_finder(args, as_json=False):
+def cmd_trade_finder(args, as_json=False, ctx=None):
     """Scan league for complementary trade partners and suggest packages"""
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
-    team = lg.to_team(TEAM_ID)
+    ctx = league_context.resolve(ctx)
 
     try:
         # 1. Get our category rankings to find weak/strong areas
-        cat_data = cmd_category_check([], as_json=True)
+        cat_data = cmd_category_check([], as_json=True, ctx=ctx)
         if cat_data.get("error"):
             if as_json:
                 return {"error": cat_data.get("error")}
@@ -3021,8 +3020,8 @@ def cmd_trade_finder(args, as_json=False):
         strong_cats = cat_data.get("strongest", [])
 
         # 2. Get all teams and their rosters
-        all_teams = lg.teams()
-        my_roster = team.roster()
+        all_teams = ctx.teams()
+        my_roster = ctx.roster()
         my_players = {}
         for p in my_roster:
             pid = str(p.get("player_id", ""))
@@ -3035,8 +3034,7 @@ def cmd_trade_finder(args, as_json=False):
                 continue
             team_name = team_data.get("name", "Unknown")
             try:
-                other_team = lg.to_team(team_key)
-                other_roster = other_team.roster()
+                other_roster = ctx.roster(team_key)
             except Exception:
                 continue
 
@@ -3194,20 +3192,17 @@ def _extract_team_meta(team_data):
     return logo_url, mgr_image
 
 
-def cmd_power_rankings(args, as_json=False):
+def cmd_power_rankings(args, as_json=False, ctx=None):
     """Rank all teams by estimated roster strength"""
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
+    ctx = league_context.resolve(ctx)
     try:
-        all_teams = lg.teams()
+        all_teams = ctx.teams()
         rankings = []
         for team_key, team_data in all_teams.items():
             team_name = team_data.get("name", "Unknown")
             logo_url, mgr_image = _extract_team_meta(team_data)
             try:
-                t = lg.to_team(team_key)
-                roster = t.roster()
+                roster = ctx.roster(team_key)
             except Exception:
                 continue
             hitting_count = 0
@@ -3258,15 +3253,13 @@ def cmd_power_rankings(args, as_json=False):
         print("Error building power rankings: " + str(e))
 
 
-def cmd_week_planner(args, as_json=False):
+def cmd_week_planner(args, as_json=False, ctx=None):
     """Show games-per-day grid for your roster this week"""
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
-    team = lg.to_team(TEAM_ID)
+    ctx = league_context.resolve(ctx)
+    lg = ctx.league()
     try:
         # Get week date range
-        current_week = lg.current_week()
+        current_week = ctx.current_week()
         week_num = int(args[0]) if args else current_week
         try:
             week_range = lg.week_date_range(week_num)
@@ -3296,7 +3289,7 @@ def cmd_week_planner(args, as_json=False):
                     team_game_dates[norm].add(game_date)
 
         # Get roster and match players to their MLB teams
-        roster = team.roster()
+        roster = ctx.roster()
         # Build date list for the week
         s = datetime.strptime(start_date, "%Y-%m-%d").date()
         e = datetime.strptime(end_date, "%Y-%m-%d").date()
@@ -3371,15 +3364,13 @@ def cmd_week_planner(args, as_json=False):
         print("Error building week planner: " + str(e))
 
 
-def cmd_season_pace(args, as_json=False):
+def cmd_season_pace(args, as_json=False, ctx=None):
     """Project season pace, playoff odds, and magic number"""
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
+    ctx = league_context.resolve(ctx)
     try:
-        standings = lg.standings()
-        settings = lg.settings()
-        current_week = lg.current_week()
+        standings = ctx.standings()
+        settings = ctx.settings()
+        current_week = ctx.current_week()
         end_week = settings.get("end_week", 22)
         if not end_week:
             end_week = 22
@@ -3389,7 +3380,7 @@ def cmd_season_pace(args, as_json=False):
         # Fetch teams for logo/avatar data
         team_meta = {}
         try:
-            all_teams = lg.teams()
+            all_teams = ctx.teams()
             for tk, td in all_teams.items():
                 tname = td.get("name", "")
                 logo_url, mgr_image = _extract_team_meta(td)
@@ -3481,14 +3472,12 @@ def cmd_season_pace(args, as_json=False):
         print("Error calculating season pace: " + str(e))
 
 
-def cmd_closer_monitor(args, as_json=False):
+def cmd_closer_monitor(args, as_json=False, ctx=None):
     """Monitor closer situations across MLB - saves leaders, committees, at-risk closers"""
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
+    ctx = league_context.resolve(ctx)
     try:
         # Get saves leaders from free agents (high-ownership RPs)
-        fa_pitchers = lg.free_agents("P")[:50]
+        fa_pitchers = ctx.free_agents("P")[:50]
         rp_closers = []
         for p in fa_pitchers:
             positions = p.get("eligible_positions", [])
@@ -3506,8 +3495,7 @@ def cmd_closer_monitor(args, as_json=False):
                     })
 
         # Get our roster RPs for context
-        team = lg.to_team(TEAM_ID)
-        roster = team.roster()
+        roster = ctx.roster()
         my_closers = []
         for p in roster:
             positions = p.get("eligible_positions", [])
@@ -3529,7 +3517,8 @@ def cmd_closer_monitor(args, as_json=False):
         saves_leaders = []
         try:
             if statsapi:
-                leaders_data = statsapi.league_leaders("saves", limit=30)
+                with metrics.track("mlb_api"):
+                    leaders_data = statsapi.league_leaders("saves", limit=30)
                 if isinstance(leaders_data, str):
                     # Parse the text output
                     for line in leaders_data.strip().split("\n")[1:]:
@@ -3574,15 +3563,13 @@ def cmd_closer_monitor(args, as_json=False):
         print("Error building closer monitor: " + str(e))
 
 
-def cmd_pitcher_matchup(args, as_json=False):
+def cmd_pitcher_matchup(args, as_json=False, ctx=None):
     """Show pitcher matchup quality for rostered SPs based on opponent team batting stats"""
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
-    team = lg.to_team(TEAM_ID)
+    ctx = league_context.resolve(ctx)
+    lg = ctx.league()
     try:
         # Get week date range
-        current_week = lg.current_week()
+        current_week = ctx.current_week()
         week_num = int(args[0]) if args else current_week
         try:
             week_range = lg.week_date_range(week_num)
@@ -3596,7 +3583,7 @@ def cmd_pitcher_matchup(args, as_json=False):
             end_date = end_of_week.isoformat()
 
         # Get roster SPs
-        roster = team.roster()
+        roster = ctx.roster()
         pitchers = []
         for p in roster:
             positions = p.get("eligible_positions", [])
@@ -3622,7 +3609,8 @@ def cmd_pitcher_matchup(args, as_json=False):
         probable_map = {}  # pitcher_name_norm -> [game_info, ...]
         try:
             if statsapi:
-                prob_sched = statsapi.schedule(start_date=start_date, end_date=end_date, hydrate="probablePitcher")
+                with metrics.track("mlb_api"):
+                    prob_sched = statsapi.schedule(start_date=start_date, end_date=end_date, hydrate="probablePitcher")
                 for game in prob_sched:
                     game_date = game.get("game_date", "")
                     for side in ["away_probable_pitcher", "home_probable_pitcher"]:
@@ -3646,7 +3634,8 @@ def cmd_pitcher_matchup(args, as_json=False):
         try:
             from pybaseball import team_batting as pb_team_batting
             season = date.today().year
-            tb = pb_team_batting(season)
+            with metrics.track("pybaseball"):
+                tb = pb_team_batting(season)
             if tb is not None and len(tb) > 0:
                 for _, row in tb.iterrows():
                     team_name = str(row.get("Team", ""))
@@ -3841,6 +3830,7 @@ if __name__ == "__main__":
     args = sys.argv[2:]
 
     if cmd in COMMANDS:
+        league_context.activate(league_context.LeagueContext())
         COMMANDS[cmd](args)
     else:
         print("Unknown command: " + cmd)
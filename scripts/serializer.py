@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Response Serializer - Fast JSON and optional MessagePack for api-server
+
+jsonify() goes through dumps() here instead of the stdlib encoder:
+
+  - orjson when it is installed (JSON_ENCODER=stdlib forces the stdlib)
+  - numpy scalars/arrays and pandas Series/DataFrames are converted on the
+    way out, so valuation results don't need float()/int() passes first
+  - output matches Flask's: sorted keys, compact separators, dates as HTTP
+    dates. One difference: orjson writes NaN/Infinity as null (valid JSON)
+    where the stdlib writes bare NaN
+
+A client that sends Accept: application/msgpack gets MessagePack instead,
+when the msgpack package is installed; otherwise it gets JSON as before.
+
+bench_serializer.py compares encoders on a recorded payload.
+"""
+
+import os
+import sys
+import json
+import uuid
+import decimal
+import datetime
+import dataclasses
+from email.utils import format_datetime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_ENCODER = os.environ.get("JSON_ENCODER", "auto")
+
+JSON_MIMETYPE = "application/json"
+MSGPACK_MIMETYPE = "application/msgpack"
+MIMETYPES = {"json": JSON_MIMETYPE, "msgpack": MSGPACK_MIMETYPE}
+
+_ORJSON_OPTIONS = 0
+if orjson is not None:
+    _ORJSON_OPTIONS = (
+        orjson.OPT_SORT_KEYS
+        | orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_SERIALIZE_NUMPY
+        # Hand dates to to_builtin() so they render like Flask's (HTTP dates)
+        | orjson.OPT_PASSTHROUGH_DATETIME
+    )
+
+
+def _http_date(o):
+    """RFC 1123 date, as Flask's encoder renders date/datetime (naive = UTC)"""
+    if not isinstance(o, datetime.datetime):
+        o = datetime.datetime.combine(o, datetime.time())
+    if o.tzinfo is None:
+        o = o.replace(tzinfo=datetime.timezone.utc)
+    return format_datetime(o.astimezone(datetime.timezone.utc), usegmt=True)
+
+
+def to_builtin(o):
+    """default= hook: convert values the encoders don't handle natively.
+    numpy/pandas are only checked if something already imported them.
+    """
+    np = sys.modules.get("numpy")
+    if np is not None:
+        if isinstance(o, np.generic):
+            return o.item()
+        if isinstance(o, np.ndarray):
+            return o.tolist()
+    pd = sys.modules.get("pandas")
+    if pd is not None:
+        if o is pd.NaT:
+            return None
+        if isinstance(o, pd.DataFrame):
+            return o.to_dict("records")
+        if isinstance(o, (pd.Series, pd.Index)):
+            return o.tolist()
+    if isinstance(o, datetime.date):
+        return _http_date(o)
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError("Object of type " + type(o).__name__ + " is not JSON serializable")
+
+
+def encoder():
+    """Name of the JSON encoder in use"""
+    if orjson is not None and JSON_ENCODER != "stdlib":
+        return "orjson"
+    return "stdlib"
+
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj, default=to_builtin, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def dumps(obj):
+    """Serialize obj to JSON bytes"""
+    if orjson is not None and JSON_ENCODER != "stdlib":
+        try:
+            return orjson.dumps(obj, default=to_builtin, option=_ORJSON_OPTIONS)
+        except TypeError:
+            # orjson refuses a few things the stdlib accepts (ints over 64
+            # bits, mixed-type keys it can't sort); fall back rather than fail
+            pass
+    return _stdlib_dumps(obj)
+
+
+def pack(obj):
+    """Serialize obj to MessagePack bytes (requires msgpack)"""
+    return msgpack.packb(obj, default=to_builtin, use_bin_type=True)
+
+
+def loads(body, mimetype=JSON_MIMETYPE):
+    """Parse a body produced by dumps() or pack()"""
+    if mimetype == MSGPACK_MIMETYPE:
+        return msgpack.unpackb(body, raw=False, strict_map_key=False)
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def negotiate(accept_mimetypes):
+    """"msgpack" if the client prefers it and we can produce it, else "json" """
+    if msgpack is None:
+        return "json"
+    best = accept_mimetypes.best_match([JSON_MIMETYPE, MSGPACK_MIMETYPE])
+    return "msgpack" if best == MSGPACK_MIMETYPE else "json"
+
+
+def render(obj, fmt="json"):
+    """(body, mimetype) for obj in the negotiated format"""
+    if fmt == "msgpack":
+        return pack(obj), MSGPACK_MIMETYPE
+    return dumps(obj), JSON_MIMETYPE
+
+
+def get_stats():
+    return {
+        "json_encoder": encoder(),
+        "msgpack": msgpack is not None,
+    }
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Single-flight Call Coalescing - Concurrent identical calls run once and share the result
+
+When several threads ask for the same key at the same time, the first one
+(the leader) runs the function and the rest block until it finishes, then
+get the same return value or re-raise the same exception. Nothing is kept
+after the call completes -- caching is the caller's job; this only removes
+duplicate in-flight work.
+"""
+
+import threading
+import functools
+
+
+class _Call:
+    """One in-flight call and its eventual outcome"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class Group:
+    """A namespace of in-flight calls keyed by any hashable value"""
+
+    def __init__(self, name=""):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {"calls": 0, "shared": 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) unless a call for key is already in flight,
+        in which case wait for it and return its result.
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._stats["shared"] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def in_flight(self):
+        """Number of keys currently being computed"""
+        with self._lock:
+            return len(self._calls)
+
+    def get_stats(self):
+        """Total calls and how many were served by another thread's call"""
+        with self._lock:
+            result = dict(self._stats)
+            result["in_flight"] = len(self._calls)
+        return result
+
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+def group(name):
+    """Get the named Group, creating it on first use"""
+    with _groups_lock:
+        g = _groups.get(name)
+        if g is None:
+            g = Group(name)
+            _groups[name] = g
+        return g
+
+
+def coalesced(fn):
+    """Decorator: coalesce concurrent calls to fn with identical arguments.
+    Arguments must be hashable; they form the key.
+    """
+    flight = group(fn.__module__ + "." + fn.__name__)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        return flight.do(key, fn, *args, **kwargs)
+
+    return wrapper
+
+
+def get_stats():
+    """Stats for every named group"""
+    with _groups_lock:
+        groups = dict(_groups)
+    return {name: g.get_stats() for name, g in groups.items()}
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""Upstream Rate Budget - Token bucket per upstream host with priority queueing
+
+Every Yahoo, MLB Stats API (including statsapi), Savant, FanGraphs
+(including pybaseball) and Reddit call goes through metrics.track() or an
+instrumented requests session; both call acquire(kind) first. Kinds that
+reach the same host share its bucket (BUDGET_KINDS). Each upstream gets a token bucket (steady rate plus a
+burst). When a bucket is empty, callers queue and are served interactive
+first, then background (warmers, heartbeat, cron jobs that send
+X-Priority: background), FIFO within a priority.
+
+A 429 or Yahoo's 999 puts the upstream into a cooldown: the bucket is
+drained and nothing is sent until the backoff expires, doubling if it
+throttles again soon after. Buckets are per process.
+
+UPSTREAM_LIMITS overrides the defaults, e.g. "yahoo=1/10,reddit=0.2/3"
+(requests per second / burst). UPSTREAM_BUDGET=0 turns the whole thing off.
+"""
+
+import os
+import time
+import heapq
+import itertools
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+import deadline
+
+ENABLED = os.environ.get("UPSTREAM_BUDGET", "1") != "0"
+
+# kind -> (requests per second, burst)
+DEFAULT_LIMITS = {
+    "yahoo": (2.0, 20),       # fantasysports.yahooapis.com
+    "mlb_api": (10.0, 30),    # statsapi.mlb.com
+    "savant": (2.0, 10),      # baseballsavant.mlb.com
+    "fangraphs": (1.0, 5),    # www.fangraphs.com
+    "reddit": (0.5, 5),       # www.reddit.com
+}
+
+# Tracked kinds that spend another kind's budget (pybaseball scrapes FanGraphs)
+BUDGET_KINDS = {
+    "pybaseball": "fangraphs",
+}
+
+# Longest a caller waits for a token before giving up, per priority
+MAX_WAIT = {
+    "interactive": float(os.environ.get("UPSTREAM_MAX_WAIT", "30")),
+    "background": float(os.environ.get("UPSTREAM_MAX_WAIT_BACKGROUND", "300")),
+}
+
+THROTTLE_BACKOFF = float(os.environ.get("UPSTREAM_THROTTLE_BACKOFF", "30"))
+THROTTLE_BACKOFF_MAX = 300.0
+
+# HTTP statuses that mean "slow down" (999 is Yahoo's)
+THROTTLE_STATUSES = (429, 999)
+
+PRIORITIES = {"interactive": 0, "background": 1}
+
+# Window for the calls-per-minute / utilization telemetry
+WINDOW_SECONDS = 60.0
+
+
+class BudgetExhausted(Exception):
+    """No token became available within the caller's max wait"""
+
+
+def _parse_limits(value):
+    limits = dict(DEFAULT_LIMITS)
+    for item in (value or "").split(","):
+        item = item.strip()
+        if "=" not in item:
+            continue
+        kind, spec = item.split("=", 1)
+        try:
+            rate, _, burst = spec.partition("/")
+            rate = float(rate)
+            burst = int(burst) if burst else max(1, int(rate))
+        except ValueError:
+            print("Warning: ignoring bad UPSTREAM_LIMITS entry: " + item)
+            continue
+        limits[kind.strip()] = (rate, burst)
+    return limits
+
+
+LIMITS = _parse_limits(os.environ.get("UPSTREAM_LIMITS", ""))
+
+_priority = contextvars.ContextVar("upstream_priority", default="interactive")
+_seq = itertools.count()
+
+
+class TokenBucket:
+    """Token bucket whose waiters are served in (priority, arrival) order"""
+
+    def __init__(self, kind, rate, burst):
+        self.kind = kind
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.backoff = THROTTLE_BACKOFF
+        self.last_throttled = 0.0
+        self.cond = threading.Condition()
+        self.waiters = []
+        self.recent = deque()
+        self.stats = {
+            "acquired": 0,
+            "queued": 0,
+            "wait_seconds": 0.0,
+            "rejected": 0,
+            "throttled": 0,
+        }
+
+    def _refill(self, now):
+        if now < self.blocked_until:
+            self.updated = now
+            return
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _trim(self, now):
+        while self.recent and now - self.recent[0] > WINDOW_SECONDS:
+            self.recent.popleft()
+
+    def acquire(self, priority="interactive", max_wait=None):
+        """Take one token, waiting behind higher-priority and earlier callers.
+        Returns seconds waited; raises BudgetExhausted after max_wait.
+        """
+        if max_wait is None:
+            max_wait = MAX_WAIT.get(priority, MAX_WAIT["interactive"])
+        started = time.monotonic()
+        entry = (PRIORITIES.get(priority, 0), next(_seq), priority)
+        with self.cond:
+            heapq.heappush(self.waiters, entry)
+            queued = False
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self.waiters[0] is entry and self.tokens >= 1:
+                    heapq.heappop(self.waiters)
+                    self.tokens -= 1
+                    waited = now - started
+                    self.stats["acquired"] += 1
+                    self.stats["wait_seconds"] += waited
+                    self.recent.append(now)
+                    self._trim(now)
+                    # Let the next waiter re-check
+                    self.cond.notify_all()
+                    return waited
+                remaining = max_wait - (now - started)
+                if remaining <= 0:
+                    self.waiters.remove(entry)
+                    heapq.heapify(self.waiters)
+                    self.stats["rejected"] += 1
+                    self.cond.notify_all()
+                    raise BudgetExhausted(
+                        self.kind + " rate budget exhausted (waited "
+                        + str(round(now - started, 1)) + "s)"
+                    )
+                if not queued:
+                    queued = True
+                    self.stats["queued"] += 1
+                if now < self.blocked_until:
+                    delay = self.blocked_until - now
+                else:
+                    delay = max(0.01, (1 - self.tokens) / self.rate) if self.rate > 0 else remaining
+                self.cond.wait(min(delay, remaining))
+
+    def throttled(self):
+        """The upstream pushed back: drain the bucket and pause for the backoff"""
+        with self.cond:
+            now = time.monotonic()
+            # Throttled again soon after the last cooldown ended: back off harder
+            if now - self.last_throttled < self.backoff * 2:
+                self.backoff = min(THROTTLE_BACKOFF_MAX, self.backoff * 2)
+            else:
+                self.backoff = THROTTLE_BACKOFF
+            self.last_throttled = now
+            self.tokens = 0.0
+            self.blocked_until = max(self.blocked_until, now + self.backoff)
+            self.stats["throttled"] += 1
+            print(
+                "Warning: " + self.kind + " throttled us, pausing calls for "
+                + str(int(self.backoff)) + "s"
+            )
+
+    def snapshot(self):
+        with self.cond:
+            now = time.monotonic()
+            self._refill(now)
+            self._trim(now)
+            waiting = {name: 0 for name in PRIORITIES}
+            for _, _, priority in self.waiters:
+                waiting[priority] = waiting.get(priority, 0) + 1
+            capacity = self.rate * WINDOW_SECONDS + self.burst
+            result = dict(self.stats)
+            result.update({
+                "rate_per_second": self.rate,
+                "burst": self.burst,
+                "tokens": round(self.tokens, 2),
+                "calls_last_minute": len(self.recent),
+                "utilization": round(len(self.recent) / capacity, 3) if capacity else None,
+                "waiting": waiting,
+                "cooldown_seconds": round(max(0.0, self.blocked_until - now), 1),
+            })
+            result["wait_seconds"] = round(result["wait_seconds"], 3)
+            return result
+
+
+_buckets = {kind: TokenBucket(kind, rate, burst) for kind, (rate, burst) in LIMITS.items()}
+
+
+def acquire(kind):
+    """Wait for a token for an upstream call. Kinds without a limit (e.g.
+    playwright) pass straight through. Returns seconds waited.
+    """
+    bucket = _buckets.get(BUDGET_KINDS.get(kind, kind))
+    if not ENABLED or bucket is None:
+        return 0.0
+    priority = _priority.get()
+    max_wait = MAX_WAIT.get(priority, MAX_WAIT["interactive"])
+    # Don't queue past the request's deadline
+    left = deadline.remaining()
+    if left is not None:
+        max_wait = max(0.0, min(max_wait, left))
+    return bucket.acquire(priority, max_wait)
+
+
+def throttled(kind):
+    """Report a 429/999 from an upstream"""
+    bucket = _buckets.get(BUDGET_KINDS.get(kind, kind))
+    if ENABLED and bucket is not None:
+        bucket.throttled()
+
+
+def is_throttle_status(status):
+    return status in THROTTLE_STATUSES
+
+
+# --- Priority ---
+
+
+def set_priority(priority):
+    """Set the priority for calls made in this context. Returns a reset token."""
+    if priority not in PRIORITIES:
+        priority = "interactive"
+    return _priority.set(priority)
+
+
+def reset_priority(token):
+    _priority.reset(token)
+
+
+def current_priority():
+    return _priority.get()
+
+
+@contextmanager
+def background():
+    """Run the enclosed calls at background priority"""
+    token = _priority.set("background")
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def get_stats():
+    """Per-upstream bucket state and counters"""
+    return {kind: bucket.snapshot() for kind, bucket in sorted(_buckets.items())}
@@ -13,11 +13,16 @@ import pandas as pd
 import numpy as np
 from mlb_id_cache import get_mlb_id
 from intel import batch_intel
+import metrics
+import deadline
+import data_cache
+import worker_pools
 
 DATA_DIR = os.environ.get("DATA_DIR", "/app/data")
 
 # FanGraphs projections API
 FANGRAPHS_PROJ_URL = "https://www.fangraphs.com/api/projections"
+FANGRAPHS_TIMEOUT = 30  # seconds, capped by the request deadline
 PROJ_MAX_AGE = 86400  # 24 hours
 
 
@@ -56,7 +61,8 @@ def fetch_fangraphs_projections(stats_type, proj_type="steamer"):
             "User-Agent": "YahooFantasyBot/1.0",
             "Accept": "application/json",
         })
-        with urllib.request.urlopen(req, timeout=30) as response:
+        timeout = deadline.timeout(FANGRAPHS_TIMEOUT)
+        with metrics.track("fangraphs"), urllib.request.urlopen(req, timeout=timeout) as response:
             raw = json.loads(response.read().decode())
         if not raw or not isinstance(raw, list):
             print("Warning: FanGraphs projections returned empty for " + stats_type)
@@ -158,21 +164,31 @@ POS_BONUS = {"C": 1.5, "SS": 1.5, "2B": 0.5, "3B": 0.5, "RP": 0.5}
 MIN_PA = 200
 MIN_IP = 30
 
-_cached_categories = None
+# Scoring categories per league, refreshed daily. When Yahoo fails the
+# defaults are only kept briefly so the league's real categories load soon.
+_categories_cache = data_cache.namespace("valuations.categories", 86400)
+# Live season stats: one pybaseball pull serves every load_all() for this long
+_live_cache = data_cache.namespace("valuations.live", 1800)
+CATEGORIES_FALLBACK_TTL = 300
+
+
+def _default_categories():
+    return {
+        "batting": list(DEFAULT_BATTING_CATS),
+        "batting_negative": list(DEFAULT_BATTING_CATS_NEGATIVE),
+        "pitching": list(DEFAULT_PITCHING_CATS),
+        "pitching_negative": list(DEFAULT_PITCHING_CATS_NEGATIVE),
+    }
+
 
 def load_league_categories(lg=None):
     """Load scoring categories from Yahoo API, falling back to defaults"""
-    global _cached_categories
-    if _cached_categories:
-        return _cached_categories
     if lg is None:
-        _cached_categories = {
-            "batting": list(DEFAULT_BATTING_CATS),
-            "batting_negative": list(DEFAULT_BATTING_CATS_NEGATIVE),
-            "pitching": list(DEFAULT_PITCHING_CATS),
-            "pitching_negative": list(DEFAULT_PITCHING_CATS_NEGATIVE),
-        }
-        return _cached_categories
+        return _default_categories()
+    key = str(getattr(lg, "league_id", "") or "league")
+    cached = _categories_cache.get(key)
+    if cached:
+        return cached
     try:
         cats = lg.stat_categories()
         batting = []
@@ -196,48 +212,50 @@ def load_league_categories(lg=None):
                 else:
                     pitching.append(name)
         if batting or pitching:
-            _cached_categories = {
+            return _categories_cache.set(key, {
                 "batting": batting,
                 "batting_negative": batting_neg,
                 "pitching": pitching,
                 "pitching_negative": pitching_neg,
-            }
-        else:
-            _cached_categories = {
-                "batting": list(DEFAULT_BATTING_CATS),
-                "batting_negative": list(DEFAULT_BATTING_CATS_NEGATIVE),
-                "pitching": list(DEFAULT_PITCHING_CATS),
-                "pitching_negative": list(DEFAULT_PITCHING_CATS_NEGATIVE),
-            }
+            })
+        return _categories_cache.set(key, _default_categories(), ttl=CATEGORIES_FALLBACK_TTL)
     except Exception:
-        _cached_categories = {
-            "batting": list(DEFAULT_BATTING_CATS),
-            "batting_negative": list(DEFAULT_BATTING_CATS_NEGATIVE),
-            "pitching": list(DEFAULT_PITCHING_CATS),
-            "pitching_negative": list(DEFAULT_PITCHING_CATS_NEGATIVE),
-        }
-    return _cached_categories
+        return _categories_cache.set(key, _default_categories(), ttl=CATEGORIES_FALLBACK_TTL)
 
 
-def load_hitters_csv():
-    """Load FanGraphs hitter projections CSV"""
-    path = os.path.join(DATA_DIR, "projections_hitters.csv")
-    if not os.path.exists(path):
+# Parsed projection CSVs keyed by path -> (mtime, DataFrame). Rewriting the
+# file (ensure_projections) changes its mtime and forces a re-read. Frames are
+# shared between callers (and, when preloaded, between forked api-server
+# workers) -- treat them as read-only.
+_csv_frames = {}
+
+
+def _read_projection_csv(path):
+    """Read a projection CSV once per file version"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
         return None
+    cached = _csv_frames.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
     df = pd.read_csv(path)
     # Normalize column names (FanGraphs sometimes has spaces)
     df.columns = df.columns.str.strip()
+    _csv_frames[path] = (mtime, df)
     return df
 
 
+def load_hitters_csv():
+    """Load FanGraphs hitter projections CSV"""
+    path = os.path.join(DATA_DIR, "projections_hitters.csv")
+    return _read_projection_csv(path)
+
+
 def load_pitchers_csv():
     """Load FanGraphs pitcher projections CSV"""
     path = os.path.join(DATA_DIR, "projections_pitchers.csv")
-    if not os.path.exists(path):
-        return None
-    df = pd.read_csv(path)
-    df.columns = df.columns.str.strip()
-    return df
+    return _read_projection_csv(path)
 
 
 def derive_hitter_stats(df):
@@ -468,11 +486,16 @@ def load_live_stats():
     """Load current-season live stats via pybaseball.
     Returns (hitters_df, pitchers_df) or (None, None) if unavailable.
     """
+    current_year = date.today().year
+    cached = _live_cache.get(current_year)
+    if cached is not None:
+        return cached
     try:
         from pybaseball import batting_stats, pitching_stats
-        current_year = date.today().year
-        h_df = batting_stats(current_year, qual=1)
-        p_df = pitching_stats(current_year, qual=1)
+        with metrics.track("pybaseball"):
+            h_df = batting_stats(current_year, qual=1)
+        with metrics.track("pybaseball"):
+            p_df = pitching_stats(current_year, qual=1)
         if h_df is not None and len(h_df) > 0:
             h_df.columns = h_df.columns.str.strip()
         else:
@@ -481,7 +504,9 @@ def load_live_stats():
             p_df.columns = p_df.columns.str.strip()
         else:
             p_df = None
-        return h_df, p_df
+        if h_df is None and p_df is None:
+            return None, None
+        return _live_cache.set(current_year, (h_df, p_df))
     except Exception as e:
         print("Warning: live stats fetch failed: " + str(e))
         return None, None
@@ -673,9 +698,70 @@ def load_from_json():
     return h_df, p_df
 
 
+def compute_valuations(h_csv, p_csv, live_h=None, live_p=None):
+    """Blend live stats into the projection frames and compute z-scores.
+    Returns (hitters, pitchers, source); either frame may be None. This is
+    the pandas-heavy part of load_all() and runs in the analytics pool.
+    """
+    hitters = None
+    pitchers = None
+    source = "json"
+
+    # In-season blending: blend projections with live stats (April+)
+    try:
+        if h_csv is not None and live_h is not None and len(live_h) > 0:
+            h_csv = blend_projections_and_actual(h_csv, live_h, stat_type="bat")
+            source = "blended"
+        if p_csv is not None and live_p is not None and len(live_p) > 0:
+            p_csv = blend_projections_and_actual(p_csv, live_p, stat_type="pit")
+            source = "blended"
+    except Exception as e:
+        print("Warning: live stats blending failed: " + str(e))
+
+    if h_csv is not None:
+        h_derived = derive_hitter_stats(h_csv)
+        hitters = compute_hitter_zscores(h_derived)
+        if source != "blended":
+            source = "csv"
+
+    if p_csv is not None:
+        p_derived = derive_pitcher_stats(p_csv)
+        pitchers = compute_pitcher_zscores(p_derived)
+        if source != "blended":
+            source = "csv"
+
+    return hitters, pitchers, source
+
+
+# Last compute_valuations() inputs and result. The projection frames come from
+# _csv_frames (a new object per file mtime) and live stats from _live_cache, so
+# the same objects mean the same valuations. Shared like the inputs: read-only.
+_valuations_memo = {"inputs": None, "result": None}
+
+
+def _valuations(h_csv, p_csv, live_h, live_p):
+    """compute_valuations() in the analytics pool, memoized on its inputs"""
+    inputs = (h_csv, p_csv, live_h, live_p)
+    memo_inputs = _valuations_memo["inputs"]
+    if memo_inputs is not None and all(a is b for a, b in zip(inputs, memo_inputs)):
+        return _valuations_memo["result"]
+    try:
+        result = worker_pools.call("analytics", compute_valuations, h_csv, p_csv, live_h, live_p)
+    except (worker_pools.JobTimeout, worker_pools.WorkerCrashed) as e:
+        print("Warning: analytics pool unavailable, computing valuations inline: " + str(e))
+        result = compute_valuations(h_csv, p_csv, live_h, live_p)
+    _valuations_memo["inputs"] = inputs
+    _valuations_memo["result"] = result
+    return result
+
+
 def load_all():
     """Load and compute valuations from best available data source.
     Priority: manual CSV (if fresh) -> auto-fetched projections -> JSON fallback
+
+    Projection frames (preloaded by the api-server) and live stats load in
+    this process; only compute_valuations() goes to the analytics pool, and
+    only when its inputs changed since the last call.
     """
     h_csv = load_hitters_csv()
     p_csv = load_pitchers_csv()
@@ -691,34 +777,11 @@ def load_all():
         except Exception as e:
             print("Warning: auto-fetch projections failed: " + str(e))
 
-    hitters = None
-    pitchers = None
-    source = "json"
-
-    # In-season blending: blend projections with live stats (April+)
+    live_h = live_p = None
     if h_csv is not None and date.today().month >= 4:
-        try:
-            live_h, live_p = load_live_stats()
-            if live_h is not None and len(live_h) > 0:
-                h_csv = blend_projections_and_actual(h_csv, live_h, stat_type="bat")
-                source = "blended"
-            if p_csv is not None and live_p is not None and len(live_p) > 0:
-                p_csv = blend_projections_and_actual(p_csv, live_p, stat_type="pit")
-                source = "blended"
-        except Exception as e:
-            print("Warning: live stats blending failed: " + str(e))
-
-    if h_csv is not None:
-        h_derived = derive_hitter_stats(h_csv)
-        hitters = compute_hitter_zscores(h_derived)
-        if source != "blended":
-            source = "csv"
+        live_h, live_p = load_live_stats()
 
-    if p_csv is not None:
-        p_derived = derive_pitcher_stats(p_csv)
-        pitchers = compute_pitcher_zscores(p_derived)
-        if source != "blended":
-            source = "csv"
+    hitters, pitchers, source = _valuations(h_csv, p_csv, live_h, live_p)
 
     # Fallback to JSON for whichever is missing
     if hitters is None or pitchers is None:
@@ -737,26 +800,57 @@ def load_all():
 
 def get_player_by_name(name, hitters, pitchers):
     """Find a player by partial name match"""
-    name_lower = name.lower()
-    results = []
-
-    if hitters is not None:
-        for _, row in hitters.iterrows():
-            if name_lower in str(row.get("Name", "")).lower():
-                r = row.to_dict()
-                r["_type"] = "B"
-                results.append(r)
-
-    if pitchers is not None:
-        for _, row in pitchers.iterrows():
-            if name_lower in str(row.get("Name", "")).lower():
-                r = row.to_dict()
-                r["_type"] = "P"
-                results.append(r)
+    return find_players([name], hitters, pitchers)[name]
+
 
+def find_players(names, hitters, pitchers):
+    """Partial name match for several names at once.
+    Returns dict name -> list of row dicts (hitters first, "_type" set).
+    Each frame's names are lowercased once and searched vectorized.
+    """
+    frames = []
+    for df, ptype in ((hitters, "B"), (pitchers, "P")):
+        if df is not None and "Name" in df.columns:
+            frames.append((df, df["Name"].astype(str).str.lower(), ptype))
+
+    results = {}
+    for name in names:
+        name_lower = name.lower()
+        matches = []
+        for df, lowered, ptype in frames:
+            for r in df[lowered.str.contains(name_lower, regex=False)].to_dict("records"):
+                r["_type"] = ptype
+                matches.append(r)
+        results[name] = matches
     return results
 
 
+def player_json(p):
+    """JSON shape of a valuation row: raw stats and z-scores split apart"""
+    skip = {"Name", "Team", "Pos", "_type"}
+    raw_stats = {}
+    z_scores = {}
+    for k in p.keys():
+        if k in skip:
+            continue
+        val = p[k]
+        if pd.isna(val):
+            val = 0
+        if k.startswith("Z_"):
+            label = k.replace("Z_", "")
+            z_scores[label] = round(float(val), 2) if isinstance(val, (int, float)) else val
+        else:
+            raw_stats[k] = round(float(val), 3) if isinstance(val, float) else val
+    return {
+        "name": str(p.get("Name", "?")),
+        "type": str(p.get("_type", "?")),
+        "team": str(p.get("Team", "")),
+        "pos": str(p.get("Pos", "")),
+        "raw_stats": raw_stats,
+        "z_scores": z_scores,
+    }
+
+
 def _safe_float(val):
     """Safely convert a value to float, handling NaN"""
     if pd.isna(val):
@@ -943,30 +1037,7 @@ def cmd_value(args, as_json=False):
         return
 
     if as_json:
-        players = []
-        for p in results:
-            skip = {"Name", "Team", "Pos", "_type"}
-            raw_stats = {}
-            z_scores = {}
-            for k in p.keys():
-                if k in skip:
-                    continue
-                val = p[k]
-                if pd.isna(val):
-                    val = 0
-                if k.startswith("Z_"):
-                    label = k.replace("Z_", "")
-                    z_scores[label] = round(float(val), 2) if isinstance(val, (int, float)) else val
-                else:
-                    raw_stats[k] = round(float(val), 3) if isinstance(val, float) else val
-            players.append({
-                "name": str(p.get("Name", "?")),
-                "type": str(p.get("_type", "?")),
-                "team": str(p.get("Team", "")),
-                "pos": str(p.get("Pos", "")),
-                "raw_stats": raw_stats,
-                "z_scores": z_scores,
-            })
+        players = [player_json(p) for p in results]
         try:
             names = [p.get("name", "") for p in players]
             intel_data = batch_intel(names, include=["statcast", "trends"])
@@ -0,0 +1,539 @@
+#!/usr/bin/env python3
+"""Worker Pools - Runs browser writes and heavy pandas work in child processes
+
+A Playwright write launches Chromium, and a valuation pass rebuilds z-score
+frames for every projected player; in the api-server process both hold the
+GIL and grow RSS for every read request. Functions decorated with
+@offload("browser"), and calls made through call("analytics", fn, ...),
+instead run in a pool of spawned worker processes:
+
+  - each pool has its own concurrency limit (number of workers); callers
+    beyond it queue for a free worker
+  - a worker whose process tree grows past the pool's memory cap (PSS, so
+    pages Chromium's processes share are counted once) is killed mid-job,
+    or retired after it
+  - a worker is recycled after max_jobs jobs, so leaks don't accumulate;
+    its replacement starts right away, in the background
+  - a new worker imports its pool's PRELOAD modules (pandas for analytics)
+    before taking jobs
+  - a job may run for WORKER_JOB_TIMEOUT seconds, or until the request's
+    deadline, before its worker is killed
+  - browser jobs are Yahoo writes and are never killed mid-job: past the
+    memory cap the worker is retired once the job finishes, and past the
+    timeout the caller gets JobTimeout while the worker finishes the job
+    (up to DRAIN_TIMEOUT more seconds, holding its slot) and is retired;
+    on_drained() handlers then see the late result, so the caller's side
+    effects (cache invalidation) still happen
+
+IPC is a multiprocessing Pipe per worker: the parent sends
+(module, function, args, kwargs, priority, seconds left) and the worker
+replies ("ok", result) or ("error", type, message, traceback), plus the
+upstream calls it made (replayed into /api/metrics) and its memory (PSS).
+
+Offloading only happens in processes that call enable() (api-server). CLI
+runs and the workers themselves call the function inline.
+
+WORKER_POOL_LIMITS overrides the defaults, e.g. "browser=1/20/1024"
+(workers / jobs per worker / memory cap in MB). WORKER_POOLS=0 turns
+offloading off.
+"""
+
+import os
+import time
+import signal
+import atexit
+import functools
+import importlib
+import threading
+import traceback
+import multiprocessing
+
+import deadline
+import metrics
+import upstream_budget
+
+ENABLED = os.environ.get("WORKER_POOLS", "1") != "0"
+JOB_TIMEOUT = float(os.environ.get("WORKER_JOB_TIMEOUT", "180"))
+
+# pool -> (workers, jobs per worker before recycling, memory cap in MB)
+DEFAULT_POOLS = {
+    "browser": (1, 20, 1024),     # Playwright + Chromium writes (one at a time per Yahoo session)
+    "analytics": (2, 50, 1536),   # projection fetches and z-score valuation passes
+}
+
+# Modules a new worker imports before its first job
+PRELOAD = {
+    "analytics": ("valuations",),
+}
+
+# Pools whose jobs must not be interrupted (a killed add/drop or trade
+# leaves the Yahoo transaction in an unknown state)
+UNINTERRUPTIBLE_POOLS = ("browser",)
+# Seconds an uninterruptible job may run past its timeout before it is killed anyway
+DRAIN_TIMEOUT = 600
+
+# Seconds between memory/liveness checks while a job runs
+WATCH_INTERVAL = 1.0
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class WorkerError(Exception):
+    """A job failed in a worker process"""
+
+    def __init__(self, message, error_type=None, remote_traceback=None):
+        super().__init__(message)
+        self.error_type = error_type
+        self.remote_traceback = remote_traceback
+
+
+class JobTimeout(WorkerError):
+    """No worker was free, or the job ran too long, within the time allowed.
+    In an uninterruptible pool the job may still complete after this."""
+
+
+class WorkerCrashed(WorkerError):
+    """The worker died or was killed (memory cap) before replying"""
+
+
+def _parse_pools(value):
+    pools = dict(DEFAULT_POOLS)
+    for item in (value or "").split(","):
+        item = item.strip()
+        if "=" not in item:
+            continue
+        name, spec = item.split("=", 1)
+        name = name.strip()
+        # Missing fields keep the pool's default
+        defaults = list(pools.get(name, (1, 50, 1024)))
+        try:
+            parts = [int(x) for x in spec.split("/")][:3]
+        except ValueError:
+            print("Warning: ignoring bad WORKER_POOL_LIMITS entry: " + item)
+            continue
+        workers, max_jobs, memory_mb = parts + defaults[len(parts):]
+        pools[name] = (max(1, workers), max(1, max_jobs), memory_mb)
+    return pools
+
+
+POOLS = _parse_pools(os.environ.get("WORKER_POOL_LIMITS", ""))
+
+_enabled = False
+_in_worker = False
+
+
+def _process_tree(pid):
+    """pid and its descendants (e.g. Chromium under a browser worker)"""
+    pids = []
+    pending = [pid]
+    while pending:
+        p = pending.pop()
+        pids.append(p)
+        try:
+            with open("/proc/" + str(p) + "/task/" + str(p) + "/children") as f:
+                pending.extend(int(c) for c in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return pids
+
+
+def _process_memory(pid):
+    """Proportional set size of one process in bytes (shared pages split
+    between the processes mapping them), else its RSS"""
+    try:
+        with open("/proc/" + str(pid) + "/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        with open("/proc/" + str(pid) + "/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _memory_mb(pid):
+    """Memory of a process tree (PSS summed over its processes), in MB"""
+    total = sum(_process_memory(p) for p in _process_tree(pid))
+    return total / (1024.0 * 1024.0)
+
+
+# --- Worker process ---
+
+
+def _worker_main(conn, preload=()):
+    global _in_worker
+    _in_worker = True
+    for module_name in preload:
+        try:
+            importlib.import_module(module_name)
+        except Exception as e:
+            print("Warning: worker could not preload " + module_name + ": " + str(e))
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+        module_name, func_name, args, kwargs, priority, time_left = job
+        capture = metrics.begin_capture()
+        priority_token = upstream_budget.set_priority(priority)
+        deadline_token = deadline.activate(time_left) if time_left is not None else None
+        try:
+            fn = getattr(importlib.import_module(module_name), func_name)
+            reply = ("ok", fn(*args, **kwargs))
+        except Exception as e:
+            reply = ("error", type(e).__name__, str(e), traceback.format_exc())
+        finally:
+            if deadline_token is not None:
+                deadline.deactivate(deadline_token)
+            upstream_budget.reset_priority(priority_token)
+            calls = metrics.end_capture(capture)
+        memory = _memory_mb(os.getpid())
+        try:
+            conn.send((reply, calls, memory))
+        except Exception as e:
+            # Unpicklable result
+            conn.send((("error", type(e).__name__, "Could not return result: " + str(e), ""), calls, memory))
+
+
+# --- Supervisor side ---
+
+
+class _Worker:
+    def __init__(self, pool):
+        ctx = multiprocessing.get_context("spawn")
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, PRELOAD.get(pool.name, ())),
+            name="fbb-" + pool.name + "-worker",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+        self.memory_mb = 0.0
+        self.peak_mb = 0.0
+
+    def run(self, job, timeout, memory_mb, interruptible=True):
+        """Send one job and wait for its reply, enforcing timeout and memory
+        cap. An uninterruptible job is left running when it times out (see
+        Pool._drain()); over the memory cap it is only noted, for _checkin()."""
+        self.conn.send(job)
+        return self.wait(timeout, memory_mb, interruptible)
+
+    def wait(self, timeout, memory_mb, interruptible=True):
+        started = time.time()
+        while True:
+            try:
+                if self.conn.poll(WATCH_INTERVAL):
+                    reply, calls, self.memory_mb = self.conn.recv()
+                    self.jobs += 1
+                    return reply, calls
+            except (EOFError, OSError):
+                raise WorkerCrashed("Worker process exited during the job")
+            if not self.process.is_alive():
+                raise WorkerCrashed("Worker process exited during the job")
+            memory = _memory_mb(self.process.pid)
+            self.peak_mb = max(self.peak_mb, memory)
+            if interruptible and memory_mb and memory > memory_mb:
+                self.kill()
+                raise WorkerCrashed(
+                    "Worker exceeded its " + str(memory_mb) + " MB memory cap ("
+                    + str(int(memory)) + " MB)"
+                )
+            if time.time() - started > timeout:
+                if interruptible:
+                    self.kill()
+                    raise JobTimeout("Job timed out after " + str(round(timeout, 1)) + "s")
+                raise JobTimeout(
+                    "Job still running after " + str(round(timeout, 1))
+                    + "s; it will finish in the background, check the result before retrying"
+                )
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(2)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+
+    def kill(self):
+        if not self.process.is_alive():
+            self.process.join(2)
+            return
+        # Take Chromium down with the worker rather than orphaning it
+        for pid in reversed(_process_tree(self.process.pid)):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+        self.process.join(2)
+
+
+class Pool:
+    """A fixed number of worker slots; workers start on demand"""
+
+    def __init__(self, name, workers, max_jobs, memory_mb):
+        self.name = name
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self.memory_mb = memory_mb
+        self.slots = threading.BoundedSemaphore(workers)
+        self.lock = threading.Lock()
+        self.idle = []
+        # Thread spawning a recycled worker's replacement, if any
+        self.replacing = None
+        self.stats = {
+            "jobs": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "crashes": 0,
+            "spawned": 0,
+            "recycled": 0,
+            "queue_seconds": 0.0,
+            "busy": 0,
+            "waiting": 0,
+        }
+
+    def _checkout(self):
+        with self.lock:
+            replacing = self.replacing if not self.idle else None
+        if replacing is not None:
+            # Already spawning: cheaper to wait for it than to start another
+            replacing.join()
+        with self.lock:
+            while self.idle:
+                worker = self.idle.pop()
+                if worker.process.is_alive():
+                    return worker
+            self.stats["spawned"] += 1
+        return _Worker(self)
+
+    def _checkin(self, worker):
+        peak = max(worker.memory_mb, worker.peak_mb)
+        retire = worker.jobs >= self.max_jobs or (self.memory_mb and peak > self.memory_mb)
+        if retire:
+            with self.lock:
+                self.stats["recycled"] += 1
+            worker.stop()
+            # Spawn (and preload) the replacement now rather than on the next job
+            thread = threading.Thread(target=self._replace, name="spawn-" + self.name + "-worker", daemon=True)
+            with self.lock:
+                self.replacing = thread
+            thread.start()
+            return
+        self._add_idle(worker)
+
+    def _add_idle(self, worker):
+        with self.lock:
+            if len(self.idle) < self.workers:
+                self.idle.append(worker)
+                return
+        worker.stop()
+
+    def submit(self, module_name, func_name, args, kwargs):
+        """Run module.func(*args, **kwargs) in a worker and return its result"""
+        timeout = JOB_TIMEOUT
+        left = deadline.remaining()
+        if left is not None:
+            if left <= 0:
+                raise deadline.DeadlineExceeded("Request deadline exceeded")
+            timeout = min(timeout, left)
+
+        started = time.time()
+        with self.lock:
+            self.stats["waiting"] += 1
+        acquired = self.slots.acquire(timeout=timeout)
+        waited = time.time() - started
+        with self.lock:
+            self.stats["waiting"] -= 1
+            self.stats["queue_seconds"] += waited
+        if not acquired:
+            with self.lock:
+                self.stats["timeouts"] += 1
+            raise JobTimeout("No " + self.name + " worker free within " + str(round(timeout, 1)) + "s")
+
+        interruptible = self.name not in UNINTERRUPTIBLE_POOLS
+        draining = False
+        try:
+            with self.lock:
+                self.stats["busy"] += 1
+            worker = self._checkout()
+            remaining = max(0.0, timeout - waited)
+            # The worker gets whatever is left of the request's deadline
+            time_left = remaining if left is not None else None
+            job = (module_name, func_name, args, kwargs, upstream_budget.current_priority(), time_left)
+            try:
+                reply, calls = worker.run(job, remaining, self.memory_mb, interruptible)
+            except JobTimeout:
+                with self.lock:
+                    self.stats["timeouts"] += 1
+                if not interruptible:
+                    # Let the job finish; the drain thread frees the slot
+                    draining = True
+                    threading.Thread(
+                        target=self._drain, args=(worker, module_name, func_name),
+                        name="drain-" + self.name + "-worker", daemon=True,
+                    ).start()
+                raise
+            except WorkerCrashed:
+                with self.lock:
+                    self.stats["crashes"] += 1
+                worker.kill()
+                raise
+            self._checkin(worker)
+        finally:
+            if not draining:
+                with self.lock:
+                    self.stats["busy"] -= 1
+                self.slots.release()
+
+        metrics.replay(calls)
+        with self.lock:
+            self.stats["jobs"] += 1
+            if reply[0] == "error":
+                self.stats["errors"] += 1
+        if reply[0] == "error":
+            _, error_type, message, remote_traceback = reply
+            raise WorkerError(message, error_type, remote_traceback)
+        return reply[1]
+
+    def _replace(self):
+        worker = _Worker(self)
+        with self.lock:
+            self.stats["spawned"] += 1
+        self._add_idle(worker)
+
+    def _drain(self, worker, module_name, func_name):
+        """Wait out a timed-out uninterruptible job, then retire its worker"""
+        reply = None
+        try:
+            reply, calls = worker.wait(DRAIN_TIMEOUT, self.memory_mb, interruptible=False)
+            metrics.replay(calls)
+            worker.stop()
+        except WorkerError as e:
+            print("Warning: " + self.name + " worker did not finish its timed-out job: " + str(e))
+            worker.kill()
+        finally:
+            with self.lock:
+                self.stats["recycled"] += 1
+                self.stats["busy"] -= 1
+            self.slots.release()
+        if reply is not None and reply[0] == "ok":
+            _notify_drained(module_name, func_name, reply[1])
+
+    def shutdown(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for worker in idle:
+            worker.stop()
+
+    def snapshot(self):
+        with self.lock:
+            result = dict(self.stats)
+            result["idle"] = len(self.idle)
+        result.update({
+            "workers": self.workers,
+            "max_jobs": self.max_jobs,
+            "memory_mb": self.memory_mb,
+            "queue_seconds": round(result["queue_seconds"], 3),
+        })
+        return result
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pools_pid = None
+
+_drained_handlers = []
+
+
+def on_drained(fn):
+    """Call fn(module_name, func_name, result) when a job whose caller got
+    JobTimeout finishes successfully in the background
+    """
+    _drained_handlers.append(fn)
+
+
+def _notify_drained(module_name, func_name, result):
+    for fn in list(_drained_handlers):
+        try:
+            fn(module_name, func_name, result)
+        except Exception as e:
+            print("Warning: drained-job handler failed for " + module_name + "." + func_name + ": " + str(e))
+
+
+def get_pool(name):
+    """The named pool for this process (pools aren't shared across forks)"""
+    global _pools, _pools_pid
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            _pools = {}
+            _pools_pid = os.getpid()
+        pool = _pools.get(name)
+        if pool is None:
+            workers, max_jobs, memory_mb = POOLS.get(name, (1, 50, 1024))
+            pool = Pool(name, workers, max_jobs, memory_mb)
+            _pools[name] = pool
+        return pool
+
+
+def enable():
+    """Offload decorated functions from this process (api-server)"""
+    global _enabled
+    _enabled = ENABLED
+
+
+def call(pool_name, fn, *args, **kwargs):
+    """fn(*args, **kwargs), run in the named pool when offloading is on.
+    fn must be a module-level function; arguments and the return value
+    must be picklable.
+    """
+    if not _enabled or _in_worker:
+        return fn(*args, **kwargs)
+    return get_pool(pool_name).submit(fn.__module__, fn.__name__, args, kwargs)
+
+
+def offload(pool_name):
+    """Decorator: always run the function via call(pool_name, ...)"""
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return call(pool_name, fn, *args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def shutdown():
+    with _pools_lock:
+        pools = list(_pools.values()) if _pools_pid == os.getpid() else []
+    for pool in pools:
+        pool.shutdown()
+
+
+atexit.register(shutdown)
+
+
+def get_stats():
+    """Per-pool job counters and worker state for this process"""
+    with _pools_lock:
+        pools = dict(_pools) if _pools_pid == os.getpid() else {}
+    result = {"enabled": _enabled, "pools": {}}
+    for name in sorted(POOLS):
+        pool = pools.get(name)
+        if pool is None:
+            # Not used yet in this process
+            pool = Pool(name, *POOLS[name])
+        result["pools"][name] = pool.snapshot()
+    return result
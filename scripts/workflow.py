@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Workflow Execution Engine - Runs independent workflow sections concurrently"""
+
+import os
+import time
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import deadline
+import profiling
+
+WORKFLOW_MAX_WORKERS = int(os.environ.get("WORKFLOW_MAX_WORKERS", "8"))
+WORKFLOW_SECTION_TIMEOUT = float(os.environ.get("WORKFLOW_SECTION_TIMEOUT", "60"))
+BATCH_MAX_WORKERS = int(os.environ.get("BATCH_MAX_WORKERS", "8"))
+
+# Separate pools so a /api/batch sub-request that runs a workflow never waits
+# on a worker held by its own parent
+POOL_SIZES = {
+    "workflow": WORKFLOW_MAX_WORKERS,
+    "batch": BATCH_MAX_WORKERS,
+}
+
+# How often the collector wakes up to check section timeouts
+_POLL_INTERVAL = 0.25
+
+_executors = {}
+_executor_lock = threading.Lock()
+
+
+def _get_executor(pool="workflow"):
+    """Get a shared pool by name, creating it on first use"""
+    executor = _executors.get(pool)
+    if executor is None:
+        with _executor_lock:
+            executor = _executors.get(pool)
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=POOL_SIZES[pool],
+                    thread_name_prefix=pool,
+                )
+                _executors[pool] = executor
+    return executor
+
+
+def _run_section(fn, args, started):
+    """Worker body: record start time, call a cmd_* function with as_json=True"""
+    started["at"] = time.time()
+    try:
+        with profiling.attach():
+            return fn(args or [], as_json=True)
+    except Exception as e:
+        return {"_error": str(e)}
+
+
+def iter_sections(sections, timeout=None, pool="workflow"):
+    """Submit workflow sections to the shared bounded pool right away and
+    return an iterator of (name, result) in completion order.
+
+    sections: list of (name, fn, args) tuples. fn is a cmd_* function.
+    timeout: per-section limit in seconds, counted from when the section
+    starts running (or from submission if it never gets a worker).
+
+    Failed sections carry {"_error": ...} exactly like _safe_call; timed-out
+    sections also carry "_timeout": True. A timed-out thread cannot be
+    killed, so it finishes in the background and its result is discarded.
+    Sections still running when the caller's request deadline passes (see
+    deadline.py) time out too, whatever their own limit.
+
+    Submission happens in the caller (so each section inherits the caller's
+    context vars); only the collecting is lazy, which lets a streaming
+    response consume results after the view has returned.
+
+    pool: "workflow" or "batch" (see POOL_SIZES).
+    """
+    if timeout is None:
+        timeout = WORKFLOW_SECTION_TIMEOUT
+    executor = _get_executor(pool)
+    submitted = time.time()
+    deadline_at = deadline.at()
+
+    pending = {}
+    starts = {}
+    for name, fn, args in sections:
+        started = {}
+        # Carry the caller's context vars (e.g. the request's LeagueContext)
+        # into the worker thread
+        run_ctx = contextvars.copy_context()
+        future = executor.submit(run_ctx.run, _run_section, fn, args, started)
+        pending[future] = name
+        starts[future] = started
+
+    return _collect(pending, starts, submitted, timeout, deadline_at)
+
+
+def _collect(pending, starts, submitted, timeout, deadline_at=None):
+    """Yield (name, result) for submitted sections as they finish or time out"""
+    while pending:
+        poll = _POLL_INTERVAL
+        if deadline_at is not None:
+            poll = max(0.0, min(poll, deadline_at - time.time()))
+        done, _ = wait(list(pending), timeout=poll, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"_error": str(e)}
+            yield name, result
+        now = time.time()
+        past_deadline = deadline_at is not None and now >= deadline_at
+        for future in list(pending):
+            began = starts[future].get("at", submitted)
+            if past_deadline or now - began > timeout:
+                name = pending.pop(future)
+                future.cancel()
+                if past_deadline:
+                    message = "Request deadline exceeded"
+                else:
+                    message = "Timed out after " + str(int(timeout)) + "s"
+                yield name, {"_error": message, "_timeout": True}
+
+
+def run_sections(sections, timeout=None, pool="workflow"):
+    """Run workflow sections concurrently and wait for all of them.
+    Returns dict name -> result in the order given (see iter_sections).
+    """
+    results = dict(iter_sections(sections, timeout=timeout, pool=pool))
+    return {name: results.get(name) for name, _, _ in sections}
+
+
+def timed_out(results):
+    """Names of sections in a run_sections() result that timed out"""
+    return [
+        name for name, result in results.items()
+        if isinstance(result, dict) and result.get("_timeout")
+    ]
@@ -4,11 +4,13 @@
 import sys
 import json
 import os
-import time
 from yahoo_oauth import OAuth2
 import yahoo_fantasy_api as yfa
 from mlb_id_cache import get_mlb_id
 from intel import batch_intel
+import league_context
+import metrics
+import data_cache
 
 # Docker paths
 OAUTH_FILE = os.environ.get("OAUTH_FILE", "/app/config/yahoo_oauth.json")
@@ -25,17 +27,19 @@ def get_connection():
     sc = OAuth2(None, None, from_file=OAUTH_FILE)
     if not sc.token_is_valid():
         sc.refresh_access_token()
+    metrics.instrument_session(sc.session)
     return sc
 
 
-_trend_cache = {"data": None, "time": 0}
+# Shared with season-manager.py: both read the same game-wide trends
+_trend_cache = data_cache.namespace("transaction_trends", 1800)
 
 
 def _get_trend_lookup():
     """Get a name->trend dict from transaction trends, cached 30 min"""
-    now = time.time()
-    if _trend_cache.get("data") and now - _trend_cache.get("time", 0) < 1800:
-        return _trend_cache.get("data", {})
+    cached = _trend_cache.get("lookup")
+    if cached:
+        return cached
     try:
         raw = cmd_transaction_trends([], as_json=True)
         lookup = {}
@@ -55,19 +59,17 @@ def _get_trend_lookup():
                     "rank": i + 1,
                     "percent_owned": p.get("percent_owned", 0),
                 }
-        _trend_cache["data"] = lookup
-        _trend_cache["time"] = now
+        if lookup:
+            _trend_cache.set("lookup", lookup)
         return lookup
     except Exception:
         return {}
 
 
-def cmd_roster(args, as_json=False):
+def cmd_roster(args, as_json=False, ctx=None):
     """Show current roster"""
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    team = gm.to_league(LEAGUE_ID).to_team(TEAM_ID)
-    roster = team.roster()
+    ctx = league_context.resolve(ctx)
+    roster = ctx.roster()
 
     if not roster:
         if as_json:
@@ -109,15 +111,13 @@ def cmd_roster(args, as_json=False):
         print(line)
 
 
-def cmd_free_agents(args, as_json=False):
+def cmd_free_agents(args, as_json=False, ctx=None):
     """List free agents (B=batters, P=pitchers)"""
     pos_type = args[0] if args else "B"
     count = int(args[1]) if len(args) > 1 else 20
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
+    ctx = league_context.resolve(ctx)
 
-    fa = lg.free_agents(pos_type)[:count]
+    fa = ctx.free_agents(pos_type)[:count]
 
     if as_json:
         players = []
@@ -174,18 +174,16 @@ def cmd_free_agents(args, as_json=False):
         print(line)
 
 
-def cmd_standings(args, as_json=False):
+def cmd_standings(args, as_json=False, ctx=None):
     """Show league standings"""
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
-    standings = lg.standings()
+    ctx = league_context.resolve(ctx)
+    standings = ctx.standings()
 
     if as_json:
         # Fetch teams for logo/avatar data
         team_meta = {}
         try:
-            teams = lg.teams()
+            teams = ctx.teams()
             for tk, td in teams.items():
                 tname = td.get("name", "")
                 logo_url, mgr_image = _extract_team_meta(td)
@@ -230,13 +228,11 @@ def cmd_standings(args, as_json=False):
         print(line)
 
 
-def cmd_info(args, as_json=False):
+def cmd_info(args, as_json=False, ctx=None):
     """Show league and team info"""
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
-    settings = lg.settings()
-    team = lg.to_team(TEAM_ID)
+    ctx = league_context.resolve(ctx)
+    settings = ctx.settings()
+    team = ctx.team()
     team_name = (
         team.team_data.get("name", "Unknown")
         if hasattr(team, "team_data")
@@ -250,7 +246,7 @@ def cmd_info(args, as_json=False):
             "season": settings.get("season", "?"),
             "start_date": settings.get("start_date", "?"),
             "end_date": settings.get("end_date", "?"),
-            "current_week": lg.current_week(),
+            "current_week": ctx.current_week(),
             "num_teams": settings.get("num_teams", "?"),
             "playoff_teams": settings.get("num_playoff_teams", "?"),
             "max_weekly_adds": settings.get("max_weekly_adds", "?"),
@@ -264,14 +260,14 @@ def cmd_info(args, as_json=False):
     print("  Season: " + settings.get("season", "?"))
     print("  Start: " + settings.get("start_date", "?"))
     print("  End: " + settings.get("end_date", "?"))
-    print("  Current Week: " + str(lg.current_week()))
+    print("  Current Week: " + str(ctx.current_week()))
     print("  Teams: " + str(settings.get("num_teams", "?")))
     print("  Playoff Teams: " + str(settings.get("num_playoff_teams", "?")))
     print("  Max Weekly Adds: " + str(settings.get("max_weekly_adds", "?")))
     print("  Your Team: " + team_name + " (" + TEAM_ID + ")")
 
 
-def cmd_search(args, as_json=False):
+def cmd_search(args, as_json=False, ctx=None):
     """Search for a player by name"""
     if not args:
         if as_json:
@@ -279,13 +275,11 @@ def cmd_search(args, as_json=False):
         print("Usage: search PLAYER_NAME")
         return
     name = " ".join(args)
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
+    ctx = league_context.resolve(ctx)
 
     results = []
     for pos_type in ["B", "P"]:
-        fa = lg.free_agents(pos_type)
+        fa = ctx.free_agents(pos_type)
         for p in fa:
             if name.lower() in p.get("name", "").lower():
                 results.append(p)
@@ -496,18 +490,16 @@ def _extract_team_meta(team_data):
     return logo_url, mgr_image
 
 
-def cmd_matchups(args, as_json=False):
+def cmd_matchups(args, as_json=False, ctx=None):
     """Show weekly H2H matchup preview and scores"""
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
+    ctx = league_context.resolve(ctx)
 
     try:
         if args:
             week = int(args[0])
-            raw = lg.matchups(week=week)
+            raw = ctx.matchups(week=week)
         else:
-            raw = lg.matchups()
+            raw = ctx.matchups()
     except Exception as e:
         if as_json:
             return {"error": "Error fetching matchups: " + str(e)}
@@ -537,7 +529,7 @@ def cmd_matchups(args, as_json=False):
         # Fetch team logos
         team_meta = {}
         try:
-            all_teams = lg.teams()
+            all_teams = ctx.teams()
             for tk, td in all_teams.items():
                 tname = td.get("name", "")
                 logo_url, mgr_image = _extract_team_meta(td)
@@ -581,14 +573,12 @@ def cmd_matchups(args, as_json=False):
         print("Error parsing matchups: " + str(e))
 
 
-def cmd_scoreboard(args, as_json=False):
+def cmd_scoreboard(args, as_json=False, ctx=None):
     """Show live scoring overview for current week (uses matchups data)"""
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
+    ctx = league_context.resolve(ctx)
 
     try:
-        raw = lg.matchups()
+        raw = ctx.matchups()
     except Exception as e:
         if as_json:
             return {"error": "Error fetching scoreboard: " + str(e)}
@@ -618,7 +608,7 @@ def cmd_scoreboard(args, as_json=False):
         # Fetch team logos
         team_meta = {}
         try:
-            all_teams = lg.teams()
+            all_teams = ctx.teams()
             for tk, td in all_teams.items():
                 tname = td.get("name", "")
                 logo_url, mgr_image = _extract_team_meta(td)
@@ -681,14 +671,12 @@ def cmd_scoreboard(args, as_json=False):
         print("Error parsing scoreboard: " + str(e))
 
 
-def cmd_matchup_detail(args, as_json=False):
+def cmd_matchup_detail(args, as_json=False, ctx=None):
     """Show detailed H2H matchup with per-category comparison"""
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
+    ctx = league_context.resolve(ctx)
 
     try:
-        raw = lg.matchups()
+        raw = ctx.matchups()
     except Exception as e:
         if as_json:
             return {"error": "Error fetching matchup detail: " + str(e)}
@@ -715,7 +703,7 @@ def cmd_matchup_detail(args, as_json=False):
         count = int(matchup_block.get("count", 0))
 
         # Also fetch stat categories for category names
-        stat_cats = lg.stat_categories()
+        stat_cats = ctx.stat_categories()
         stat_id_to_name = {}
         for cat in stat_cats:
             sid = str(cat.get("stat_id", ""))
@@ -725,7 +713,7 @@ def cmd_matchup_detail(args, as_json=False):
         # Fetch team logos
         team_meta = {}
         try:
-            all_teams = lg.teams()
+            all_teams = ctx.teams()
             for tk, td in all_teams.items():
                 tname = td.get("name", "")
                 logo_url, mgr_image = _extract_team_meta(td)
@@ -869,23 +857,21 @@ def cmd_matchup_detail(args, as_json=False):
         print("Error parsing matchup detail: " + str(e))
 
 
-def cmd_transactions(args, as_json=False):
+def cmd_transactions(args, as_json=False, ctx=None):
     """Show recent league transaction activity"""
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
+    ctx = league_context.resolve(ctx)
 
     trans_type = args[0] if args else None
     count = int(args[1]) if len(args) > 1 else 25
 
     try:
         if trans_type:
-            transactions = lg.transactions(trans_type, count)
+            transactions = ctx.transactions(trans_type, count)
         else:
             transactions = []
             for t in ["add", "drop", "trade"]:
                 try:
-                    results = lg.transactions(t, 10)
+                    results = ctx.transactions(t, 10)
                     if results:
                         transactions.extend(results)
                 except Exception:
@@ -931,14 +917,12 @@ def cmd_transactions(args, as_json=False):
             print("  " + str(t))
 
 
-def cmd_stat_categories(args, as_json=False):
+def cmd_stat_categories(args, as_json=False, ctx=None):
     """Show league scoring categories"""
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
+    ctx = league_context.resolve(ctx)
 
     try:
-        categories = lg.stat_categories()
+        categories = ctx.stat_categories()
     except Exception as e:
         if as_json:
             return {"error": "Error fetching stat categories: " + str(e)}
@@ -1065,10 +1049,9 @@ def _parse_trend_players(raw_json):
     return players
 
 
-def cmd_transaction_trends(args, as_json=False):
+def cmd_transaction_trends(args, as_json=False, ctx=None):
     """Show most added and most dropped players across all Yahoo leagues"""
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
+    gm = league_context.resolve(ctx).game()
 
     count = 25
     try:
@@ -1366,7 +1349,7 @@ def cmd_waiver_claim_swap(args, as_json=False):
         print(msg)
 
 
-def cmd_who_owns(args, as_json=False):
+def cmd_who_owns(args, as_json=False, ctx=None):
     """Check who owns a player by player_id"""
     if not args:
         if as_json:
@@ -1375,9 +1358,7 @@ def cmd_who_owns(args, as_json=False):
         return
     player_id = args[0]
     player_key = GAME_KEY + ".p." + str(player_id)
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
+    lg = league_context.resolve(ctx).league()
     try:
         ownership = lg.ownership([player_key])
         if not ownership:
@@ -1414,13 +1395,11 @@ def cmd_who_owns(args, as_json=False):
         print("Error checking ownership: " + str(e))
 
 
-def cmd_league_pulse(args, as_json=False):
+def cmd_league_pulse(args, as_json=False, ctx=None):
     """Show league activity - moves and trades per team"""
-    sc = get_connection()
-    gm = yfa.Game(sc, "mlb")
-    lg = gm.to_league(LEAGUE_ID)
+    ctx = league_context.resolve(ctx)
     try:
-        teams = lg.teams()
+        teams = ctx.teams()
         team_list = []
         for team_key, team_data in teams.items():
             logo_url, mgr_image = _extract_team_meta(team_data)
@@ -1588,6 +1567,7 @@ if __name__ == "__main__":
     args = sys.argv[2:]
 
     if cmd in COMMANDS:
+        league_context.activate(league_context.LeagueContext())
         COMMANDS[cmd](args)
     else:
         print("Unknown command: " + cmd)
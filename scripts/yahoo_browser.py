@@ -16,6 +16,9 @@ import sys
 import json
 import time
 
+import metrics
+import worker_pools
+
 LEAGUE_ID = os.environ.get("LEAGUE_ID", "")
 TEAM_ID = os.environ.get("TEAM_ID", "")
 SESSION_FILE = os.environ.get("YAHOO_SESSION_FILE", "/app/config/yahoo_session.json")
@@ -75,6 +78,10 @@ def is_session_valid():
         return {"valid": False, "reason": "Error reading session: " + str(e)}
 
 
+# Browser context id -> launch time, for Playwright session timing in metrics
+_session_started = {}
+
+
 def _get_browser_context():
     """Create a Playwright browser context with saved session"""
     from playwright.sync_api import sync_playwright
@@ -86,14 +93,23 @@ def _get_browser_context():
             + ". Run './yf browser-login' to set up."
         )
 
-    pw = sync_playwright().start()
-    browser = pw.chromium.launch(headless=True)
-    context = browser.new_context(storage_state=SESSION_FILE)
+    started = time.time()
+    try:
+        pw = sync_playwright().start()
+        browser = pw.chromium.launch(headless=True)
+        context = browser.new_context(storage_state=SESSION_FILE)
+    except Exception:
+        metrics.record_upstream("playwright", time.time() - started, error=True)
+        raise
+    _session_started[id(context)] = started
     return pw, browser, context
 
 
 def _cleanup(pw, browser, context):
     """Clean up browser resources"""
+    started = _session_started.pop(id(context), None)
+    if started is not None:
+        metrics.record_upstream("playwright", time.time() - started)
     try:
         context.close()
     except Exception:
@@ -182,6 +198,19 @@ def refresh_session():
     """Visit Yahoo Fantasy to refresh session cookies and save them back.
     Called periodically by the heartbeat to prevent session expiry."""
     from datetime import datetime
+    # The page visit may run in a browser worker; the heartbeat state lives here
+    result = _refresh_session_page()
+    if result.get("success"):
+        _heartbeat["last_ok"] = datetime.utcnow().isoformat() + "Z"
+        _heartbeat["last_error"] = None
+    else:
+        _heartbeat["last_error"] = result.get("error", "")
+        result.pop("error", None)
+    return result
+
+
+@worker_pools.offload("browser")
+def _refresh_session_page():
     pw, browser, context = _get_browser_context()
     try:
         page = context.new_page()
@@ -189,12 +218,9 @@ def refresh_session():
         _check_for_login_redirect(page)
         # Save refreshed cookies
         context.storage_state(path=SESSION_FILE)
-        _heartbeat["last_ok"] = datetime.utcnow().isoformat() + "Z"
-        _heartbeat["last_error"] = None
         return {"success": True, "message": "Session refreshed"}
     except Exception as e:
-        _heartbeat["last_error"] = str(e)
-        return {"success": False, "message": "Session refresh failed: " + str(e)}
+        return {"success": False, "message": "Session refresh failed: " + str(e), "error": str(e)}
     finally:
         _cleanup(pw, browser, context)
 
@@ -204,18 +230,21 @@ def get_heartbeat_state():
     return dict(_heartbeat)
 
 
+@worker_pools.offload("browser")
 def add_player(player_id):
     """Add a free agent via Yahoo Fantasy web UI"""
     url = _league_url("/addplayer?apid=" + str(player_id))
     return _submit_page_action(url, ["was added", "success", "roster"], "Added player " + str(player_id))
 
 
+@worker_pools.offload("browser")
 def drop_player(player_id):
     """Drop a player via Yahoo Fantasy web UI"""
     url = _league_url("/dropplayer?dpid=" + str(player_id))
     return _submit_page_action(url, ["was dropped", "success"], "Dropped player " + str(player_id))
 
 
+@worker_pools.offload("browser")
 def swap_players(add_id, drop_id):
     """Atomic add+drop via Yahoo Fantasy web UI"""
     url = _league_url("/addplayer?apid=" + str(add_id) + "&dpid=" + str(drop_id))
@@ -232,6 +261,7 @@ def _fill_faab(page, faab):
         bid_input.fill(str(faab))
 
 
+@worker_pools.offload("browser")
 def waiver_claim(player_id, faab=None):
     """Submit a waiver claim via Yahoo Fantasy web UI"""
     url = _league_url("/addplayer?apid=" + str(player_id))
@@ -245,6 +275,7 @@ def waiver_claim(player_id, faab=None):
     return _submit_page_action(url, ["claim", "success", "waiver"], label, pre_submit_fn=pre_submit)
 
 
+@worker_pools.offload("browser")
 def waiver_claim_swap(add_id, drop_id, faab=None):
     """Submit a waiver claim + drop via Yahoo Fantasy web UI"""
     url = _league_url("/addplayer?apid=" + str(add_id) + "&dpid=" + str(drop_id))
@@ -258,6 +289,7 @@ def waiver_claim_swap(add_id, drop_id, faab=None):
     return _submit_page_action(url, ["claim", "success", "waiver"], label, pre_submit_fn=pre_submit)
 
 
+@worker_pools.offload("browser")
 def set_lineup(moves):
     """Set lineup positions via Yahoo Fantasy web UI
 
@@ -304,6 +336,7 @@ def set_lineup(moves):
         _cleanup(pw, browser, context)
 
 
+@worker_pools.offload("browser")
 def propose_trade(tradee_team_key, your_player_ids, their_player_ids, trade_note=""):
     """Propose a trade via Yahoo Fantasy web UI"""
     pw, browser, context = _get_browser_context()
@@ -381,11 +414,13 @@ def _trade_response(transaction_key, action, trade_note=""):
         _cleanup(pw, browser, context)
 
 
+@worker_pools.offload("browser")
 def accept_trade(transaction_key, trade_note=""):
     """Accept a pending trade via Yahoo Fantasy web UI"""
     return _trade_response(transaction_key, "Accept", trade_note)
 
 
+@worker_pools.offload("browser")
 def reject_trade(transaction_key, trade_note=""):
     """Reject a pending trade via Yahoo Fantasy web UI"""
     return _trade_response(transaction_key, "Reject", trade_note)
@@ -415,6 +450,7 @@ def _click_save_changes(page):
     return "_global_alerts" in page.url
 
 
+@worker_pools.offload("browser")
 def change_team_name(new_name):
     """Change team name via Yahoo Fantasy web UI — useful as a write test.
     Uses type() for character-by-character input to trigger Yahoo's JS change detection."""
@@ -455,6 +491,7 @@ def change_team_name(new_name):
         _cleanup(pw, browser, context)
 
 
+@worker_pools.offload("browser")
 def change_team_logo(image_path):
     """Change team logo via Yahoo Fantasy web UI.
     Uploads image to Cloudinary through Yahoo's upload flow, selects it, and saves."""
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""yf client - Sends a ./yf command to the api-server's CLI daemon
+
+Usage: yf_client.py <module> <command> [args]
+
+Imports nothing heavy, so a command costs a socket round trip instead of a
+Python cold start. If the daemon isn't running (or asks for a fallback),
+execs the module script directly, exactly as ./yf did before.
+"""
+
+import os
+import sys
+import json
+import socket
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+CLI_SOCKET = os.environ.get("CLI_SOCKET", "/tmp/fbb-mcp-cli.sock")
+CLI_DAEMON = os.environ.get("CLI_DAEMON", "1") == "1"
+
+
+def run_direct(module, argv):
+    script = os.path.join(SCRIPTS_DIR, module + ".py")
+    os.execv(sys.executable, [sys.executable, script] + argv)
+
+
+def _absolute(argv):
+    # The daemon's working directory isn't ours (e.g. import-csv <file>)
+    return [os.path.abspath(a) if os.path.exists(a) else a for a in argv]
+
+
+def run_daemon(module, argv):
+    """Run via the daemon. Returns the exit code, or None to fall back."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(CLI_SOCKET)
+    except OSError:
+        sock.close()
+        return None
+    try:
+        request = {"module": module, "argv": _absolute(argv)}
+        sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        reader = sock.makefile("r", encoding="utf-8")
+        for line in reader:
+            frame = json.loads(line)
+            if frame.get("fallback"):
+                return None
+            if "out" in frame:
+                sys.stdout.write(frame["out"])
+                sys.stdout.flush()
+            elif "err" in frame:
+                sys.stderr.write(frame["err"])
+                sys.stderr.flush()
+            elif "exit" in frame:
+                return frame["exit"]
+        print("Error: CLI daemon closed the connection", file=sys.stderr)
+        return 1
+    finally:
+        sock.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: yf_client.py <module> <command> [args]")
+        sys.exit(1)
+    module = sys.argv[1]
+    argv = sys.argv[2:]
+    code = run_daemon(module, argv) if CLI_DAEMON else None
+    if code is None:
+        run_direct(module, argv)
+    sys.exit(code)